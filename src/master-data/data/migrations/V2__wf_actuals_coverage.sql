@@ -0,0 +1,42 @@
+-- Table: public.wf_actuals_coverage
+
+CREATE TABLE IF NOT EXISTS public.wf_actuals_coverage
+(
+    city_id integer NOT NULL,
+    month date NOT NULL,
+    days integer NOT NULL DEFAULT 0,
+    updated_at timestamp without time zone NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    CONSTRAINT "PK_wf_actuals_coverage" PRIMARY KEY (city_id, month),
+    CONSTRAINT "FK_city_id_cities_wf_actuals_coverage" FOREIGN KEY (city_id)
+        REFERENCES public.cities (id)
+        ON UPDATE NO ACTION
+        ON DELETE NO ACTION
+);
+
+ALTER TABLE IF EXISTS public.wf_actuals_coverage
+    OWNER TO postgres;
+
+COMMENT ON TABLE public.wf_actuals_coverage
+    IS 'ledger of the days loaded into wf_actuals, one row per city and month';
+
+COMMENT ON COLUMN public.wf_actuals_coverage.month
+    IS 'first day of the covered month';
+
+COMMENT ON COLUMN public.wf_actuals_coverage.days
+    IS 'bitmask of the days of the month holding all 24 hourly samples, bit 0 is the 1st';
+
+
+-- Backfill the ledger from the rows already loaded
+
+INSERT INTO public.wf_actuals_coverage (city_id, month, days)
+SELECT city_id, month, bit_or(1 << (day - 1))
+FROM (
+    SELECT city_id,
+           date_trunc('month', timestamp_utc)::date AS month,
+           extract(day FROM timestamp_utc)::integer AS day
+    FROM public.wf_actuals
+    GROUP BY 1, 2, 3
+    HAVING count(*) = 24
+) AS complete_days
+GROUP BY city_id, month
+ON CONFLICT (city_id, month) DO UPDATE SET days = EXCLUDED.days;
@@ -0,0 +1,47 @@
+-- Table: public.wf_import_queue
+
+CREATE TABLE IF NOT EXISTS public.wf_import_queue
+(
+    id bigserial NOT NULL,
+    run_id text NOT NULL,
+    unit_key text NOT NULL,
+    start_date date NOT NULL,
+    end_date date NOT NULL,
+    cells jsonb NOT NULL,
+    status text NOT NULL DEFAULT 'pending',
+    attempts integer NOT NULL DEFAULT 0,
+    available_at timestamp without time zone NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    lease_owner text,
+    lease_expires_at timestamp without time zone,
+    last_error text,
+    created_at timestamp without time zone NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    updated_at timestamp without time zone NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    CONSTRAINT "PK_wf_import_queue" PRIMARY KEY (id),
+    CONSTRAINT "UQ_wf_import_queue_run_unit" UNIQUE (run_id, unit_key),
+    CONSTRAINT "CK_wf_import_queue_status" CHECK (status IN ('pending', 'running', 'done', 'dead'))
+);
+
+ALTER TABLE IF EXISTS public.wf_import_queue
+    OWNER TO postgres;
+
+COMMENT ON TABLE public.wf_import_queue
+    IS 'work units of distributed wf_import runs, enqueued by wf_plan and claimed by wf_worker processes';
+
+COMMENT ON COLUMN public.wf_import_queue.unit_key
+    IS 'date range and digest of the fetched coordinates, enqueueing the same unit twice in a run is a no-op';
+
+COMMENT ON COLUMN public.wf_import_queue.cells
+    IS 'grid cells fetched by the unit with the cities each one serves';
+
+COMMENT ON COLUMN public.wf_import_queue.status
+    IS 'pending, running (leased by lease_owner until lease_expires_at), done, or dead once attempts are exhausted';
+
+COMMENT ON COLUMN public.wf_import_queue.available_at
+    IS 'a failed unit is retried once this time is reached';
+
+
+-- workers only look for claimable units, finished ones are left out of the index
+CREATE INDEX IF NOT EXISTS "IX_wf_import_queue_claimable"
+    ON public.wf_import_queue USING btree
+    (run_id, id)
+    WHERE status IN ('pending', 'running');
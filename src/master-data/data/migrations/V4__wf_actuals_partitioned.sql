@@ -0,0 +1,97 @@
+-- Table: public.wf_actuals, range partitioned by month of timestamp_utc
+--
+-- One partition per month, named wf_actuals_pYYYYMM. Partitions are created on demand
+-- by the loaders through wf_actuals_ensure_partition, old months are detached or dropped
+-- as a whole (wf_retention) instead of being deleted row by row.
+
+ALTER TABLE public.wf_actuals RENAME TO wf_actuals_legacy;
+ALTER TABLE public.wf_actuals_legacy RENAME CONSTRAINT "PK_wf_actuals" TO "PK_wf_actuals_legacy";
+ALTER TABLE public.wf_actuals_legacy RENAME CONSTRAINT "FK_city_id_cities_wf_actuals" TO "FK_city_id_cities_wf_actuals_legacy";
+
+CREATE TABLE public.wf_actuals
+(
+    timestamp_utc timestamp without time zone NOT NULL,
+    city_id integer NOT NULL,
+    temperature_c numeric NOT NULL,
+    wind_speed numeric,
+    precipitation numeric,
+    CONSTRAINT "PK_wf_actuals" PRIMARY KEY (timestamp_utc, city_id),
+    CONSTRAINT "FK_city_id_cities_wf_actuals" FOREIGN KEY (city_id)
+        REFERENCES public.cities (id)
+        ON UPDATE NO ACTION
+        ON DELETE NO ACTION
+) PARTITION BY RANGE (timestamp_utc);
+
+ALTER TABLE IF EXISTS public.wf_actuals
+    OWNER TO postgres;
+
+COMMENT ON TABLE public.wf_actuals
+    IS 'stores weather forecasts actuals, one partition per month (wf_actuals_pYYYYMM)';
+
+
+-- Creates the partition of the month of `month` if it does not exist yet, returns its name.
+--
+-- The partition is created as a plain table and attached afterwards: ATTACH PARTITION only
+-- takes a SHARE UPDATE EXCLUSIVE lock on wf_actuals, so it does not wait for (or block)
+-- loads running in other transactions, CREATE TABLE ... PARTITION OF would. The range check
+-- added beforehand lets ATTACH skip its validation scan.
+
+CREATE OR REPLACE FUNCTION public.wf_actuals_ensure_partition(month date)
+    RETURNS text
+    LANGUAGE plpgsql
+AS $$
+DECLARE
+    first_day date := date_trunc('month', month)::date;
+    next_day date := (date_trunc('month', month) + interval '1 month')::date;
+    partition_name text := 'wf_actuals_p' || to_char(date_trunc('month', month), 'YYYYMM');
+BEGIN
+    IF to_regclass(format('public.%I', partition_name)) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    -- concurrent loaders of the same month wait here, then find the partition
+    PERFORM pg_advisory_xact_lock(hashtext('wf_actuals_partitions'));
+    IF to_regclass(format('public.%I', partition_name)) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE public.%I (LIKE public.wf_actuals INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        partition_name
+    );
+    EXECUTE format(
+        'ALTER TABLE public.%I ADD CONSTRAINT %I CHECK (timestamp_utc >= %L AND timestamp_utc < %L)',
+        partition_name, partition_name || '_range', first_day, next_day
+    );
+    EXECUTE format(
+        'ALTER TABLE public.wf_actuals ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, first_day, next_day
+    );
+    EXECUTE format('ALTER TABLE public.%I DROP CONSTRAINT %I', partition_name, partition_name || '_range');
+    RETURN partition_name;
+END;
+$$;
+
+ALTER FUNCTION public.wf_actuals_ensure_partition(date)
+    OWNER TO postgres;
+
+
+-- Move the rows already loaded into their monthly partitions
+
+DO $$
+DECLARE
+    loaded_month date;
+BEGIN
+    FOR loaded_month IN
+        SELECT DISTINCT date_trunc('month', timestamp_utc)::date FROM public.wf_actuals_legacy
+    LOOP
+        PERFORM public.wf_actuals_ensure_partition(loaded_month);
+    END LOOP;
+END;
+$$;
+
+INSERT INTO public.wf_actuals (timestamp_utc, city_id, temperature_c, wind_speed, precipitation)
+SELECT timestamp_utc, city_id, temperature_c, wind_speed, precipitation
+FROM public.wf_actuals_legacy;
+
+DROP TABLE public.wf_actuals_legacy;
@@ -0,0 +1,23 @@
+-- Table: public.wf_actuals_staging
+--
+-- Landing table of the merge / upsert load methods: batches are copied here without any
+-- constraint check, then validated against cities and merged into wf_actuals with
+-- INSERT ... ON CONFLICT in one statement that also deletes them. Batches are staged and
+-- merged in the same transaction, so a loader only ever sees its own rows.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS public.wf_actuals_staging
+(
+    timestamp_utc timestamp without time zone,
+    city_id integer,
+    temperature_c numeric,
+    wind_speed numeric,
+    precipitation numeric
+)
+-- every merged batch leaves dead rows behind, vacuum them early to keep the table small
+WITH (autovacuum_vacuum_scale_factor = 0, autovacuum_vacuum_threshold = 100000);
+
+ALTER TABLE IF EXISTS public.wf_actuals_staging
+    OWNER TO postgres;
+
+COMMENT ON TABLE public.wf_actuals_staging
+    IS 'unlogged landing table of bulk loads merged into wf_actuals, empty outside of load transactions';
@@ -0,0 +1,91 @@
+-- Table: public.wf_actuals_daily
+
+CREATE TABLE IF NOT EXISTS public.wf_actuals_daily
+(
+    city_id integer NOT NULL,
+    day date NOT NULL,
+    temperature_min numeric NOT NULL,
+    temperature_max numeric NOT NULL,
+    temperature_avg numeric NOT NULL,
+    wind_speed_min numeric,
+    wind_speed_max numeric,
+    wind_speed_avg numeric,
+    precipitation_total numeric,
+    samples integer NOT NULL,
+    wind_speed_samples integer NOT NULL,
+    updated_at timestamp without time zone NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    CONSTRAINT "PK_wf_actuals_daily" PRIMARY KEY (city_id, day),
+    CONSTRAINT "FK_city_id_cities_wf_actuals_daily" FOREIGN KEY (city_id)
+        REFERENCES public.cities (id)
+        ON UPDATE NO ACTION
+        ON DELETE NO ACTION
+);
+
+ALTER TABLE IF EXISTS public.wf_actuals_daily
+    OWNER TO postgres;
+
+COMMENT ON TABLE public.wf_actuals_daily
+    IS 'daily rollup of wf_actuals per city, refreshed for the days touched by every load';
+
+COMMENT ON COLUMN public.wf_actuals_daily.samples
+    IS 'hourly rows aggregated, 24 for a complete day';
+
+COMMENT ON COLUMN public.wf_actuals_daily.wind_speed_samples
+    IS 'hourly rows with a wind speed, weight of wind_speed_avg in the monthly rollup';
+
+
+-- Table: public.wf_actuals_monthly
+
+CREATE TABLE IF NOT EXISTS public.wf_actuals_monthly
+(
+    city_id integer NOT NULL,
+    month date NOT NULL,
+    temperature_min numeric NOT NULL,
+    temperature_max numeric NOT NULL,
+    temperature_avg numeric NOT NULL,
+    wind_speed_min numeric,
+    wind_speed_max numeric,
+    wind_speed_avg numeric,
+    precipitation_total numeric,
+    samples integer NOT NULL,
+    wind_speed_samples integer NOT NULL,
+    updated_at timestamp without time zone NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    CONSTRAINT "PK_wf_actuals_monthly" PRIMARY KEY (city_id, month),
+    CONSTRAINT "FK_city_id_cities_wf_actuals_monthly" FOREIGN KEY (city_id)
+        REFERENCES public.cities (id)
+        ON UPDATE NO ACTION
+        ON DELETE NO ACTION
+);
+
+ALTER TABLE IF EXISTS public.wf_actuals_monthly
+    OWNER TO postgres;
+
+COMMENT ON TABLE public.wf_actuals_monthly
+    IS 'monthly rollup of wf_actuals_daily per city, refreshed for the months touched by every load';
+
+COMMENT ON COLUMN public.wf_actuals_monthly.month
+    IS 'first day of the month';
+
+
+-- Backfill the rollups from the rows already loaded, months are rolled up from days
+
+INSERT INTO public.wf_actuals_daily (
+    city_id, day, temperature_min, temperature_max, temperature_avg,
+    wind_speed_min, wind_speed_max, wind_speed_avg, precipitation_total, samples, wind_speed_samples
+)
+SELECT city_id, timestamp_utc::date, min(temperature_c), max(temperature_c), avg(temperature_c),
+       min(wind_speed), max(wind_speed), avg(wind_speed), sum(precipitation), count(*), count(wind_speed)
+FROM public.wf_actuals
+GROUP BY 1, 2;
+
+INSERT INTO public.wf_actuals_monthly (
+    city_id, month, temperature_min, temperature_max, temperature_avg,
+    wind_speed_min, wind_speed_max, wind_speed_avg, precipitation_total, samples, wind_speed_samples
+)
+SELECT city_id, date_trunc('month', day)::date, min(temperature_min), max(temperature_max),
+       sum(temperature_avg * samples) / sum(samples),
+       min(wind_speed_min), max(wind_speed_max),
+       sum(wind_speed_avg * wind_speed_samples) / nullif(sum(wind_speed_samples), 0),
+       sum(precipitation_total), sum(samples), sum(wind_speed_samples)
+FROM public.wf_actuals_daily
+GROUP BY 1, 2;
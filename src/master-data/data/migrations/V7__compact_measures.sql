@@ -0,0 +1,42 @@
+-- Compact fixed-width layout of wf_actuals and cities
+--
+-- Measures move from unbounded numeric (variable length, 5 to 8 bytes each plus a
+-- length header) to real (float4, 4 bytes). A wf_actuals row now holds 24 bytes of
+-- data (timestamp 8, city_id 4, three measures 4 each), 48 bytes with its tuple
+-- header, every row has the same width.
+--
+-- Precision: real keeps 6 significant decimal digits. Open-Meteo publishes the
+-- measures with one decimal (temperature in °C, wind speed in km/h, precipitation
+-- in mm), they round-trip exactly when read back with at most 6 significant digits,
+-- e.g. -12.3, 145.7, 0.1 (which is what Postgres prints for real values).
+--
+-- A scaled smallint (tenths) would save no space: rows are 8 byte aligned and would
+-- still take 48 bytes.
+--
+-- City coordinates move to double precision (float8), read back as Python floats
+-- instead of Decimal objects.
+--
+-- Rewrites wf_actuals and all its partitions under an exclusive lock.
+
+ALTER TABLE public.wf_actuals
+    ALTER COLUMN temperature_c TYPE real,
+    ALTER COLUMN wind_speed TYPE real,
+    ALTER COLUMN precipitation TYPE real;
+
+ALTER TABLE public.wf_actuals_staging
+    ALTER COLUMN temperature_c TYPE real,
+    ALTER COLUMN wind_speed TYPE real,
+    ALTER COLUMN precipitation TYPE real;
+
+ALTER TABLE public.cities
+    ALTER COLUMN longitude TYPE double precision,
+    ALTER COLUMN latitude TYPE double precision;
+
+COMMENT ON COLUMN public.wf_actuals.temperature_c
+    IS 'air temperature at 2 m in °C, real (6 significant digits, published with 1 decimal)';
+
+COMMENT ON COLUMN public.wf_actuals.wind_speed
+    IS 'wind speed at 10 m in km/h, real (6 significant digits, published with 1 decimal)';
+
+COMMENT ON COLUMN public.wf_actuals.precipitation
+    IS 'precipitation in mm, real (6 significant digits, published with 1 decimal)';
@@ -0,0 +1,13 @@
+-- Index: public.IX_wf_actuals_brin, block range index of wf_actuals for range reads
+--
+-- wf_actuals rows are appended and never moved, so neighbouring pages hold neighbouring
+-- hours (incremental loads, one day of every city after the other) or neighbouring cities
+-- (backfills, the months of a location batch after the other). A BRIN index keeps the
+-- min / max timestamp_utc and city_id of every 16 pages, a few kB per partition against
+-- megabytes for a btree, and lets time range and city set reads skip the page ranges
+-- that cannot match. Created on the parent, every partition (existing or created by
+-- wf_actuals_ensure_partition) gets its own.
+
+CREATE INDEX IF NOT EXISTS "IX_wf_actuals_brin"
+    ON public.wf_actuals USING brin (timestamp_utc, city_id)
+    WITH (pages_per_range = 16);
@@ -0,0 +1,102 @@
+"""
+Benchmark of reading a weather CSV from Azure Blob Storage against reading it through a CSI mount.
+
+Compares, on the same file:
+- blob-readall: the former `importer.azblobclient` path (whole blob downloaded, decoded and split in memory)
+- blob-ranged:  the streaming parallel byte-range reader of `importer.azblobclient`
+- csi-mount:    the local filesystem read used by `importer.py` (the blob mounted by the CSI driver)
+
+Every reader runs in its own process and parses the rows with csv.DictReader, the
+benchmark prints wall time, throughput and peak RSS of each one.
+
+Usage (from src/master-data/staging, against Azurite, see docker-compose.obsolete.yml):
+    export AZ_BLOB_CONNECTION_STRING="DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey=...;BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+    python benchmarks/blob_csv_read.py --file data/imports/weather_hourly-full.csv --upload
+"""
+import argparse
+import csv
+import importlib.util
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+from config import AZ_BLOB_CONNECTION_STRING, AZ_BLOB_CONTAINER, AZ_BLOB_DOWNLOAD_CHUNK_BYTES, AZ_BLOB_DOWNLOAD_CONCURRENCY  # noqa: E402
+
+READERS = ("blob-readall", "blob-ranged", "csi-mount")
+
+
+def _azblobclient():
+    # the module name contains a dot, it cannot be imported by name
+    path = os.path.join(SRC, "pipeline", "importer.azblobclient.py")
+    spec = importlib.util.spec_from_file_location("importer_azblobclient", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _rows(reader: str, blob: str, path: str, chunk_bytes: int, concurrency: int):
+    if reader == "csi-mount":
+        from pipeline import compression
+        with compression.open_text(path) as f:
+            yield from csv.DictReader(f)
+        return
+    azblobclient = _azblobclient()
+    if reader == "blob-ranged":
+        yield from azblobclient._read_csv_from_blob(blob, chunk_bytes, concurrency)
+        return
+    text = azblobclient._blob_client(blob).download_blob().readall().decode("utf-8")
+    yield from list(csv.DictReader(text.splitlines()))
+
+
+def _run(reader: str, blob: str, path: str, chunk_bytes: int, concurrency: int, results) -> None:
+    begin = time.perf_counter()
+    rows = sum(1 for _ in _rows(reader, blob, path, chunk_bytes, concurrency))
+    elapsed = time.perf_counter() - begin
+    results.put((rows, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def main():
+    p = argparse.ArgumentParser(prog="blob-csv-read-benchmark")
+    p.add_argument("--file", required=True, help="Local (or CSI-mounted) path of the CSV")
+    p.add_argument("--blob", help=f"Blob name of the same CSV in the {AZ_BLOB_CONTAINER} container (defaults to the file name)")
+    p.add_argument("--upload", action="store_true", default=False, help="Upload --file to the blob first")
+    p.add_argument("--readers", nargs="+", choices=READERS, default=list(READERS))
+    p.add_argument("--chunk-mb", type=float, default=AZ_BLOB_DOWNLOAD_CHUNK_BYTES / 2**20)
+    p.add_argument("--concurrency", type=int, default=AZ_BLOB_DOWNLOAD_CONCURRENCY)
+    args = p.parse_args()
+
+    blob = args.blob or os.path.basename(args.file)
+    if args.upload:
+        from azure.storage.blob import BlobServiceClient
+        if not AZ_BLOB_CONNECTION_STRING:
+            raise SystemExit("AZ_BLOB_CONNECTION_STRING environment variable not set")
+        service = BlobServiceClient.from_connection_string(AZ_BLOB_CONNECTION_STRING)
+        container_client = service.get_container_client(AZ_BLOB_CONTAINER)
+        if not container_client.exists():
+            container_client.create_container()
+        with open(args.file, "rb") as data:
+            container_client.upload_blob(blob, data, overwrite=True)
+        print(f"Uploaded {args.file} to {AZ_BLOB_CONTAINER}/{blob}")
+
+    size_mb = os.path.getsize(args.file) / 2**20
+    chunk_bytes = int(args.chunk_mb * 2**20)
+    print(f"{size_mb:.1f} MB, ranges of {args.chunk_mb:g} MB, {args.concurrency} parallel downloads")
+
+    # a fresh process per reader so peak RSS is not inherited from the previous one
+    context = multiprocessing.get_context("spawn")
+    for reader in args.readers:
+        results = context.Queue()
+        process = context.Process(target=_run, args=(reader, blob, args.file, chunk_bytes, args.concurrency, results))
+        process.start()
+        rows, elapsed, peak_mb = results.get()
+        process.join()
+        print(f"{reader:>12}: {rows} rows in {elapsed:.2f}s ({size_mb / elapsed:.1f} MB/s), peak RSS {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark of the wf_actuals storage layouts: numeric measures (V1) against real measures (V7).
+
+Fills two scratch tables with the same synthetic hourly rows (SQL generated, measures
+with one decimal like Open-Meteo), then prints the size of each table and of its
+primary key index, and the best wall time of a full scan aggregating the measures
+per city (warm cache). The scratch schema is dropped afterwards unless --keep is set.
+
+Usage (from src/master-data/staging, against any Postgres database):
+    python benchmarks/wf_actuals_layout.py --rows 5000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import psycopg2  # noqa: E402
+
+from config import POSTGRES_DSN  # noqa: E402
+
+SCHEMA = "wf_layout_benchmark"
+LAYOUTS = {"numeric": "numeric", "real": "real"}
+SCAN = """
+    SELECT city_id, min(temperature_c), max(temperature_c), avg(temperature_c),
+           max(wind_speed), sum(precipitation)
+    FROM {table} GROUP BY city_id
+"""
+
+
+def create(cur, name: str, measure_type: str, rows: int, cities: int) -> None:
+    table = f"{SCHEMA}.wf_actuals_{name}"
+    cur.execute(f"""
+        CREATE TABLE {table} (
+            timestamp_utc timestamp without time zone NOT NULL,
+            city_id integer NOT NULL,
+            temperature_c {measure_type} NOT NULL,
+            wind_speed {measure_type},
+            precipitation {measure_type},
+            PRIMARY KEY (timestamp_utc, city_id)
+        )
+    """)
+    cur.execute(f"""
+        INSERT INTO {table}
+        SELECT timestamp '2020-01-01' + (i / %(cities)s) * interval '1 hour',
+               i %% %(cities)s,
+               round((-10 + (i %% 400) * 0.1)::numeric, 1),
+               round(((i %% 150) * 0.1)::numeric, 1),
+               round(((i %% 30) * 0.1)::numeric, 1)
+        FROM generate_series(0, %(rows)s - 1) AS i
+    """, {"rows": rows, "cities": cities})
+    cur.execute(f"VACUUM ANALYZE {table}")
+
+
+def sizes(cur, name: str):
+    cur.execute(
+        "SELECT pg_relation_size(%s), pg_indexes_size(%s)",
+        (f"{SCHEMA}.wf_actuals_{name}", f"{SCHEMA}.wf_actuals_{name}")
+    )
+    return cur.fetchone()
+
+
+def best_scan(cur, name: str, repeat: int) -> float:
+    query = SCAN.format(table=f"{SCHEMA}.wf_actuals_{name}")
+    cur.execute(query)  # warm the cache
+    times = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        cur.execute(query)
+        cur.fetchall()
+        times.append(time.perf_counter() - begin)
+    return min(times)
+
+
+def main():
+    p = argparse.ArgumentParser(prog="wf-actuals-layout-benchmark")
+    p.add_argument("--rows", type=int, default=5_000_000)
+    p.add_argument("--cities", type=int, default=1000)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--dsn", default=POSTGRES_DSN)
+    p.add_argument("--keep", action="store_true", default=False, help="Keep the scratch tables")
+    args = p.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    print(f"{args.rows} rows, {args.cities} cities")
+    try:
+        results = {}
+        for name, measure_type in LAYOUTS.items():
+            create(cur, name, measure_type, args.rows, args.cities)
+            table_bytes, index_bytes = sizes(cur, name)
+            results[name] = (table_bytes, index_bytes, best_scan(cur, name, args.repeat))
+
+        base_table, _, base_scan = results["numeric"]
+        for name, (table_bytes, index_bytes, scan) in results.items():
+            print(
+                f"{name:<8} table {table_bytes / 2**20:>9.1f} MB ({table_bytes / args.rows:5.1f} B/row, "
+                f"{table_bytes / base_table:4.0%}), primary key {index_bytes / 2**20:>8.1f} MB, "
+                f"full scan {scan:>6.2f}s ({base_scan / scan:4.2f}x)"
+            )
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
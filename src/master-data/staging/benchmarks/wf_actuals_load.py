@@ -0,0 +1,67 @@
+"""
+Benchmark of the wf_actuals bulk load methods of WeatherForecastPgDbAdapter.
+
+Loads the same synthetic hourly rows with every method (INSERT via execute_values,
+COPY text, COPY binary) into the database pointed by POSTGRES_DSN and prints rows/second.
+Each method writes its own time window, far in the past, whose monthly partitions are
+dropped afterwards unless --keep is set.
+
+Usage (from src/master-data/staging, against a migrated database with cities):
+    python benchmarks/wf_actuals_load.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from adapters import WeatherForecastPgDbAdapter, LOAD_METHODS  # noqa: E402
+from config import POSTGRES_DSN  # noqa: E402
+
+
+def synthetic_rows(city_ids, rows: int, start: datetime):
+    """Hourly samples cycling over the cities, timestamps advance once every city got one."""
+    per_hour = len(city_ids)
+    for i in range(rows):
+        hour, idx = divmod(i, per_hour)
+        yield (
+            start + timedelta(hours=hour),
+            city_ids[idx],
+            round(-10 + (i % 400) * 0.1, 1),
+            round((i % 150) * 0.1, 1),
+            round((i % 30) * 0.1, 1)
+        )
+
+
+def main():
+    p = argparse.ArgumentParser(prog="wf-actuals-load-benchmark")
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--methods", nargs="+", choices=LOAD_METHODS, default=list(LOAD_METHODS))
+    p.add_argument("--dsn", default=POSTGRES_DSN)
+    p.add_argument("--keep", action="store_true", default=False, help="Keep the loaded rows")
+    args = p.parse_args()
+
+    adapter = WeatherForecastPgDbAdapter(args.dsn)
+    city_ids = [r["id"] for r in adapter.read_all_cities()]
+    if not city_ids:
+        raise SystemExit("Benchmark requires at least one city in the cities table")
+
+    hours = (args.rows + len(city_ids) - 1) // len(city_ids)
+    print(f"{args.rows} rows, {len(city_ids)} cities, {hours} hours per method")
+
+    # every method writes its own window far in the past so primary keys never collide
+    for offset, method in enumerate(args.methods):
+        start = datetime(1000, 1, 1) + timedelta(hours=hours * offset)
+        begin = time.perf_counter()
+        loaded = adapter.load_wfactuals(synthetic_rows(city_ids, args.rows, start), method=method)
+        elapsed = time.perf_counter() - begin
+        print(f"{method:<12} {loaded:>10} rows {elapsed:>8.2f}s {loaded / elapsed:>12,.0f} rows/s")
+
+    if not args.keep:
+        adapter.drop_partitions_before(date(1900, 1, 1))
+
+
+if __name__ == "__main__":
+    main()
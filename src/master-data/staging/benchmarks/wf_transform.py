@@ -0,0 +1,91 @@
+"""
+Benchmark of the transform of Open-Meteo hourly responses into wf_actuals COPY data.
+
+Compares, on synthetic responses and without any database, the CPU time per million
+samples of:
+- rows: per-sample tuples encoded row by row (the historical path)
+- columns: the columnar transform of `pipeline.transform` encoded column-wise
+
+Each path is timed for the transform alone, then for the transform and the COPY
+(text / binary) encoding.
+
+Usage (from src/master-data/staging):
+    python benchmarks/wf_transform.py --locations 100 --days 420
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from adapters.db_adapter import _copy_binary_chunks, _copy_binary_columns, _copy_text_chunks, _copy_text_columns  # noqa: E402
+from pipeline.grid import GridCell, Location  # noqa: E402
+from pipeline.transform import cell_block, hourly_columns  # noqa: E402
+
+import numpy as np  # noqa: E402
+
+
+def synthetic_response(locations: int, days: int):
+    hours = days * 24
+    start = datetime(2024, 1, 1)
+    times = [(start + timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(hours)]
+    return [
+        {
+            "hourly": {
+                "time": times,
+                "temperature_2m": [round(-10 + ((h + i) % 400) * 0.1, 1) for h in range(hours)],
+                "wind_speed_10m": [round(((h + i) % 150) * 0.1, 1) if h % 97 else None for h in range(hours)],
+                "precipitation": [round(((h + i) % 30) * 0.1, 1) for h in range(hours)],
+            }
+        }
+        for i in range(locations)
+    ]
+
+
+def rows_path(cells, data, encode_chunks):
+    rows = []
+    for cell, location_data in zip(cells, data):
+        hourly = location_data["hourly"]
+        for member in cell.members:
+            for t, temp, wind, rain in zip(
+                hourly["time"], hourly["temperature_2m"], hourly["wind_speed_10m"], hourly["precipitation"]
+            ):
+                if temp is not None:
+                    rows.append((t, member.city_id, temp, wind, rain))
+    return encode_chunks and b"".join(encode_chunks(rows)), len(rows)
+
+
+def columns_path(cells, data, encode_columns):
+    blocks = [cell_block(cell, hourly_columns(location_data))[0] for cell, location_data in zip(cells, data)]
+    columns = [np.concatenate(column) for column in zip(*blocks)]
+    return encode_columns and encode_columns(columns), len(columns[0])
+
+
+def main():
+    p = argparse.ArgumentParser(prog="wf-transform-benchmark")
+    p.add_argument("--locations", type=int, default=100)
+    p.add_argument("--days", type=int, default=420)
+    args = p.parse_args()
+
+    data = synthetic_response(args.locations, args.days)
+    cells = [GridCell(i, i, [Location(i + 1, i, i)]) for i in range(args.locations)]
+    print(f"{args.locations} locations x {args.days} days = {args.locations * args.days * 24} samples")
+
+    for name, run, encoder in (
+        ("rows", rows_path, None),
+        ("columns", columns_path, None),
+        ("rows copy", rows_path, _copy_text_chunks),
+        ("columns copy", columns_path, _copy_text_columns),
+        ("rows binary", rows_path, _copy_binary_chunks),
+        ("columns binary", columns_path, _copy_binary_columns),
+    ):
+        begin = time.process_time()
+        payload, rows = run(cells, data, encoder)
+        elapsed = time.process_time() - begin
+        print(f"{name:<16} {rows:>10} rows {elapsed:>8.2f}s CPU {elapsed * 1_000_000 / rows:>8.2f}s per million samples")
+
+
+if __name__ == "__main__":
+    main()
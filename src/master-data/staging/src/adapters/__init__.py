@@ -1,3 +1,3 @@
-from .db_adapter import WeatherForecastPgDbAdapter
+from .db_adapter import WeatherForecastPgDbAdapter, WfActualsBlock, WF_ACTUALS_COLUMNS, LOAD_METHODS, MERGE_METHODS, SKIP_EXISTING_METHODS
 
-__all__ = ["WeatherForecastPgDbAdapter"]
\ No newline at end of file
+__all__ = ["WeatherForecastPgDbAdapter", "WfActualsBlock", "WF_ACTUALS_COLUMNS", "LOAD_METHODS", "MERGE_METHODS", "SKIP_EXISTING_METHODS"]
\ No newline at end of file
@@ -1,26 +1,531 @@
+import inspect
+import io
+import struct
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import wraps
+from itertools import count, groupby, repeat
+import numpy as np
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 from psycopg2 import sql
-from typing import List, Dict, Any, Iterable
+from typing import List, Dict, Any, Callable, Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+import telemetry
+
+# column order of the positional rows accepted by the bulk load methods
+WF_ACTUALS_COLUMNS = ("timestamp_utc", "city_id", "temperature_c", "wind_speed", "precipitation")
+
+# merge / upsert stage rows in the unlogged wf_actuals_staging table, then merge them
+# with INSERT ... ON CONFLICT DO NOTHING / DO UPDATE
+MERGE_METHODS = ("merge", "upsert")
+LOAD_METHODS = ("insert", "copy", "copy_binary") + MERGE_METHODS
+# load methods that can skip the rows already in wf_actuals (re-runs, incremental imports)
+SKIP_EXISTING_METHODS = ("insert",) + MERGE_METHODS
+
+# wf_actuals is range partitioned by month, one wf_actuals_pYYYYMM partition per month
+WF_ACTUALS_PARTITION_PREFIX = "wf_actuals_p"
+
+# wf_actuals_daily aggregates hourly rows (aliased `a`), wf_actuals_monthly aggregates
+# daily rows (aliased `d`), both tables have the same columns
+_ROLLUP_COLUMNS = (
+    "city_id, {bucket}, temperature_min, temperature_max, temperature_avg, wind_speed_min, wind_speed_max, "
+    "wind_speed_avg, precipitation_total, samples, wind_speed_samples"
+)
+# real measures are summed as numeric, their 1 decimal values add up exactly
+_DAILY_AGGREGATES = (
+    "min(a.temperature_c), max(a.temperature_c), avg(a.temperature_c::numeric), "
+    "min(a.wind_speed), max(a.wind_speed), avg(a.wind_speed::numeric), sum(a.precipitation::numeric), "
+    "count(*), count(a.wind_speed)"
+)
+_MONTHLY_AGGREGATES = (
+    "min(d.temperature_min), max(d.temperature_max), sum(d.temperature_avg * d.samples) / sum(d.samples), "
+    "min(d.wind_speed_min), max(d.wind_speed_max), "
+    "sum(d.wind_speed_avg * d.wind_speed_samples) / nullif(sum(d.wind_speed_samples), 0), "
+    "sum(d.precipitation_total), sum(d.samples), sum(d.wind_speed_samples)"
+)
+_ROLLUP_UPDATE = (
+    "temperature_min = EXCLUDED.temperature_min, temperature_max = EXCLUDED.temperature_max, "
+    "temperature_avg = EXCLUDED.temperature_avg, wind_speed_min = EXCLUDED.wind_speed_min, "
+    "wind_speed_max = EXCLUDED.wind_speed_max, wind_speed_avg = EXCLUDED.wind_speed_avg, "
+    "precipitation_total = EXCLUDED.precipitation_total, samples = EXCLUDED.samples, "
+    "wind_speed_samples = EXCLUDED.wind_speed_samples, updated_at = now() AT TIME ZONE 'utc'"
+)
+
+# names of the server-side cursors of read_wfactuals, unique per process
+_read_cursor_ids = count()
+
+_PG_EPOCH = datetime(2000, 1, 1)
+_COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_COPY_BINARY_TRAILER = struct.pack("!h", -1)
+
+
+def _copy_text_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return str(value)
+
+
+# binary field encoders return the length-prefixed field
+def _encode_timestamp(value) -> bytes:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    delta = value - _PG_EPOCH
+    return struct.pack("!iq", 8, (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+
+
+def _encode_int4(value) -> bytes:
+    return struct.pack("!ii", 4, value)
+
+
+def _encode_float4(value) -> bytes:
+    # measures are stored as real (migration V7)
+    return struct.pack("!if", 4, value)
+
+
+# binary encoders in WF_ACTUALS_COLUMNS order
+_WF_ACTUALS_BINARY_ENCODERS = (_encode_timestamp, _encode_int4, _encode_float4, _encode_float4, _encode_float4)
+
+
+class _CopyStream(io.RawIOBase):
+    """Read-only file object producing COPY data lazily from an iterator of encoded chunks."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._pending = bytearray()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while len(self._pending) < len(buffer):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._pending += chunk
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        del self._pending[:size]
+        return size
+
+
+def _counted(rows: Iterable[Sequence[Any]], counter: List[int]) -> Iterator[Sequence[Any]]:
+    for row in rows:
+        counter[0] += 1
+        yield row
+
+
+def _copy_text_chunks(rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    for row in rows:
+        yield ("\t".join(_copy_text_value(v) for v in row) + "\n").encode("utf-8")
+
+
+def _copy_binary_chunks(rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    field_count = struct.pack("!h", len(_WF_ACTUALS_BINARY_ENCODERS))
+    null = struct.pack("!i", -1)
+    yield _COPY_BINARY_HEADER
+    for row in rows:
+        yield field_count + b"".join(
+            null if value is None else encode(value)
+            for encode, value in zip(_WF_ACTUALS_BINARY_ENCODERS, row)
+        )
+    yield _COPY_BINARY_TRAILER
+
+
+def _distinct(column: np.ndarray):
+    """Distinct values of a column and the index of every row in them.
+
+    Weather columns sit on a regular step (hourly timestamps, city ids, measures with
+    at most 3 decimals): their values are mapped to dense integer codes in linear time.
+    Other columns fall back to the sort of `np.unique`.
+    """
+    valid = None
+    if column.dtype.kind == "M":
+        ints = column.view(np.int64)
+    elif column.dtype.kind in "iu":
+        ints = column.astype(np.int64)
+    else:
+        valid = ~np.isnan(column)
+        finite = column[valid]
+        for decimals in range(4):
+            scaled = np.round(finite * 10 ** decimals)
+            if np.array_equal(scaled / 10 ** decimals, finite):
+                break
+        else:
+            return _sorted_distinct(column)
+        ints = np.zeros(len(column), dtype=np.int64)
+        ints[valid] = scaled
+
+    offsets = ints - ints.min()
+    codes = offsets // (int(np.gcd.reduce(offsets)) or 1)
+    top = int(codes.max())
+    if top > 4 * len(column) + 1024:
+        return _sorted_distinct(column)
+    if valid is not None:
+        # NaN gets its own code
+        top += 1
+        codes[~valid] = top
+
+    first = np.full(top + 1, -1, dtype=np.int64)
+    first[codes[::-1]] = np.arange(len(column) - 1, -1, -1)
+    present = np.flatnonzero(first >= 0)
+    remap = np.empty(top + 1, dtype=np.int64)
+    remap[present] = np.arange(len(present))
+    return column[first[present]], remap[codes]
+
+
+def _sorted_distinct(column: np.ndarray):
+    values, inverse = np.unique(column, return_inverse=True)
+    return values, inverse.reshape(-1)
+
+
+def _encoded_column(column: np.ndarray, encode, null) -> np.ndarray:
+    """Encode every distinct value of a column once, then gather the encodings. NaN is null."""
+    values, inverse = _distinct(column)
+    encoded = np.empty(len(values), dtype=object)
+    encoded[:] = [null if v is None or v != v else encode(v) for v in values.tolist()]
+    return encoded[inverse]
+
+
+def _copy_text_columns(columns: Sequence[np.ndarray]) -> bytes:
+    fields = [_encoded_column(c, _copy_text_value, "\\N").tolist() for c in columns]
+    return ("\n".join(map("\t".join, zip(*fields))) + "\n").encode("utf-8")
+
+
+def _copy_binary_columns(columns: Sequence[np.ndarray]) -> bytes:
+    null = struct.pack("!i", -1)
+    fields = [
+        _encoded_column(c, encode, null).tolist()
+        for encode, c in zip(_WF_ACTUALS_BINARY_ENCODERS, columns)
+    ]
+    field_count = struct.pack("!h", len(fields))
+    return b"".join((_COPY_BINARY_HEADER, *map(b"".join, zip(repeat(field_count), *fields)), _COPY_BINARY_TRAILER))
+
+
+def _month_of(timestamp) -> date:
+    if isinstance(timestamp, str):
+        # ISO timestamps, as read from the weather CSV
+        return date(int(timestamp[:4]), int(timestamp[5:7]), 1)
+    return date(timestamp.year, timestamp.month, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"{WF_ACTUALS_PARTITION_PREFIX}{month.year:04d}{month.month:02d}"
+
+
+def _partition_month(name: str) -> Optional[date]:
+    digits = name[len(WF_ACTUALS_PARTITION_PREFIX):]
+    if not name.startswith(WF_ACTUALS_PARTITION_PREFIX) or len(digits) < 6 or not digits.isdigit():
+        return None
+    return date(int(digits[:-2]), int(digits[-2:]), 1)
+
+
+def _month_runs(rows: Iterable[Sequence[Any]]) -> Iterator[Tuple[date, Iterable[Sequence[Any]]]]:
+    """(month, rows) groups of positional rows by month of their timestamp.
+
+    A list is grouped whole, one group per month. Other iterables stay lazy and are
+    split into runs of consecutive rows of the same month.
+    """
+    if isinstance(rows, list):
+        groups: Dict[date, List[Sequence[Any]]] = {}
+        for row in rows:
+            groups.setdefault(_month_of(row[0]), []).append(row)
+        return iter(groups.items())
+    return groupby(rows, key=lambda row: _month_of(row[0]))
+
+
+def _column_months(timestamps: np.ndarray) -> List[date]:
+    return [month.item() for month in np.unique(timestamps.astype("datetime64[M]"))]
+
+
+def _month_blocks(columns: Sequence[np.ndarray]) -> Iterator[Tuple[date, Sequence[np.ndarray]]]:
+    """(month, columns) slices of column arrays by month of their timestamp column."""
+    months = columns[0].astype("datetime64[M]")
+    if (months == months[0]).all():
+        yield months[0].item(), columns
+        return
+    distinct, inverse = np.unique(months, return_inverse=True)
+    for index, month in enumerate(distinct):
+        keep = inverse == index
+        yield month.item(), [c[keep] for c in columns]
+
+
+# load methods running in the thread, load_wfactuals_columns hands INSERT loads to load_wfactuals
+_loading = threading.local()
+
+
+def _instrumented_load(load):
+    """Record the duration and rows of a wf_actuals load method (wf_db_load_* metrics, wf.db.load span)."""
+    signature = inspect.signature(load)
+
+    @wraps(load)
+    def instrumented(self, *args, **kwargs):
+        if not telemetry.enabled() or getattr(_loading, "active", False):
+            return load(self, *args, **kwargs)
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        method = arguments.arguments.get("method", "insert")
+        _loading.active = True
+        try:
+            with telemetry.timed("wf_db_load_seconds", "wf.db.load", method=method):
+                rows = load(self, *args, **kwargs)
+        finally:
+            _loading.active = False
+        telemetry.increment("wf_db_load_rows_total", rows, method=method)
+        return rows
+    return instrumented
+
+
+class WfActualsBlock(NamedTuple):
+    """Columns of wf_actuals rows read back, in WF_ACTUALS_COLUMNS order."""
+    timestamp_utc: np.ndarray  # datetime64[s]
+    city_id: np.ndarray  # int32
+    temperature_c: np.ndarray  # float64
+    wind_speed: np.ndarray  # float64, NaN is null
+    precipitation: np.ndarray  # float64, NaN is null
+
+
+def _wf_actuals_block(rows: List[Tuple]) -> WfActualsBlock:
+    epochs, city_ids, temperatures, wind_speeds, precipitations = zip(*rows)
+    return WfActualsBlock(
+        np.array(epochs, dtype=np.int64).astype("datetime64[s]"),
+        np.array(city_ids, dtype=np.int32),
+        np.array(temperatures, dtype=np.float64),
+        np.array(wind_speeds, dtype=np.float64),
+        np.array(precipitations, dtype=np.float64),
+    )
+
+
+class _Session:
+    def __init__(self, conn, commit_every: Optional[int], single_transaction: bool, on_commit):
+        self.conn = conn
+        self.commit_every = commit_every
+        self.single_transaction = single_transaction
+        self.on_commit = on_commit
+        self.pending_rows = 0
+        # inside `transaction()`: the write calls are committed together when it exits
+        self.grouped = False
+        # partitions that received merged rows, analyzed when the session ends
+        self.merged_months = set()
+
+    def commit(self) -> None:
+        self.conn.commit()
+        self.pending_rows = 0
+        if self.on_commit is not None:
+            self.on_commit()
+
+    def maybe_commit(self) -> None:
+        if self.single_transaction or self.grouped:
+            return
+        if not self.commit_every or self.pending_rows >= self.commit_every:
+            self.commit()
 
 
 class WeatherForecastPgDbAdapter:
     BULK_THRESHOLD = 1000
+    COPY_BUFFER_SIZE = 1 << 16
+    READ_FETCH_ROWS = 50000
 
-    def __init__(self, dsn: str):
+    def __init__(self, dsn: str, pool_size: int = 0):
         """
         :param dsn: psycopg2 DSN string
+        :param pool_size: when > 0, connections are kept in a thread-safe pool of at most
+            `pool_size` connections instead of being opened for every call
         """
         self._dsn = dsn
+        self._pool_size = pool_size
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # callers wait for a free connection instead of failing once the pool is exhausted
+        self._pool_slots = threading.BoundedSemaphore(pool_size) if pool_size > 0 else None
+        self._local = threading.local()
+        # months whose wf_actuals partition is known to exist
+        self._partitions = set()
+        self._partitions_lock = threading.Lock()
+        # staged, rejected and inserted or updated rows of the merge load methods
+        self._merge_counts = [0, 0, 0]
+        self._merge_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+    def _acquire(self):
+        if self._pool_size <= 0:
+            return psycopg2.connect(self._dsn)
+        self._pool_slots.acquire()
+        try:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = psycopg2.pool.ThreadedConnectionPool(1, self._pool_size, self._dsn)
+            return self._pool.getconn()
+        except BaseException:
+            self._pool_slots.release()
+            raise
+
+    def _release(self, conn) -> None:
+        if self._pool_slots is None:
+            conn.close()
+            return
+        try:
+            if self._pool is not None:
+                self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._pool_slots.release()
+
+    @contextmanager
+    def session(
+        self,
+        commit_every: Optional[int] = None,
+        single_transaction: bool = False,
+        on_commit: Optional[Callable[[], None]] = None
+    ):
+        """Pin one connection to the calling thread for every adapter call made in the block.
+
+        - default: each write call is committed on its own (same as calls outside a session)
+        - commit_every=N: commit once at least N rows were written since the last commit
+        - single_transaction: commit only when the block exits successfully
+
+        `on_commit` is called after every commit, e.g. to checkpoint what became durable.
+        On error the uncommitted work is rolled back. Sessions are per thread, so
+        concurrent writers sharing the adapter each get their own pooled connection.
+        """
+        if getattr(self._local, "session", None) is not None:
+            raise RuntimeError("A database session is already open in this thread")
+        conn = self._acquire()
+        session = _Session(conn, commit_every, single_transaction, on_commit)
+        self._local.session = session
+        try:
+            yield self
+            session.commit()
+            if session.merged_months:
+                with conn.cursor() as cur:
+                    self._analyze_partitions(cur, session.merged_months)
+                conn.commit()
+        except BaseException:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self._local.session = None
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Make the write calls of the block one unit of work of the thread session.
+
+        Nothing is committed before the block exits, then the session commits as it would
+        after a single write call of all the block rows (right away by default, once
+        `commit_every` rows are pending, or at the end of a single transaction session).
+        Outside a session the block runs in its own single transaction session. Nested
+        blocks belong to the outer one.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            with self.session(single_transaction=True):
+                yield self
+            return
+        if session.grouped:
+            yield self
+            return
+        session.grouped = True
+        try:
+            yield self
+        finally:
+            session.grouped = False
+        session.maybe_commit()
 
+    @contextmanager
+    def _cursor(self, rows=None, **cursor_kwargs):
+        """Cursor bound to the thread session if any, otherwise to a connection committed on exit.
+
+        `rows` is a one element list the caller fills with the number of written rows,
+        used by sessions opened with `commit_every`. Calls without `rows` (reads) never commit.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            conn = self._acquire()
+            try:
+                with conn:
+                    with conn.cursor(**cursor_kwargs) as cur:
+                        yield cur
+            finally:
+                self._release(conn)
+            return
+
+        with session.conn.cursor(**cursor_kwargs) as cur:
+            yield cur
+        if rows is None:
+            return
+        session.pending_rows += rows[0]
+        session.maybe_commit()
 
     def read_all_cities(self) -> List[Dict[str, Any]]:
-        """Return all cities as list of dicts with latitude/longitude and id."""
-        query = "SELECT id, name, longitude, latitude FROM cities"
-        with psycopg2.connect(self._dsn) as conn:
-            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute(query)
-                return cur.fetchall()
+        """Return all cities as list of dicts with latitude/longitude (floats) and id."""
+        # cast: the coordinates are numeric (Decimal) until migration V7 is applied
+        query = "SELECT id, name, longitude::float8 AS longitude, latitude::float8 AS latitude FROM cities"
+        with self._cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(query)
+            return cur.fetchall()
+
+    def read_wfactuals(
+        self,
+        from_ts,
+        to_ts,
+        city_ids: Optional[Iterable[int]] = None,
+        fetch_size: Optional[int] = None,
+        ordered: bool = False
+    ) -> Iterator[WfActualsBlock]:
+        """Stream the wf_actuals rows of [from_ts, to_ts) as column blocks of `fetch_size` rows.
+
+        `from_ts` / `to_ts` are dates or datetimes, `city_ids` restricts the read to a set of
+        cities. Rows come from a named (server-side) cursor, one round trip per block, so
+        memory stays flat whatever the range. Only the partitions of the range are scanned.
+        `ordered` returns the rows by (timestamp_utc, city_id), otherwise in storage order.
+
+        Blocks can be passed back to load_wfactuals_columns. Outside a session the read
+        holds a connection until the generator is exhausted or closed.
+        """
+        fetch_size = fetch_size or self.READ_FETCH_ROWS
+        params = {"from_ts": from_ts, "to_ts": to_ts}
+        city_filter = ""
+        if city_ids is not None:
+            params["city_ids"] = [int(city_id) for city_id in city_ids]
+            if not params["city_ids"]:
+                return
+            city_filter = "AND city_id = ANY(%(city_ids)s)"
+        query = f"""
+            SELECT extract(epoch FROM timestamp_utc)::bigint, city_id, temperature_c, wind_speed, precipitation
+            FROM wf_actuals
+            WHERE timestamp_utc >= %(from_ts)s AND timestamp_utc < %(to_ts)s {city_filter}
+            {"ORDER BY timestamp_utc, city_id" if ordered else ""}
+        """
+        with self._cursor(name=f"wf_actuals_read_{next(_read_cursor_ids)}") as cur:
+            # the cursor is read to the end, plan it for all its rows instead of the first 10%
+            with cur.connection.cursor() as settings:
+                settings.execute("SET LOCAL cursor_tuple_fraction = 1.0")
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield _wf_actuals_block(rows)
 
     def insert_cities(self, items: List[Dict[str, Any]]) -> None:
         """Insert city records. Items are dicts with keys: name, longitude, latitude"""
@@ -30,20 +535,511 @@ class WeatherForecastPgDbAdapter:
         values = [tuple(item[c] for c in columns) for item in items]
         query = f"INSERT INTO cities ({', '.join(columns)}) VALUES %s"
 
-        with psycopg2.connect(self._dsn) as conn:
-            with conn.cursor() as cur:
-                psycopg2.extras.execute_values(cur, query, values, page_size=1000)
+        with self._cursor(rows=[len(values)]) as cur:
+            psycopg2.extras.execute_values(cur, query, values, page_size=1000)
 
-    def insert_wfactuals(self, items: List[Dict[str, Any]]) -> None:
-        """Insert wfactuals records. Items should match wfactuals columns."""
+    @_instrumented_load
+    def insert_wfactuals(self, items: List[Dict[str, Any]]) -> int:
+        """Insert wfactuals records. Items should match wfactuals columns. Returns the number of rows."""
         if not items:
-            return
-        
+            return 0
+
         columns = list(items[0].keys())
         column_list = ", ".join(columns)
-        values = (tuple(item[col] for col in columns) for item in items)
-        query = f"INSERT INTO wf_actuals ({column_list}) VALUES %s"
+        months: Dict[date, List[Dict[str, Any]]] = {}
+        for item in items:
+            months.setdefault(_month_of(item["timestamp_utc"]), []).append(item)
+        self.ensure_partitions(months)
 
-        with psycopg2.connect(self._dsn) as conn:
-            with conn.cursor() as cur:
+        with self._cursor(rows=[len(items)]) as cur:
+            for month, month_items in months.items():
+                values = (tuple(item[col] for col in columns) for item in month_items)
+                query = f"INSERT INTO {_partition_name(month)} ({column_list}) VALUES %s"
                 psycopg2.extras.execute_values(cur, query, values, page_size=1000)
+        return len(items)
+
+    @_instrumented_load
+    def load_wfactuals(self, rows: Iterable[Sequence[Any]], method: str = "copy", skip_existing: bool = False) -> int:
+        """Bulk load positional rows ordered as WF_ACTUALS_COLUMNS. Returns the number of rows.
+
+        - insert: multi-row INSERT through execute_values (the historical path)
+        - copy: COPY ... FROM STDIN in text format
+        - copy_binary: COPY ... FROM STDIN in binary format, no text parsing on the server
+
+        - merge / upsert: COPY into the unlogged staging table, then one set-based merge
+          (see `_merge_staged`), existing rows are skipped / updated
+
+        `skip_existing` ignores rows whose primary key is already loaded (SKIP_EXISTING_METHODS).
+        Rows go straight into the partition of their month, created if missing. A list
+        is loaded with one statement per month, other iterables are consumed lazily with
+        one statement per run of rows of the same month.
+        """
+        if method not in LOAD_METHODS:
+            raise ValueError(f"Unknown load method '{method}', expected one of {', '.join(LOAD_METHODS)}")
+        if skip_existing and method not in SKIP_EXISTING_METHODS:
+            raise ValueError(f"Skipping existing rows is only supported by the {', '.join(SKIP_EXISTING_METHODS)} load methods")
+
+        column_list = sql.SQL(", ").join(map(sql.Identifier, WF_ACTUALS_COLUMNS))
+        counter = [0]
+        if method in MERGE_METHODS:
+            months = set()
+
+            def staged(rows):
+                for row in rows:
+                    months.add(_month_of(row[0]))
+                    yield row
+
+            with self._cursor(rows=counter) as cur:
+                query = sql.SQL("COPY wf_actuals_staging ({}) FROM STDIN").format(column_list)
+                stream = _CopyStream(_copy_text_chunks(_counted(staged(rows), counter)))
+                cur.copy_expert(query.as_string(cur), stream, size=self.COPY_BUFFER_SIZE)
+                self._merge_staged(cur, method, months)
+            return counter[0]
+
+        with self._cursor(rows=counter) as cur:
+            for month, month_rows in _month_runs(rows):
+                self.ensure_partitions((month,))
+                table = sql.Identifier(_partition_name(month))
+                month_rows = _counted(month_rows, counter)
+                if method == "insert":
+                    query = sql.SQL("INSERT INTO {} ({}) VALUES %s{}").format(
+                        table, column_list, sql.SQL(" ON CONFLICT DO NOTHING" if skip_existing else "")
+                    )
+                    psycopg2.extras.execute_values(cur, query.as_string(cur), month_rows, page_size=1000)
+                    continue
+
+                if method == "copy":
+                    stream = _CopyStream(_copy_text_chunks(month_rows))
+                    options = sql.SQL("")
+                else:
+                    stream = _CopyStream(_copy_binary_chunks(month_rows))
+                    options = sql.SQL(" WITH (FORMAT binary)")
+                query = sql.SQL("COPY {} ({}) FROM STDIN{}").format(table, column_list, options)
+                cur.copy_expert(query.as_string(cur), stream, size=self.COPY_BUFFER_SIZE)
+        return counter[0]
+
+    @_instrumented_load
+    def load_wfactuals_columns(self, columns: Sequence[np.ndarray], method: str = "copy", skip_existing: bool = False) -> int:
+        """Bulk load column arrays ordered as WF_ACTUALS_COLUMNS (NaN is null). Returns the number of rows.
+
+        COPY data is encoded column-wise from the distinct values of each column, one
+        COPY per month straight into its partition (merge / upsert: one binary COPY into
+        the staging table). INSERT goes through the row path.
+        """
+        if method not in LOAD_METHODS:
+            raise ValueError(f"Unknown load method '{method}', expected one of {', '.join(LOAD_METHODS)}")
+        rows = len(columns[0])
+        if not rows:
+            return 0
+        if method == "insert":
+            fields = [_encoded_column(c, lambda v: v, None).tolist() for c in columns]
+            return self.load_wfactuals(list(zip(*fields)), method=method, skip_existing=skip_existing)
+        if skip_existing and method not in SKIP_EXISTING_METHODS:
+            raise ValueError(f"Skipping existing rows is only supported by the {', '.join(SKIP_EXISTING_METHODS)} load methods")
+
+        column_list = sql.SQL(", ").join(map(sql.Identifier, WF_ACTUALS_COLUMNS))
+        if method in MERGE_METHODS:
+            with self._cursor(rows=[rows]) as cur:
+                query = sql.SQL("COPY wf_actuals_staging ({}) FROM STDIN WITH (FORMAT binary)").format(column_list)
+                cur.copy_expert(query.as_string(cur), io.BytesIO(_copy_binary_columns(columns)), size=self.COPY_BUFFER_SIZE)
+                self._merge_staged(cur, method, _column_months(columns[0]))
+            return rows
+
+        encode = _copy_text_columns if method == "copy" else _copy_binary_columns
+        options = sql.SQL("" if method == "copy" else " WITH (FORMAT binary)")
+        blocks = list(_month_blocks(columns))
+        self.ensure_partitions(month for month, _ in blocks)
+        with self._cursor(rows=[rows]) as cur:
+            for month, month_columns in blocks:
+                query = sql.SQL("COPY {} ({}) FROM STDIN{}").format(
+                    sql.Identifier(_partition_name(month)), column_list, options
+                )
+                cur.copy_expert(query.as_string(cur), io.BytesIO(encode(month_columns)), size=self.COPY_BUFFER_SIZE)
+        return rows
+
+    def _merge_staged(self, cur, method: str, months: Iterable[date]) -> None:
+        """Move the rows staged by this transaction into wf_actuals.
+
+        One statement deletes the staged rows, drops those without a known city (a single
+        join with cities), without timestamp or temperature, and inserts the rest with
+        ON CONFLICT DO NOTHING (merge) or DO UPDATE of the changed values (upsert). A
+        duplicate or a bad row never fails the batch. Rows staged by concurrent loaders
+        are not committed yet, so they are invisible here.
+        """
+        self.ensure_partitions(months)
+        column_list = sql.SQL(", ").join(map(sql.Identifier, WF_ACTUALS_COLUMNS))
+        if method == "upsert":
+            # ON CONFLICT DO UPDATE cannot touch the same row twice, keep one (any) row per key
+            select = sql.SQL("SELECT DISTINCT ON (timestamp_utc, city_id) {} FROM valid").format(column_list)
+            action = sql.SQL(
+                "DO UPDATE SET temperature_c = EXCLUDED.temperature_c, wind_speed = EXCLUDED.wind_speed, "
+                "precipitation = EXCLUDED.precipitation "
+                "WHERE (t.temperature_c, t.wind_speed, t.precipitation) "
+                "IS DISTINCT FROM (EXCLUDED.temperature_c, EXCLUDED.wind_speed, EXCLUDED.precipitation)"
+            )
+        else:
+            select = sql.SQL("SELECT {} FROM valid").format(column_list)
+            action = sql.SQL("DO NOTHING")
+        query = sql.SQL("""
+            WITH staged AS (
+                DELETE FROM wf_actuals_staging RETURNING *
+            ), valid AS (
+                SELECT s.* FROM staged s JOIN cities c ON c.id = s.city_id
+                WHERE s.timestamp_utc IS NOT NULL AND s.temperature_c IS NOT NULL
+            ), merged AS (
+                INSERT INTO wf_actuals AS t ({columns}) {select}
+                ON CONFLICT (timestamp_utc, city_id) {action}
+                RETURNING 1
+            )
+            SELECT (SELECT count(*) FROM staged), (SELECT count(*) FROM valid), (SELECT count(*) FROM merged)
+        """).format(columns=column_list, select=select, action=action)
+        cur.execute(query)
+        staged, valid, merged = cur.fetchone()
+        with self._merge_lock:
+            self._merge_counts[0] += staged
+            self._merge_counts[1] += staged - valid
+            self._merge_counts[2] += merged
+
+        session = getattr(self._local, "session", None)
+        if session is None:
+            self._analyze_partitions(cur, months)
+        else:
+            session.merged_months.update(months)
+
+    def _analyze_partitions(self, cur, months: Iterable[date]) -> None:
+        # merged partitions get fresh statistics right away instead of waiting for autovacuum
+        for month in sorted(set(months)):
+            cur.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(_partition_name(month))))
+
+    def merge_report(self) -> str:
+        with self._merge_lock:
+            staged, rejected, merged = self._merge_counts
+        return (
+            f"{staged} rows staged, {rejected} rejected (unknown city, no timestamp or temperature), "
+            f"{merged} inserted or updated, {staged - rejected - merged} already loaded"
+        )
+
+    def ensure_partitions(self, months: Iterable[date]) -> None:
+        """Create the wf_actuals partitions of the given months (first days) that do not exist yet.
+
+        Partitions are created and committed on a dedicated connection, outside of the
+        thread session, so a load transaction never holds the partition lock and a
+        pool exhausted by sessions cannot block it.
+        """
+        with self._partitions_lock:
+            missing = sorted(set(months) - self._partitions)
+        if not missing:
+            return
+        conn = psycopg2.connect(self._dsn)
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    for month in missing:
+                        cur.execute("SELECT wf_actuals_ensure_partition(%s)", (month,))
+        finally:
+            conn.close()
+        with self._partitions_lock:
+            self._partitions.update(missing)
+
+    def list_partitions(self) -> List[Tuple[date, str]]:
+        """Return the (month, partition name) of the wf_actuals partitions, oldest first."""
+        query = """
+            SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'public.wf_actuals'::regclass
+        """
+        with self._cursor() as cur:
+            cur.execute(query)
+            partitions = [(_partition_month(name), name) for name, in cur]
+        return sorted((month, name) for month, name in partitions if month is not None)
+
+    def drop_partitions_before(self, cutoff: date, detach_only: bool = False) -> List[str]:
+        """Detach, and unless `detach_only` drop, the partitions of the months before `cutoff`'s month.
+
+        Each month goes away in O(1), without a DELETE scan or dead tuples. Detached
+        partitions stay as standalone tables (e.g. to be archived). The coverage ledger
+        rows of the removed months are deleted so incremental runs see them as missing.
+        Returns the names of the removed partitions.
+        """
+        first_kept = date(cutoff.year, cutoff.month, 1)
+        removed = [(month, name) for month, name in self.list_partitions() if month < first_kept]
+        if not removed:
+            return []
+        with self._cursor(rows=[0]) as cur:
+            for month, name in removed:
+                cur.execute(sql.SQL("ALTER TABLE wf_actuals DETACH PARTITION {}").format(sql.Identifier(name)))
+                if not detach_only:
+                    cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+            cur.execute("DELETE FROM wf_actuals_coverage WHERE month < %s", (first_kept,))
+        with self._partitions_lock:
+            self._partitions.difference_update(month for month, _ in removed)
+        return [name for _, name in removed]
+
+    def read_coverage(self, from_date: date, to_date: date) -> Dict[Tuple[int, date], int]:
+        """Return the coverage ledger between two dates as {(city_id, month): loaded days bitmask}."""
+        query = """
+            SELECT city_id, month, days FROM wf_actuals_coverage
+            WHERE month >= date_trunc('month', %s::date) AND month <= %s
+        """
+        with self._cursor() as cur:
+            cur.execute(query, (from_date, to_date))
+            return {(city_id, month): days for city_id, month, days in cur}
+
+    def record_coverage(self, entries: Dict[Tuple[int, date], int]) -> None:
+        """Merge {(city_id, month): days bitmask} into the coverage ledger."""
+        if not entries:
+            return
+        values = [(city_id, month, days) for (city_id, month), days in entries.items()]
+        query = """
+            INSERT INTO wf_actuals_coverage AS c (city_id, month, days) VALUES %s
+            ON CONFLICT (city_id, month) DO UPDATE
+            SET days = c.days | EXCLUDED.days, updated_at = now() AT TIME ZONE 'utc'
+        """
+        with self._cursor(rows=[len(values)]) as cur:
+            psycopg2.extras.execute_values(cur, query, values, page_size=1000)
+
+    def refresh_coverage(self, from_date: date, to_date: date) -> int:
+        """Rebuild the coverage ledger of the months between two dates from wf_actuals.
+
+        Used after loads that bypass the ledger (CSV imports). Only the rows of the
+        given months are scanned, through the primary key. Returns the ledger rows written.
+        """
+        bounds = {"from_date": from_date, "to_date": to_date}
+        clear = """
+            DELETE FROM wf_actuals_coverage
+            WHERE month >= date_trunc('month', %(from_date)s::date)
+              AND month < date_trunc('month', %(to_date)s::date) + interval '1 month'
+        """
+        rebuild = """
+            INSERT INTO wf_actuals_coverage (city_id, month, days)
+            SELECT city_id, month, bit_or(1 << (day - 1))
+            FROM (
+                SELECT city_id,
+                       date_trunc('month', timestamp_utc)::date AS month,
+                       extract(day FROM timestamp_utc)::integer AS day
+                FROM wf_actuals
+                WHERE timestamp_utc >= date_trunc('month', %(from_date)s::date)
+                  AND timestamp_utc < date_trunc('month', %(to_date)s::date) + interval '1 month'
+                GROUP BY 1, 2, 3
+                HAVING count(*) = 24
+            ) AS complete_days
+            GROUP BY city_id, month
+        """
+        with self._cursor(rows=[0]) as cur:
+            cur.execute(clear, bounds)
+            cur.execute(rebuild, bounds)
+            return cur.rowcount
+
+    def refresh_rollups(self, city_ids: Sequence[int], days: Sequence[Any]) -> int:
+        """Recompute the daily and monthly rollups of the given (city_ids[i], days[i]) buckets.
+
+        Only the touched days are aggregated again, from their 24 hourly rows looked up
+        through the wf_actuals primary key, then the months holding them are rolled up
+        from their days. The cost follows the size of the load, not of the table.
+        Returns the number of daily rows written.
+        """
+        if not len(city_ids):
+            return 0
+        daily = f"""
+            WITH touched AS (
+                SELECT DISTINCT city_id, day FROM unnest(%(city_ids)s::integer[], %(days)s::date[]) AS t(city_id, day)
+            ), hours AS (
+                SELECT t.city_id, t.day, t.day + make_interval(hours => h) AS timestamp_utc
+                FROM touched t, generate_series(0, 23) AS h
+            )
+            INSERT INTO wf_actuals_daily ({_ROLLUP_COLUMNS.format(bucket="day")})
+            SELECT h.city_id, h.day, {_DAILY_AGGREGATES}
+            FROM hours h
+            JOIN wf_actuals a ON a.timestamp_utc = h.timestamp_utc AND a.city_id = h.city_id
+            GROUP BY h.city_id, h.day
+            ON CONFLICT (city_id, day) DO UPDATE SET {_ROLLUP_UPDATE}
+        """
+        monthly = f"""
+            WITH touched AS (
+                SELECT DISTINCT city_id, date_trunc('month', day)::date AS month
+                FROM unnest(%(city_ids)s::integer[], %(days)s::date[]) AS t(city_id, day)
+            )
+            INSERT INTO wf_actuals_monthly ({_ROLLUP_COLUMNS.format(bucket="month")})
+            SELECT t.city_id, t.month, {_MONTHLY_AGGREGATES}
+            FROM touched t
+            JOIN wf_actuals_daily d ON d.city_id = t.city_id
+                AND d.day >= t.month AND d.day < t.month + interval '1 month'
+            GROUP BY t.city_id, t.month
+            ON CONFLICT (city_id, month) DO UPDATE SET {_ROLLUP_UPDATE}
+        """
+        buckets = {"city_ids": list(city_ids), "days": list(days)}
+        with self._cursor(rows=[0]) as cur:
+            cur.execute(daily, buckets)
+            written = cur.rowcount
+            cur.execute(monthly, buckets)
+            return written
+
+    def rebuild_rollups(self, from_date: Optional[date] = None, to_date: Optional[date] = None) -> Tuple[int, int]:
+        """Rebuild the daily and monthly rollups from wf_actuals.
+
+        Without dates both rollups are emptied and rebuilt from every row, otherwise
+        only the whole months between the two dates are. Returns the (daily, monthly)
+        rows written.
+        """
+        if from_date is None or to_date is None:
+            clear = "TRUNCATE wf_actuals_daily, wf_actuals_monthly"
+            rows_where = days_where = ""
+        else:
+            clear = """
+                DELETE FROM wf_actuals_daily
+                WHERE day >= date_trunc('month', %(from_date)s::date)
+                  AND day < date_trunc('month', %(to_date)s::date) + interval '1 month';
+                DELETE FROM wf_actuals_monthly
+                WHERE month >= date_trunc('month', %(from_date)s::date) AND month <= %(to_date)s;
+            """
+            rows_where = """
+                WHERE a.timestamp_utc >= date_trunc('month', %(from_date)s::date)
+                  AND a.timestamp_utc < date_trunc('month', %(to_date)s::date) + interval '1 month'
+            """
+            days_where = """
+                WHERE d.day >= date_trunc('month', %(from_date)s::date)
+                  AND d.day < date_trunc('month', %(to_date)s::date) + interval '1 month'
+            """
+        daily = f"""
+            INSERT INTO wf_actuals_daily ({_ROLLUP_COLUMNS.format(bucket="day")})
+            SELECT a.city_id, a.timestamp_utc::date, {_DAILY_AGGREGATES}
+            FROM wf_actuals a {rows_where}
+            GROUP BY 1, 2
+        """
+        monthly = f"""
+            INSERT INTO wf_actuals_monthly ({_ROLLUP_COLUMNS.format(bucket="month")})
+            SELECT d.city_id, date_trunc('month', d.day)::date, {_MONTHLY_AGGREGATES}
+            FROM wf_actuals_daily d {days_where}
+            GROUP BY 1, 2
+        """
+        bounds = {"from_date": from_date, "to_date": to_date}
+        with self._cursor(rows=[0]) as cur:
+            cur.execute(clear, bounds)
+            cur.execute(daily, bounds)
+            daily_rows = cur.rowcount
+            cur.execute(monthly, bounds)
+            return daily_rows, cur.rowcount
+
+    def enqueue_units(self, run_id: str, units: Iterable[Tuple[str, date, date, Any]]) -> int:
+        """Add (unit_key, start_date, end_date, cells) work units to a run of the import queue.
+
+        Units already queued in the run are left untouched, so planning twice is a no-op.
+        Returns the number of enqueued units.
+        """
+        values = [(run_id, key, start, end, psycopg2.extras.Json(cells)) for key, start, end, cells in units]
+        if not values:
+            return 0
+        query = """
+            INSERT INTO wf_import_queue (run_id, unit_key, start_date, end_date, cells) VALUES %s
+            ON CONFLICT (run_id, unit_key) DO NOTHING
+            RETURNING id
+        """
+        with self._cursor(rows=[len(values)]) as cur:
+            return len(psycopg2.extras.execute_values(cur, query, values, page_size=1000, fetch=True))
+
+    def claim_unit(self, run_id: str, worker_id: str, lease_seconds: float, max_attempts: int) -> Optional[Dict[str, Any]]:
+        """Lease the next claimable unit of a run to `worker_id`, None when there is none.
+
+        A unit is claimable when it is pending and its retry time is reached, or when
+        the lease of the worker running it expired (the worker died). Rows locked by a
+        concurrent claim are skipped, two workers never get the same unit. Expired units
+        without attempts left are dead-lettered instead.
+        """
+        params = {"run_id": run_id, "worker_id": worker_id, "lease_seconds": lease_seconds, "max_attempts": max_attempts}
+        dead_letter = """
+            UPDATE wf_import_queue
+            SET status = 'dead', lease_owner = NULL, lease_expires_at = NULL,
+                last_error = 'lease expired on the last attempt', updated_at = now() AT TIME ZONE 'utc'
+            WHERE id IN (
+                SELECT id FROM wf_import_queue
+                WHERE run_id = %(run_id)s AND status = 'running'
+                  AND lease_expires_at < now() AT TIME ZONE 'utc' AND attempts >= %(max_attempts)s
+                FOR UPDATE SKIP LOCKED
+            )
+        """
+        claim = """
+            UPDATE wf_import_queue AS q
+            SET status = 'running', attempts = q.attempts + 1, lease_owner = %(worker_id)s,
+                lease_expires_at = now() AT TIME ZONE 'utc' + make_interval(secs => %(lease_seconds)s),
+                updated_at = now() AT TIME ZONE 'utc'
+            WHERE q.id = (
+                SELECT id FROM wf_import_queue
+                WHERE run_id = %(run_id)s
+                  AND ((status = 'pending' AND available_at <= now() AT TIME ZONE 'utc')
+                    OR (status = 'running' AND lease_expires_at < now() AT TIME ZONE 'utc'
+                        AND attempts < %(max_attempts)s))
+                ORDER BY id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING q.id, q.unit_key, q.start_date, q.end_date, q.cells, q.attempts
+        """
+        with self._cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(dead_letter, params)
+            cur.execute(claim, params)
+            return cur.fetchone()
+
+    def extend_lease(self, unit_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """Push the lease of a unit `lease_seconds` from now, False when it was lost to another worker."""
+        query = """
+            UPDATE wf_import_queue
+            SET lease_expires_at = now() AT TIME ZONE 'utc' + make_interval(secs => %s),
+                updated_at = now() AT TIME ZONE 'utc'
+            WHERE id = %s AND status = 'running' AND lease_owner = %s
+        """
+        with self._cursor(rows=[1]) as cur:
+            cur.execute(query, (lease_seconds, unit_id, worker_id))
+            return cur.rowcount == 1
+
+    def complete_unit(self, unit_id: int, worker_id: str) -> bool:
+        """Mark a leased unit done, False when the lease was lost to another worker.
+
+        Called in the session that loaded the unit rows: rolling back on False keeps
+        a unit from being loaded twice.
+        """
+        query = """
+            UPDATE wf_import_queue
+            SET status = 'done', lease_owner = NULL, lease_expires_at = NULL, last_error = NULL,
+                updated_at = now() AT TIME ZONE 'utc'
+            WHERE id = %s AND status = 'running' AND lease_owner = %s
+        """
+        with self._cursor(rows=[1]) as cur:
+            cur.execute(query, (unit_id, worker_id))
+            return cur.rowcount == 1
+
+    def fail_unit(self, unit_id: int, worker_id: str, error: str, max_attempts: int, retry_delay: float) -> Optional[str]:
+        """Release a leased unit after a failure: pending again after `retry_delay` seconds,
+        or dead once its attempts are exhausted. Returns the new status, None when the
+        lease was already lost."""
+        query = """
+            UPDATE wf_import_queue
+            SET status = CASE WHEN attempts >= %(max_attempts)s THEN 'dead' ELSE 'pending' END,
+                available_at = now() AT TIME ZONE 'utc' + make_interval(secs => %(retry_delay)s),
+                lease_owner = NULL, lease_expires_at = NULL, last_error = %(error)s,
+                updated_at = now() AT TIME ZONE 'utc'
+            WHERE id = %(unit_id)s AND status = 'running' AND lease_owner = %(worker_id)s
+            RETURNING status
+        """
+        params = {"unit_id": unit_id, "worker_id": worker_id, "error": error, "max_attempts": max_attempts, "retry_delay": retry_delay}
+        with self._cursor(rows=[1]) as cur:
+            cur.execute(query, params)
+            row = cur.fetchone()
+            return row[0] if row else None
+
+    def requeue_dead_units(self, run_id: str) -> int:
+        """Give the dead-lettered units of a run a fresh set of attempts. Returns the requeued units."""
+        query = """
+            UPDATE wf_import_queue
+            SET status = 'pending', attempts = 0, available_at = now() AT TIME ZONE 'utc',
+                updated_at = now() AT TIME ZONE 'utc'
+            WHERE run_id = %s AND status = 'dead'
+        """
+        with self._cursor(rows=[0]) as cur:
+            cur.execute(query, (run_id,))
+            return cur.rowcount
+
+    def queue_status(self, run_id: str) -> Dict[str, int]:
+        """Number of units of a run per status."""
+        query = "SELECT status, count(*) FROM wf_import_queue WHERE run_id = %s GROUP BY status"
+        with self._cursor() as cur:
+            cur.execute(query, (run_id,))
+            return dict(cur.fetchall())
@@ -1,29 +1,130 @@
 import argparse
-from datetime import date
+import os
+from datetime import date, datetime
 from pipeline.pipeline import cities_import as pipeline_cities_import
 from pipeline.pipeline import wf_import as pipeline_wf_import
-from config import POSTGRES_DSN
+from pipeline.pipeline import wf_plan as pipeline_wf_plan
+from pipeline.pipeline import wf_worker as pipeline_wf_worker
+from pipeline.pipeline import wf_retention as pipeline_wf_retention
+from pipeline.pipeline import wf_rollups as pipeline_wf_rollups
+from config import (
+    POSTGRES_DSN,
+    OPEN_METEO_CONCURRENCY,
+    WF_IMPORT_TRANSFORM_WORKERS,
+    WF_IMPORT_STAGE_QUEUE_SIZE,
+    WF_IMPORT_DB_FLUSH_ROWS,
+    WF_IMPORT_DB_LOAD_METHOD,
+    WF_IMPORT_CSV_WORKERS,
+    OPEN_METEO_CACHE_DIR,
+    WF_IMPORT_CHECKPOINT_FILE,
+    OPEN_METEO_GRID_RESOLUTION,
+    WF_IMPORT_OUTPUT_CSV,
+    WF_QUEUE_LEASE_SECONDS,
+    WF_QUEUE_MAX_ATTEMPTS,
+    WF_ACTUALS_RETENTION_MONTHS,
+    WF_TELEMETRY_OTLP_ENDPOINT,
+    WF_TELEMETRY_PUSHGATEWAY,
+    WF_PROFILE_DIR,
+)
+from adapters import LOAD_METHODS
+import profiling
+import telemetry
 
 
 def main():
     p = argparse.ArgumentParser(prog="master-data")
+    p.add_argument("--otlp-endpoint", default=WF_TELEMETRY_OTLP_ENDPOINT, help="Export metrics and traces over OTLP/HTTP to this collector (e.g. http://localhost:4318). Needs the opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http packages.")
+    p.add_argument("--pushgateway", default=WF_TELEMETRY_PUSHGATEWAY, help="Push metrics to this Prometheus Pushgateway (e.g. localhost:9091). Needs the prometheus-client package.")
     sub = p.add_subparsers(dest="cmd", required=True)
 
+    # options of every subcommand
+    profile_options = argparse.ArgumentParser(add_help=False)
+    profile_options.add_argument("--profile", action="store_true", default=False, help="Write a JSON report of the wall time, CPU time, peak memory and top allocation sites of every pipeline stage.")
+    profile_options.add_argument("--profile-output", required=False, help="Path of the --profile report, defaults to <cmd>-<timestamp>.profile.json next to --csv-output (or in WF_PROFILE_DIR).")
+    profile_options.add_argument("--profile-cprofile", action="store_true", default=False, help="With --profile, also write a cProfile (pstats) dump next to the report.")
+
     # cities import entrypoint
-    cities_import = sub.add_parser("cities_import", help="Import cities CSV into cities table")
+    cities_import = sub.add_parser("cities_import", parents=[profile_options], help="Import cities CSV into cities table")
     cities_import.add_argument("--input", required=True, help="Path to cities csv")
 
     # wf imports entrypoint
-    wf_import = sub.add_parser("wf_import", help="Import hourly weather data for cities from the provided date range. Supports up to 2 years of historical data for all world cities.")
+    wf_import = sub.add_parser("wf_import", parents=[profile_options], help="Import hourly weather data for cities from the provided date range. Supports up to 2 years of historical data for all world cities.")
     wf_import.add_argument("--from-date", required=False)
     wf_import.add_argument("--to-date", required=False)
     wf_import.add_argument("--export-to-csv", action="store_true", default=False)
+    wf_import.add_argument("--csv-output", default=WF_IMPORT_OUTPUT_CSV, help="Path of the --export-to-csv file. A .gz or .zst extension compresses it on the fly.")
     wf_import.add_argument("--export-to-postgres", action="store_true", default=False)
+    wf_import.add_argument("--export-to-columnar", action="store_true", default=False, help="Also export the fetched data as a compact columnar directory (typed chunk files + manifest) that --input reloads without parsing.")
     wf_import.add_argument("--cities-input", required=False, help="Path to cities csv")
-    wf_import.add_argument("--input", required=False, help="Path to weather csv. Imports the given csv file into the configured database on config level. Use when you would like to import an already generated weatehr forecasts file.")
+    wf_import.add_argument("--input", required=False, help="Path to weather csv (optionally .gz / .zst compressed) or columnar export directory. Imports the given file into the configured database on config level. Use when you would like to import an already generated weatehr forecasts file.")
+    wf_import.add_argument("--workers", type=int, default=WF_IMPORT_CSV_WORKERS, help="Number of processes parsing the --input csv in parallel, each one loading over its own database connection.")
+    wf_import.add_argument("--concurrency", type=int, default=OPEN_METEO_CONCURRENCY, help="Number of Open-Meteo requests fetched in parallel (fetch stage). Use 1 for serial fetching.")
+    wf_import.add_argument("--transform-workers", type=int, default=WF_IMPORT_TRANSFORM_WORKERS, help="Number of threads turning fetched responses into CSV text and column blocks while the next responses are fetched and the previous ones loaded.")
+    wf_import.add_argument("--stage-queue-size", type=int, default=WF_IMPORT_STAGE_QUEUE_SIZE, help="Fetched or transformed units waiting for the next stage. A full queue pauses the stage feeding it, which bounds memory.")
+    wf_import.add_argument("--cache-dir", default=OPEN_METEO_CACHE_DIR, help="Directory of the on-disk Open-Meteo response cache. Archive responses never change, re-runs are served from the cache.")
+    wf_import.add_argument("--offline", action="store_true", default=False, help="Replay the import from --cache-dir only, never calling the Open-Meteo API.")
+    wf_import.add_argument("--checkpoint-file", default=WF_IMPORT_CHECKPOINT_FILE, help="State file recording the completed work units of the Open-Meteo import.")
+    wf_import.add_argument("--resume", action="store_true", default=False, help="Skip the work units recorded as completed in --checkpoint-file by a previous run of the same import.")
+    wf_import.add_argument("--grid-resolution", type=float, default=OPEN_METEO_GRID_RESOLUTION, help="Grid step in degrees (e.g. 0.1) used to fetch nearby cities once per grid cell, cities of a cell then store the values of its first city. 0 (default) fetches every city at its own coordinates.")
+    wf_import.add_argument("--plan", action="store_true", default=False, help="Dry run: print the planned Open-Meteo calls, expected rows and duration, then exit without fetching.")
+    wf_import.add_argument("--incremental", action="store_true", default=False, help="Fetch only the days missing from the wf_actuals coverage ledger. Dates default to the last WF_IMPORT_INCREMENTAL_LOOKBACK_DAYS days published by the archive API.")
+    wf_import.add_argument("--db-flush-rows", type=int, default=WF_IMPORT_DB_FLUSH_ROWS, help="Flush fetched rows to Postgres every N rows. Bounds the memory used by the import.")
+    wf_import.add_argument("--db-commit-every", type=int, required=False, help="Commit once at least N rows were written since the last commit. By default every flushed batch is committed.")
+    wf_import.add_argument("--db-single-transaction", action="store_true", default=False, help="Load the whole run in a single transaction, nothing is committed if the run fails.")
+    wf_import.add_argument("--db-load-method", choices=LOAD_METHODS, default=WF_IMPORT_DB_LOAD_METHOD, help="How rows are loaded into wf_actuals: multi-row INSERT, COPY (text / binary), or COPY into the staging table merged with existing rows skipped (merge) or updated (upsert).")
+
+    # distributed wf import: wf_plan enqueues work units, any number of wf_worker processes run them
+    wf_plan = sub.add_parser("wf_plan", parents=[profile_options], help="Enqueue the work units of a distributed wf import run into the Postgres work queue.")
+    wf_plan.add_argument("--run-id", required=True, help="Name of the run, shared with its wf_worker processes. Planning a run twice only adds the missing units.")
+    wf_plan.add_argument("--from-date", required=False)
+    wf_plan.add_argument("--to-date", required=False)
+    wf_plan.add_argument("--incremental", action="store_true", default=False, help="Only enqueue the days missing from the wf_actuals coverage ledger.")
+    wf_plan.add_argument("--grid-resolution", type=float, default=OPEN_METEO_GRID_RESOLUTION, help="Grid step in degrees (e.g. 0.1) used to fetch nearby cities once per grid cell, cities of a cell then store the values of its first city. 0 (default) fetches every city at its own coordinates.")
+    wf_plan.add_argument("--requeue-dead", action="store_true", default=False, help="Give the dead-lettered units of the run a fresh set of attempts.")
+
+    wf_worker = sub.add_parser("wf_worker", parents=[profile_options], help="Claim and load the work units of a distributed wf import run until its queue is drained.")
+    wf_worker.add_argument("--run-id", required=True)
+    wf_worker.add_argument("--worker-id", required=False, help="Lease owner name, defaults to <hostname>-<pid>.")
+    wf_worker.add_argument("--db-load-method", choices=LOAD_METHODS, default=WF_IMPORT_DB_LOAD_METHOD)
+    wf_worker.add_argument("--db-flush-rows", type=int, default=WF_IMPORT_DB_FLUSH_ROWS)
+    wf_worker.add_argument("--skip-existing", action="store_true", default=False, help="Skip rows already in wf_actuals (ON CONFLICT DO NOTHING, or merge / upsert load methods), needed for --incremental runs.")
+    wf_worker.add_argument("--cache-dir", default=OPEN_METEO_CACHE_DIR)
+    wf_worker.add_argument("--offline", action="store_true", default=False)
+    wf_worker.add_argument("--lease-seconds", type=float, default=WF_QUEUE_LEASE_SECONDS, help="A claimed unit not completed within the lease is claimed again by another worker.")
+    wf_worker.add_argument("--max-attempts", type=int, default=WF_QUEUE_MAX_ATTEMPTS, help="Attempts of a unit before it is dead-lettered.")
+    wf_worker.add_argument("--max-units", type=int, required=False, help="Exit after loading N units.")
+
+    # wf_actuals is partitioned by month, retention removes whole partitions
+    wf_retention = sub.add_parser("wf_retention", parents=[profile_options], help="Drop the monthly wf_actuals partitions older than the retention window.")
+    wf_retention.add_argument("--keep-months", type=int, default=WF_ACTUALS_RETENTION_MONTHS, help="Months kept before the current one.")
+    wf_retention.add_argument("--before", required=False, help="Remove the months before this date instead of using --keep-months.")
+    wf_retention.add_argument("--detach", action="store_true", default=False, help="Detach the partitions and keep them as standalone tables instead of dropping them.")
+    wf_retention.add_argument("--dry-run", action="store_true", default=False, help="Only list the partitions that would be removed.")
+
+    # imports refresh the rollups of the days they load, wf_rollups rebuilds them
+    wf_rollups = sub.add_parser("wf_rollups", parents=[profile_options], help="Rebuild the daily and monthly wf_actuals rollups from wf_actuals.")
+    wf_rollups.add_argument("--from-date", required=False, help="Only rebuild the months from this date on (requires --to-date).")
+    wf_rollups.add_argument("--to-date", required=False, help="Only rebuild the months up to this date (requires --from-date).")
 
     args = p.parse_args()
+    telemetry.setup(args.cmd, otlp_endpoint=args.otlp_endpoint, pushgateway=args.pushgateway)
+    if args.profile:
+        profiling.start(args.cmd, cprofile=args.profile_cprofile)
+    try:
+        run(args)
+    finally:
+        if args.profile:
+            profiling.stop(args.profile_output or default_profile_output(args))
+        telemetry.shutdown()
 
+
+def default_profile_output(args) -> str:
+    # next to the CSV export of wf_import, the other commands only write to the database
+    directory = os.path.dirname(getattr(args, "csv_output", None) or "") or WF_PROFILE_DIR
+    return os.path.join(directory, f"{args.cmd}-{datetime.now():%Y%m%d-%H%M%S}.profile.json")
+
+
+def run(args):
     if args.cmd == "cities_import":
         count = pipeline_cities_import(args.input, dsn=POSTGRES_DSN)
         print(f"Imported {count} cities into DB")
@@ -47,7 +148,66 @@ def main():
             cities_csv_input=args.cities_input,
             export_to_csv=args.export_to_csv,
             export_to_postgres=args.export_to_postgres,
-            weather_csv_input=args.input
+            export_to_columnar=args.export_to_columnar,
+            csv_output=args.csv_output,
+            weather_csv_input=args.input,
+            concurrency=args.concurrency,
+            transform_workers=args.transform_workers,
+            stage_queue_size=args.stage_queue_size,
+            db_flush_rows=args.db_flush_rows,
+            db_load_method=args.db_load_method,
+            db_commit_every=args.db_commit_every,
+            db_single_transaction=args.db_single_transaction,
+            workers=args.workers,
+            cache_dir=args.cache_dir,
+            offline=args.offline,
+            checkpoint_file=args.checkpoint_file,
+            resume=args.resume,
+            incremental=args.incremental,
+            grid_resolution=args.grid_resolution,
+            plan_only=args.plan
+        )
+
+    elif args.cmd == "wf_plan":
+        pipeline_wf_plan(
+            run_id=args.run_id,
+            from_date=date.fromisoformat(args.from_date) if args.from_date else None,
+            to_date=date.fromisoformat(args.to_date) if args.to_date else None,
+            dsn=POSTGRES_DSN,
+            incremental=args.incremental,
+            grid_resolution=args.grid_resolution,
+            requeue_dead=args.requeue_dead
+        )
+
+    elif args.cmd == "wf_worker":
+        pipeline_wf_worker(
+            run_id=args.run_id,
+            dsn=POSTGRES_DSN,
+            worker_id=args.worker_id,
+            db_load_method=args.db_load_method,
+            db_flush_rows=args.db_flush_rows,
+            skip_existing=args.skip_existing,
+            cache_dir=args.cache_dir,
+            offline=args.offline,
+            lease_seconds=args.lease_seconds,
+            max_attempts=args.max_attempts,
+            max_units=args.max_units
+        )
+
+    elif args.cmd == "wf_retention":
+        pipeline_wf_retention(
+            dsn=POSTGRES_DSN,
+            keep_months=args.keep_months,
+            before=date.fromisoformat(args.before) if args.before else None,
+            detach_only=args.detach,
+            dry_run=args.dry_run
+        )
+
+    elif args.cmd == "wf_rollups":
+        pipeline_wf_rollups(
+            dsn=POSTGRES_DSN,
+            from_date=date.fromisoformat(args.from_date) if args.from_date else None,
+            to_date=date.fromisoformat(args.to_date) if args.to_date else None
         )
 
 
@@ -1,3 +1,5 @@
 from .client import fetch_hourly
+from .rate_limiter import RateLimiter, request_weight
+from .cache import ResponseCache, CacheMissError
 
-__all__ = ["fetch_hourly"]
+__all__ = ["fetch_hourly", "RateLimiter", "request_weight", "ResponseCache", "CacheMissError"]
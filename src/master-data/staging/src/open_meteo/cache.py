@@ -0,0 +1,127 @@
+"""
+Persistent on-disk cache for Open-Meteo archive responses.
+
+Archive data for a past (coordinates, dates, variables, timezone) request never changes,
+so responses are stored gzip-compressed under a key derived from the request parameters.
+The cache directory is bounded in size, least recently used entries (by mtime, refreshed
+on every hit) are evicted first. In offline mode a miss raises instead of calling the API,
+which lets an import be replayed entirely from the cache.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+from config import OPEN_METEO_CACHE_MAX_BYTES
+
+
+class CacheMissError(RuntimeError):
+    pass
+
+
+def cache_key(params: Dict[str, Any]) -> str:
+    """Content address of a request: sha256 of its canonical (sorted) parameters."""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    SUFFIX = ".json.gz"
+
+    def __init__(self, directory: str, max_bytes: int = OPEN_METEO_CACHE_MAX_BYTES, offline: bool = False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry["size"] for entry in self._entries())
+
+    def _path(self, key: str) -> str:
+        # two levels of fan-out keep directories small for large caches
+        return os.path.join(self.directory, key[:2], key + self.SUFFIX)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(self.SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield {"path": path, "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def get(self, params: Dict[str, Any]) -> Optional[Any]:
+        path = self._path(cache_key(params))
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, EOFError, OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            if self.offline:
+                raise CacheMissError(
+                    f"Offline mode: no cached response for {params.get('start_date')} to {params.get('end_date')}"
+                )
+            return None
+
+        os.utime(path)
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, params: Dict[str, Any], data: Any) -> None:
+        if self.offline:
+            return
+        path = self._path(cache_key(params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temp file then rename, so concurrent readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+            f.write(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+        size = os.path.getsize(tmp_path)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += size - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # called with the lock held; drop oldest entries until we are back under 90% of the budget
+        target = self.max_bytes * 0.9
+        for entry in sorted(self._entries(), key=lambda e: e["mtime"]):
+            if self._size <= target:
+                break
+            try:
+                os.remove(entry["path"])
+            except FileNotFoundError:
+                continue
+            self._size -= entry["size"]
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_mb": round(self._size / (1024 * 1024), 1),
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"{s['hits']} hits, {s['misses']} misses (hit ratio {s['hit_ratio']}), "
+            f"{s['evictions']} evictions, {s['size_mb']} MB on disk"
+        )
@@ -1,6 +1,9 @@
 import time
 import requests
-from config import OPEN_METEO_API_URL, OPEN_METEO_RETRY_DELAY, OPEN_METEO_MAX_RETRIES
+import telemetry
+from config import OPEN_METEO_API_URL
+
+from .rate_limiter import backoff_delay, parse_retry_after, request_weight
 
 def fetch_hourly(
     latitudes,
@@ -9,7 +12,9 @@ def fetch_hourly(
     end_date,
     variables,
     timezone,
-    max_retries
+    max_retries,
+    rate_limiter=None,
+    cache=None
 ):
     params = {
         "latitude": ",".join(map(str, latitudes)),
@@ -19,23 +24,62 @@ def fetch_hourly(
         "hourly": ",".join(variables),
         "timezone": timezone
     }
+    cache_params = dict(params, endpoint=OPEN_METEO_API_URL)
+    if cache is not None:
+        cached = cache.get(cache_params)
+        if cached is not None:
+            return cached if isinstance(cached, list) else [cached]
+
+    weight = request_weight(len(latitudes), (end_date - start_date).days + 1, len(variables))
 
+    # outcome of the previous attempt, the reason of a retry
+    failure = None
     for attempt in range(1, max_retries + 1):
         try:
             if attempt > 1:
                 print(f"[INFO] Retrying request for {len(latitudes)} locations from {start_date} to {end_date}, attempt {attempt}")
-            response = requests.get(OPEN_METEO_API_URL, params=params, timeout=60)
+                telemetry.increment("wf_fetch_retries_total", reason=failure)
+            if rate_limiter is not None:
+                rate_limiter.acquire(weight)
+            begin = time.perf_counter()
+            with telemetry.span("open_meteo.request", locations=len(latitudes), weight=weight, attempt=attempt):
+                response = requests.get(OPEN_METEO_API_URL, params=params, timeout=60)
+            latency = time.perf_counter() - begin
             if response.status_code == 429:
-                print(f"[WARN] 429 Too Many Requests. Backing off for {OPEN_METEO_RETRY_DELAY} seconds")
-                time.sleep(OPEN_METEO_RETRY_DELAY * attempt)
+                failure = "throttled"
+                telemetry.observe("wf_fetch_request_seconds", latency, outcome=failure)
+                telemetry.increment("wf_fetch_throttled_total")
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                print(f"[WARN] 429 Too Many Requests. Backing off for {delay:.1f} seconds")
+                if rate_limiter is not None:
+                    # the shared limiter pauses every caller on their next acquire
+                    rate_limiter.on_throttled(delay)
+                else:
+                    time.sleep(delay)
                 continue
             elif response.status_code >= 500:
-                print(f"[WARN] Server error {response.status_code}. Retrying in {OPEN_METEO_RETRY_DELAY * attempt} seconds")
-                time.sleep(OPEN_METEO_RETRY_DELAY * attempt)
+                failure = "server_error"
+                telemetry.observe("wf_fetch_request_seconds", latency, outcome=failure)
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                print(f"[WARN] Server error {response.status_code}. Retrying in {delay:.1f} seconds")
+                time.sleep(delay)
                 continue
             response.raise_for_status()
-            return response.json()
+            if rate_limiter is not None:
+                rate_limiter.on_success()
+            data = response.json()
+            telemetry.observe("wf_fetch_request_seconds", latency, outcome="ok")
+            # a single location is returned as an object instead of a list
+            if isinstance(data, dict):
+                data = [data]
+            if cache is not None:
+                cache.put(cache_params, data)
+            return data
         except requests.RequestException as e:
-            print(f"[ERROR] Request failed: {e}. Retry {attempt}/{OPEN_METEO_MAX_RETRIES}")
-            time.sleep(OPEN_METEO_RETRY_DELAY * attempt)
-    raise RuntimeError(f"Failed to fetch data after {OPEN_METEO_MAX_RETRIES} attempts for {start_date} to {end_date}")
+            failure = "error"
+            telemetry.observe("wf_fetch_request_seconds", time.perf_counter() - begin, outcome=failure)
+            print(f"[ERROR] Request failed: {e}. Retry {attempt}/{max_retries}")
+            time.sleep(backoff_delay(attempt))
+    raise RuntimeError(f"Failed to fetch data after {max_retries} attempts for {start_date} to {end_date}")
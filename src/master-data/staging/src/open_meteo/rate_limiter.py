@@ -0,0 +1,137 @@
+"""
+Adaptive rate limiter for the Open-Meteo API.
+
+Open-Meteo accounts usage in *weighted* calls: every location of a request is a call,
+and a location asking for more than 10 variables or more than 2 weeks of data counts
+as several calls (fractionally). On top of that we cap the raw number of HTTP requests.
+
+`RateLimiter` keeps one token bucket per quota and is shared by every fetching thread:
+- `acquire(weight)` blocks until all buckets can pay for the request
+- `on_throttled(retry_after)` halves the pace and pauses everyone until Retry-After elapsed
+- `on_success()` slowly brings the pace back up to the configured quota (AIMD)
+"""
+
+import math
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Optional
+
+from config import (
+    OPEN_METEO_RATE_LIMIT_REQUESTS_PER_MINUTE,
+    OPEN_METEO_RATE_LIMIT_WEIGHT_PER_MINUTE,
+    OPEN_METEO_RATE_LIMIT_WEIGHT_PER_HOUR,
+    OPEN_METEO_RETRY_DELAY,
+    OPEN_METEO_RETRY_MAX_DELAY,
+)
+
+
+def request_weight(locations: int, days: int, variables: int) -> float:
+    """Weighted call cost of one request, following Open-Meteo's accounting."""
+    return locations * max(1.0, variables / 10) * max(1.0, days / 14)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the Retry-After header as seconds, supporting both delta-seconds and HTTP-date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float = OPEN_METEO_RETRY_DELAY, cap: float = OPEN_METEO_RETRY_MAX_DELAY) -> float:
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2^(attempt-1)))."""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float, factor: float) -> None:
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second * factor)
+        self.updated_at = now
+
+    def wait_time(self, cost: float, factor: float) -> float:
+        # a request heavier than the bucket is let through once the bucket is full,
+        # the resulting debt then delays the next requests
+        needed = min(cost, self.capacity) - self.tokens
+        if needed <= 0:
+            return 0.0
+        return needed / (self.refill_per_second * factor)
+
+
+class RateLimiter:
+    MIN_FACTOR = 0.05
+    RECOVERY_STEP = 0.05
+
+    def __init__(
+        self,
+        requests_per_minute: float = OPEN_METEO_RATE_LIMIT_REQUESTS_PER_MINUTE,
+        weight_per_minute: float = OPEN_METEO_RATE_LIMIT_WEIGHT_PER_MINUTE,
+        weight_per_hour: float = OPEN_METEO_RATE_LIMIT_WEIGHT_PER_HOUR
+    ):
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self._weights: List[TokenBucket] = [
+            TokenBucket(weight_per_minute, weight_per_minute / 60),
+            TokenBucket(weight_per_hour, weight_per_hour / 3600),
+        ]
+        self._factor = 1.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    @property
+    def factor(self) -> float:
+        return self._factor
+
+    def acquire(self, weight: float = 1.0) -> float:
+        """Block until the request can be sent. Returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                for bucket in (self._requests, *self._weights):
+                    bucket.refill(now, self._factor)
+
+                wait = max(
+                    self._paused_until - now,
+                    self._requests.wait_time(1, self._factor),
+                    *(bucket.wait_time(weight, self._factor) for bucket in self._weights)
+                )
+                if wait <= 0:
+                    self._requests.tokens -= 1
+                    for bucket in self._weights:
+                        bucket.tokens -= weight
+                    return waited
+
+            time.sleep(wait)
+            waited += wait
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._factor = min(1.0, self._factor + self.RECOVERY_STEP)
+
+    def on_throttled(self, retry_after: Optional[float] = None) -> None:
+        """Record a 429: halve the pace and pause every caller for `retry_after` seconds."""
+        with self._lock:
+            self.throttled += 1
+            self._factor = max(self.MIN_FACTOR, self._factor / 2)
+            if retry_after is not None and math.isfinite(retry_after):
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
@@ -0,0 +1,103 @@
+"""
+Checkpointing of wf_import runs at work unit (location batch x date range) granularity.
+
+Completed units are appended to a local state file, one key per line, right after the
+data they produced became durable:
+- rows handed to Postgres become durable when the session commits, the CSV and columnar
+  exports are flushed when each Postgres flush starts, so they hold every row of the
+  units of the transaction by then
+- without a Postgres sink, units are durable once a columnar chunk holding their rows is
+  written, or the CSV is flushed (every WF_IMPORT_CSV_FLUSH_ROWS rows when it is the
+  only export)
+
+A restarted job started with `--resume` skips every unit listed in the file. The first
+line of the file records the run parameters, resuming a different run is refused.
+No row of a listed unit is lost. With both sinks enabled, the CSV rows of units written
+after the last commit may already be in the file, and those units are written again when
+the run is resumed: the CSV may hold their rows twice.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Set
+
+
+def unit_key(unit) -> str:
+    """Stable identity of a unit: its date range and the coordinates it fetches."""
+    coordinates = ";".join(f"{lat},{lon}" for lat, lon in zip(unit.lats, unit.lons))
+    digest = hashlib.sha1(coordinates.encode("utf-8")).hexdigest()
+    return f"{unit.start.isoformat()}:{unit.end.isoformat()}:{digest}"
+
+
+class Checkpoint:
+    def __init__(self, path: str, run: Dict[str, Any], resume: bool = False):
+        self.path = path
+        self._run = run
+        self._done: Set[str] = set()
+        self._pending: List[str] = []
+        self._in_flight: List[str] = []
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume and os.path.exists(path):
+            self._load()
+            self._file = open(path, "a", encoding="utf-8")
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+            self._write_lines([json.dumps({"run": run}, sort_keys=True, default=str)])
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            header = f.readline()
+            try:
+                recorded = json.loads(header).get("run") if header.strip() else None
+            except ValueError:
+                recorded = None
+            if recorded != json.loads(json.dumps(self._run, default=str)):
+                raise SystemExit(
+                    f"Checkpoint {self.path} belongs to another run ({recorded}), refusing to resume"
+                )
+            for line in f:
+                key = line.strip()
+                if key:
+                    self._done.add(key)
+
+    def _write_lines(self, lines: List[str]) -> None:
+        if not lines:
+            return
+        self._file.write("".join(line + "\n" for line in lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    @property
+    def completed(self) -> int:
+        return len(self._done)
+
+    def is_done(self, unit) -> bool:
+        return unit_key(unit) in self._done
+
+    def mark_written(self, unit) -> None:
+        """Every row of the unit was handed to the sinks (possibly still buffered)."""
+        with self._lock:
+            self._pending.append(unit_key(unit))
+
+    def flush_started(self) -> None:
+        """A sink flush begins: units written so far are part of the transaction."""
+        with self._lock:
+            self._in_flight.extend(self._pending)
+            self._pending = []
+
+    def committed(self) -> None:
+        """The transaction holding the in-flight units committed, persist them."""
+        with self._lock:
+            durable, self._in_flight = self._in_flight, []
+            self._done.update(durable)
+            self._write_lines(durable)
+
+    def close(self) -> None:
+        self._file.close()
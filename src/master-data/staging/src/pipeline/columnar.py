@@ -0,0 +1,205 @@
+"""
+Columnar binary export of the weather data (`--export-to-columnar`) and its reader.
+
+An export is a directory holding:
+- manifest.json: format version, fixed-point scale and the list of chunks with their
+  row count and per-column dtype
+- locations.npy: float64 (n, 2) array of the exported (longitude, latitude)
+- chunk-NNNNN.<column>.npy: one typed array per column and chunk
+
+Columns, ~14 bytes per row against ~40 for the CSV:
+- location: int32 index into locations.npy
+- time: int32 hours since 1970-01-01T00:00 UTC
+- temperature_c, wind_speed_m_s, precipitation_mm: int16 fixed point (value x scale),
+  FIXED_POINT_NULL for nulls. A chunk column holding values that do not fit is stored
+  as float64 (NaN for nulls) instead, the manifest records which.
+
+Chunks are written with `np.save` and read back memory-mapped, so a reload copies
+typed arrays instead of parsing text. Every chunk but the last holds exactly
+`chunk_rows` rows. The manifest is rewritten after every chunk, an interrupted export
+stays readable up to its last chunk.
+"""
+
+import json
+import os
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+from config import WF_IMPORT_COLUMNAR_CHUNK_ROWS
+
+FORMAT = "wf-columnar"
+VERSION = 1
+MANIFEST = "manifest.json"
+LOCATIONS = "locations.npy"
+
+MEASURES = ("temperature_c", "wind_speed_m_s", "precipitation_mm")
+FIXED_POINT_SCALE = 100
+FIXED_POINT_NULL = np.iinfo(np.int16).min
+
+_EPOCH = np.datetime64("1970-01-01T00", "h")
+
+
+def is_columnar_export(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST))
+
+
+def _fixed_point(values: np.ndarray) -> Optional[np.ndarray]:
+    """int16 fixed-point encoding of float values, None when a value would not round-trip."""
+    valid = ~np.isnan(values)
+    scaled = np.round(values[valid] * FIXED_POINT_SCALE)
+    limit = np.iinfo(np.int16).max
+    if len(scaled) and (np.abs(scaled).max() > limit or not np.array_equal(scaled / FIXED_POINT_SCALE, values[valid])):
+        return None
+    encoded = np.full(len(values), FIXED_POINT_NULL, dtype=np.int16)
+    encoded[valid] = scaled
+    return encoded
+
+
+class ColumnarWriter:
+    def __init__(
+        self,
+        directory: str,
+        chunk_rows: int = WF_IMPORT_COLUMNAR_CHUNK_ROWS,
+        append: bool = False,
+        on_flush: Optional[Callable[[], None]] = None,
+        after_flush: Optional[Callable[[], None]] = None
+    ):
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        # called right before a chunk is written / once it is published in the manifest
+        self._on_flush = on_flush
+        self._after_flush = after_flush
+        os.makedirs(directory, exist_ok=True)
+
+        self._location_index: Dict[tuple, int] = {}
+        self._chunks: List[dict] = []
+        if append and is_columnar_export(directory):
+            reader = ColumnarReader(directory)
+            self._chunks = list(reader.chunks)
+            for i, (lon, lat) in enumerate(reader.locations.tolist()):
+                self._location_index[(lon, lat)] = i
+        else:
+            # a new export replaces the previous one
+            for name in os.listdir(directory):
+                if name == MANIFEST or name == LOCATIONS or name.startswith("chunk-"):
+                    os.remove(os.path.join(directory, name))
+
+        self._buffer: Dict[str, List[np.ndarray]] = {name: [] for name in ("location", "time", *MEASURES)}
+        self._buffered = 0
+
+    @property
+    def rows(self) -> int:
+        return sum(chunk["rows"] for chunk in self._chunks) + self._buffered
+
+    def write(self, longitude: float, latitude: float, time: np.ndarray, measures) -> None:
+        """Buffer the hourly samples of one location. `measures` follows MEASURES, NaN is null."""
+        key = (float(longitude), float(latitude))
+        location = self._location_index.setdefault(key, len(self._location_index))
+        rows = len(time)
+        self._buffer["location"].append(np.full(rows, location, dtype=np.int32))
+        self._buffer["time"].append(((time - _EPOCH) // np.timedelta64(1, "h")).astype(np.int32))
+        for name, values in zip(MEASURES, measures):
+            self._buffer[name].append(values)
+        self._buffered += rows
+        while self._buffered >= self.chunk_rows:
+            # the rows past the chunk all come from this call, they stay buffered
+            self._write_chunk(self.chunk_rows)
+
+    def flush(self) -> None:
+        """Write every buffered row as a new chunk and publish it in the manifest."""
+        if self._buffered:
+            self._write_chunk(self._buffered)
+
+    def _write_chunk(self, rows: int) -> None:
+        if self._on_flush is not None:
+            self._on_flush()
+        chunk = {"id": len(self._chunks), "rows": rows, "dtypes": {}}
+        for name, parts in self._buffer.items():
+            values = np.concatenate(parts)
+            parts[:] = [values[rows:]] if len(values) > rows else []
+            values = values[:rows]
+            if name in MEASURES:
+                encoded = _fixed_point(values)
+                values = encoded if encoded is not None else values.astype(np.float64)
+            np.save(self._chunk_path(chunk["id"], name), values, allow_pickle=False)
+            chunk["dtypes"][name] = values.dtype.str
+        self._buffered -= rows
+        self._chunks.append(chunk)
+        self._write_manifest()
+        if self._after_flush is not None:
+            self._after_flush()
+
+    def _chunk_path(self, chunk_id: int, column: str) -> str:
+        return os.path.join(self.directory, f"chunk-{chunk_id:05d}.{column}.npy")
+
+    def _write_manifest(self) -> None:
+        locations = np.array(list(self._location_index), dtype=np.float64).reshape(-1, 2)
+        np.save(os.path.join(self.directory, LOCATIONS), locations, allow_pickle=False)
+        manifest = {
+            "format": FORMAT,
+            "version": VERSION,
+            "fixed_point_scale": FIXED_POINT_SCALE,
+            "fixed_point_null": int(FIXED_POINT_NULL),
+            "rows": sum(chunk["rows"] for chunk in self._chunks),
+            "chunks": self._chunks,
+        }
+        tmp_path = os.path.join(self.directory, MANIFEST + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(self.directory, MANIFEST))
+
+    def close(self) -> None:
+        self.flush()
+
+
+class ColumnarBlock(NamedTuple):
+    location: np.ndarray
+    time: np.ndarray
+    temperature: np.ndarray
+    wind_speed: np.ndarray
+    precipitation: np.ndarray
+
+
+class ColumnarReader:
+    def __init__(self, directory: str):
+        if not is_columnar_export(directory):
+            raise SystemExit(f"Columnar export not found: {directory}")
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT or manifest.get("version") != VERSION:
+            raise SystemExit(f"Unsupported columnar export {directory}: {manifest.get('format')} v{manifest.get('version')}")
+        self.scale = manifest["fixed_point_scale"]
+        self.null = manifest["fixed_point_null"]
+        self.rows = manifest["rows"]
+        self.chunks = manifest["chunks"]
+        self.locations = np.load(os.path.join(directory, LOCATIONS), allow_pickle=False)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+
+    def _column(self, chunk: dict, name: str) -> np.ndarray:
+        path = os.path.join(self.directory, f"chunk-{chunk['id']:05d}.{name}.npy")
+        return np.load(path, mmap_mode="r", allow_pickle=False)
+
+    def _measure(self, values: np.ndarray) -> np.ndarray:
+        if values.dtype.kind == "f":
+            return np.array(values, dtype=np.float64)
+        decoded = values.astype(np.float64) / self.scale
+        decoded[values == self.null] = np.nan
+        return decoded
+
+    def blocks(self, batch_rows: int) -> Iterator[ColumnarBlock]:
+        """Decoded blocks of at most `batch_rows` rows, read from the memory-mapped chunks."""
+        for chunk in self.chunks:
+            columns = {name: self._column(chunk, name) for name in chunk["dtypes"]}
+            for start in range(0, chunk["rows"], batch_rows):
+                window = slice(start, start + batch_rows)
+                hours = columns["time"][window].astype(np.int64)
+                yield ColumnarBlock(
+                    np.asarray(columns["location"][window]),
+                    (_EPOCH + hours.astype("timedelta64[h]")).astype("datetime64[s]"),
+                    *(self._measure(columns[name][window]) for name in MEASURES)
+                )
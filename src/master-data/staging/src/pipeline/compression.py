@@ -0,0 +1,324 @@
+"""
+Transparent streaming compression of the weather and cities CSV files.
+
+The codec is picked from the file extension: `.gz` is gzip, `.zst` is zstd (needs the
+optional `zstandard` package), any other file is read and written as is.
+
+Compressed files are streamed, never held in memory. Decompression runs in a
+background thread that reads WF_IMPORT_CSV_READ_AHEAD_CHUNKS chunks of
+WF_IMPORT_CSV_READ_BUFFER_BYTES ahead of the parser, compression of written data runs
+in a write-behind thread. zlib and zstd release the GIL while they work, so the codec
+overlaps with CSV parsing and formatting instead of adding to it.
+
+Compressed files cannot be split in byte ranges, they are always read sequentially.
+"""
+
+import gzip
+import io
+import os
+import queue
+import threading
+import zlib
+from typing import Iterator, Optional
+
+from config import (
+    WF_IMPORT_CSV_READ_BUFFER_BYTES,
+    WF_IMPORT_CSV_READ_AHEAD_CHUNKS,
+    WF_IMPORT_CSV_GZIP_LEVEL,
+    WF_IMPORT_CSV_ZSTD_LEVEL,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC_EXTENSIONS = {
+    ".gz": "gzip",
+    ".zst": "zstd",
+}
+
+
+def codec_of(path: str) -> Optional[str]:
+    """Compression codec of a file from its extension, None for an uncompressed file."""
+    for extension, codec in CODEC_EXTENSIONS.items():
+        if path.lower().endswith(extension):
+            return codec
+    return None
+
+
+def is_compressed(path: str) -> bool:
+    return codec_of(path) is not None
+
+
+def _require_zstandard(path: str) -> None:
+    if zstandard is None:
+        raise SystemExit(f"{path} is zstd compressed, install the zstandard package to read or write it")
+
+
+def _decompressor(raw, path: str):
+    if codec_of(path) == "zstd":
+        _require_zstandard(path)
+        # files concatenated by other tools hold several frames
+        return zstandard.ZstdDecompressor().stream_reader(
+            raw, read_size=WF_IMPORT_CSV_READ_BUFFER_BYTES, read_across_frames=True, closefd=False
+        )
+    # concatenated gzip members are read as one stream
+    return gzip.GzipFile(fileobj=raw, mode="rb")
+
+
+def _compressor(raw, path: str):
+    if codec_of(path) == "zstd":
+        _require_zstandard(path)
+        return zstandard.ZstdCompressor(level=WF_IMPORT_CSV_ZSTD_LEVEL).stream_writer(raw, closefd=False)
+    return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=WF_IMPORT_CSV_GZIP_LEVEL)
+
+
+class _ReadAhead(io.RawIOBase):
+    """Decompressed bytes produced by a background thread into a bounded queue."""
+
+    def __init__(self, raw, path: str, close_raw: bool):
+        self._raw = raw
+        self._close_raw = close_raw
+        self._source = _decompressor(raw, path)
+        self._chunks = queue.Queue(maxsize=WF_IMPORT_CSV_READ_AHEAD_CHUNKS)
+        self._chunk = memoryview(b"")
+        self._offset = 0
+        self._eof = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="csv-decompress", daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> None:
+        while not self._stop.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                chunk = self._source.read(WF_IMPORT_CSV_READ_BUFFER_BYTES)
+                self._put(chunk)
+                if not chunk:
+                    return
+        except BaseException as e:
+            self._put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self._offset >= len(self._chunk):
+            if self._eof:
+                return 0
+            item = self._chunks.get()
+            if isinstance(item, BaseException):
+                self._eof = True
+                raise item
+            if not item:
+                self._eof = True
+                return 0
+            self._chunk, self._offset = memoryview(item), 0
+        size = min(len(b), len(self._chunk) - self._offset)
+        b[:size] = self._chunk[self._offset:self._offset + size]
+        self._offset += size
+        return size
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._stop.set()
+        # unblock a producer waiting on a full queue
+        while self._thread.is_alive():
+            try:
+                self._chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._source.close()
+        if self._close_raw:
+            self._raw.close()
+        super().close()
+
+
+class _WriteBehind(io.BufferedIOBase):
+    """Bytes compressed and written by a background thread, `flush` waits for it."""
+
+    def __init__(self, raw, path: str, close_raw: bool):
+        self._raw = raw
+        self._close_raw = close_raw
+        self._sink = _compressor(raw, path)
+        self._buffer = bytearray()
+        self._chunks = queue.Queue(maxsize=WF_IMPORT_CSV_READ_AHEAD_CHUNKS)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="csv-compress", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            chunk = self._chunks.get()
+            try:
+                if chunk is None:
+                    return
+                if self._error is None:
+                    self._sink.write(chunk)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._chunks.task_done()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._raise_error()
+        self._buffer += b
+        if len(self._buffer) >= WF_IMPORT_CSV_READ_BUFFER_BYTES:
+            self._chunks.put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(b)
+
+    def flush(self) -> None:
+        """Compress everything written so far and hand it to the file."""
+        if self.closed or self._sink is None:
+            return
+        if self._buffer:
+            self._chunks.put(bytes(self._buffer))
+            self._buffer.clear()
+        self._chunks.join()
+        self._raise_error()
+        # the writer thread is idle until the next chunk
+        self._sink.flush()
+        self._raw.flush()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._chunks.put(None)
+            self._thread.join()
+            sink, self._sink = self._sink, None
+            sink.close()
+            if self._close_raw:
+                self._raw.close()
+            super().close()
+
+
+def _decoded(raw, path: str) -> Iterator[bytes]:
+    """Decompressed content of `raw` up to where it is cut short or corrupt."""
+    zstd = codec_of(path) == "zstd"
+    if zstd:
+        _require_zstandard(path)
+    errors = zstandard.ZstdError if zstd else zlib.error
+
+    def new():
+        if zstd:
+            return zstandard.ZstdDecompressor().decompressobj()
+        # 16 + MAX_WBITS: gzip header and trailer
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    decompressor = new()
+    while True:
+        data = raw.read(WF_IMPORT_CSV_READ_BUFFER_BYTES)
+        if not data:
+            return
+        while data:
+            try:
+                yield decompressor.decompress(data)
+            except errors:
+                return
+            data = b""
+            if decompressor.eof:
+                # next gzip member / zstd frame
+                data, decompressor = decompressor.unused_data, new()
+
+
+def _cut_partial_line(path: str) -> None:
+    """Truncate a plain file after its last complete line."""
+    with open(path, "r+b") as f:
+        end = f.seek(0, io.SEEK_END)
+        while end > 0:
+            start = max(0, end - WF_IMPORT_CSV_READ_BUFFER_BYTES)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        f.truncate(end)
+
+
+def _reopen_compressed(path: str):
+    """Compressed stream continuing the complete lines of `path`, a file whose writer may have been killed.
+
+    The gzip member or zstd frame of a killed writer has no end, anything appended after
+    it is unreadable. The readable lines are recompressed into a new file instead, the
+    original is kept as `<path>.interrupted` until they are on disk.
+    """
+    interrupted = path + ".interrupted"
+    # otherwise a repair cut short itself, its source is still there
+    if not os.path.exists(interrupted):
+        os.replace(path, interrupted)
+    raw = open(path, "wb", buffering=WF_IMPORT_CSV_READ_BUFFER_BYTES)
+    stream = writer(raw, path, close_raw=True)
+    try:
+        tail = b""
+        with open(interrupted, "rb") as source:
+            for chunk in _decoded(source, path):
+                chunk = tail + chunk
+                end = chunk.rfind(b"\n") + 1
+                stream.write(chunk[:end])
+                tail = chunk[end:]
+        stream.flush()
+        os.fsync(raw.fileno())
+    except BaseException:
+        stream.close()
+        raise
+    os.remove(interrupted)
+    return stream
+
+
+def reader(raw, path: str, close_raw: bool = False):
+    """Binary stream of the decompressed content of `raw`, `raw` itself when `path` is not compressed."""
+    if not is_compressed(path):
+        return raw
+    # the read-ahead chunks are already large, a small buffer keeps the parser's reads cheap
+    return io.BufferedReader(_ReadAhead(raw, path, close_raw))
+
+
+def writer(raw, path: str, close_raw: bool = False):
+    """Binary stream compressing into `raw`, `raw` itself when `path` is not compressed."""
+    if not is_compressed(path):
+        return raw
+    return _WriteBehind(raw, path, close_raw)
+
+
+def open_text(path: str, mode: str = "r"):
+    """Open a CSV file for reading ("r"), writing ("w") or appending ("a"), compressed or not.
+
+    Appending continues after the last complete line, the partial line of a writer
+    killed mid-write is dropped. A compressed file is rewritten to do so (see
+    `_reopen_compressed`), appending costs a pass over it.
+    """
+    if mode not in ("r", "w", "a"):
+        raise ValueError(f"Unsupported mode {mode!r}")
+    if mode == "a" and is_compressed(path):
+        if os.path.exists(path) or os.path.exists(path + ".interrupted"):
+            return io.TextIOWrapper(_reopen_compressed(path), encoding="utf-8", newline="")
+    elif mode == "a" and os.path.exists(path):
+        _cut_partial_line(path)
+    raw = open(path, mode + "b", buffering=WF_IMPORT_CSV_READ_BUFFER_BYTES)
+    try:
+        stream = reader(raw, path, close_raw=True) if mode == "r" else writer(raw, path, close_raw=True)
+    except BaseException:
+        raw.close()
+        raise
+    return io.TextIOWrapper(stream, encoding="utf-8", newline="")
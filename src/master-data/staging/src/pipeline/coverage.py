@@ -0,0 +1,75 @@
+"""
+Coverage ledger of the Open-Meteo import.
+
+`wf_actuals_coverage` keeps one row per city and month with a bitmask of the days
+whose 24 hourly samples are loaded. Incremental runs read the ledger of their window
+once and plan only the missing days, gaps in the middle of the window included,
+instead of scanning wf_actuals. Imports loading into Postgres merge the days they
+completed into the ledger right after the rows were handed to the database.
+"""
+
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from .transform import HourlyColumns, full_days
+
+CoverageEntries = Dict[Tuple[int, date], int]
+
+
+def missing_ranges(days_mask: int, start: date, end: date) -> List[Tuple[date, date]]:
+    """Contiguous `(start, end)` ranges of the days not set in the bitmask, within one month."""
+    ranges = []
+    gap_start = None
+    day = start
+    while day <= end:
+        loaded = (days_mask >> (day.day - 1)) & 1
+        if not loaded and gap_start is None:
+            gap_start = day
+        elif loaded and gap_start is not None:
+            ranges.append((gap_start, day - timedelta(days=1)))
+            gap_start = None
+        day += timedelta(days=1)
+    if gap_start is not None:
+        ranges.append((gap_start, end))
+    return ranges
+
+
+def complete_days(cell, columns: HourlyColumns) -> CoverageEntries:
+    """Days of a cell response holding 24 hourly temperatures, per (city_id, month) of its cities."""
+    entries: CoverageEntries = defaultdict(int)
+    for d in full_days(columns).tolist():
+        for member in cell.members:
+            if member.city_id is not None:
+                entries[(member.city_id, d.replace(day=1))] |= 1 << (d.day - 1)
+    return entries
+
+
+class CoverageTracker:
+    """Collects completed days and records them once the rows producing them were flushed."""
+
+    def __init__(self, db_adapter):
+        self._db_adapter = db_adapter
+        self._pending: CoverageEntries = defaultdict(int)
+        self._in_flight: CoverageEntries = defaultdict(int)
+        self._lock = threading.Lock()
+        self.recorded_days = 0
+
+    def add(self, entries: CoverageEntries) -> None:
+        with self._lock:
+            for key, days in entries.items():
+                self._pending[key] |= days
+
+    def flush_started(self) -> None:
+        with self._lock:
+            for key, days in self._pending.items():
+                self._in_flight[key] |= days
+            self._pending = defaultdict(int)
+
+    def record(self) -> None:
+        """Write the in-flight days to the ledger, in the session that loaded their rows."""
+        with self._lock:
+            entries, self._in_flight = self._in_flight, defaultdict(int)
+        self._db_adapter.record_coverage(entries)
+        self.recorded_days += sum(bin(days).count("1") for days in entries.values())
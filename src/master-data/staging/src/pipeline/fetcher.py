@@ -0,0 +1,97 @@
+"""
+Fetching of the Open-Meteo import units.
+
+Work is expressed as a list of `FetchUnit` (one location batch x one date range).
+The import fetches them concurrently through its fetch stage (`pipeline.stages`),
+which hands the results back in the order of the units, the distributed workers
+fetch their claimed unit one at a time.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+from config import (
+    OPEN_METEO_HOURLY_VARS,
+    OPEN_METEO_MAX_RETRIES,
+    WF_IMPORT_TIMEZONE,
+)
+
+from open_meteo import CacheMissError, RateLimiter, ResponseCache, fetch_hourly
+
+# shared by every fetching thread so the whole process stays within the API quota
+RATE_LIMITER = RateLimiter()
+
+
+class FetchUnit(NamedTuple):
+    batch: List[tuple]
+    lats: List[float]
+    lons: List[float]
+    start: date
+    end: date
+
+
+def fetch_unit(unit: FetchUnit, cache: Optional[ResponseCache] = None) -> Any:
+    """Fetch a single unit. Retry semantics are the ones of `fetch_hourly`."""
+    return fetch_hourly(
+        latitudes=unit.lats,
+        longitudes=unit.lons,
+        start_date=unit.start,
+        end_date=unit.end,
+        variables=OPEN_METEO_HOURLY_VARS,
+        timezone=WF_IMPORT_TIMEZONE,
+        max_retries=OPEN_METEO_MAX_RETRIES,
+        rate_limiter=RATE_LIMITER,
+        cache=cache
+    )
+
+
+def split_unit(unit: FetchUnit) -> Optional[Tuple[FetchUnit, FetchUnit]]:
+    """Halve a unit: by locations first, then by days. None once it is one location x one day."""
+    if len(unit.batch) > 1:
+        half = len(unit.batch) // 2
+        return (
+            FetchUnit(unit.batch[:half], unit.lats[:half], unit.lons[:half], unit.start, unit.end),
+            FetchUnit(unit.batch[half:], unit.lats[half:], unit.lons[half:], unit.start, unit.end),
+        )
+    days = (unit.end - unit.start).days + 1
+    if days > 1:
+        middle = unit.start + timedelta(days=days // 2 - 1)
+        return (
+            unit._replace(end=middle),
+            unit._replace(start=middle + timedelta(days=1)),
+        )
+    return None
+
+
+def fetch_unit_splitting(
+    unit: FetchUnit,
+    cache: Optional[ResponseCache] = None,
+    fetch: Callable[..., Any] = fetch_unit
+) -> Any:
+    """Fetch a unit, splitting it in halves when it still fails after its retries.
+
+    Large requests time out or get rejected first, halves are fetched (and split again
+    if needed) and their responses merged back, so callers always get the shape of
+    the requested unit.
+    """
+    try:
+        return fetch(unit, cache=cache)
+    except CacheMissError:
+        raise
+    except RuntimeError as e:
+        halves = split_unit(unit)
+        if halves is None:
+            raise
+        first, second = halves
+        print(f"[WARN] {e}. Splitting the request of {len(unit.batch)} locations from {unit.start} to {unit.end}")
+        first_data = fetch_unit_splitting(first, cache, fetch)
+        second_data = fetch_unit_splitting(second, cache, fetch)
+
+    if len(first.batch) < len(unit.batch):
+        return first_data + second_data
+    # split by days: append the hourly series of the second half to the first one
+    return [
+        dict(a, hourly={key: a["hourly"][key] + b["hourly"][key] for key in a["hourly"]})
+        for a, b in zip(first_data, second_data)
+    ]
+
@@ -0,0 +1,68 @@
+"""
+Grid-cell deduplication of the locations sent to Open-Meteo.
+
+Archive data comes from reanalysis models on a fixed grid, so cities closer than a
+grid step are usually served from the same cell. Locations are snapped to a regular
+grid of `OPEN_METEO_GRID_RESOLUTION` degrees and each distinct cell is requested
+once, at the coordinates of its first city. The response is then fanned out to
+every city of the cell by the sinks.
+
+Open-Meteo corrects temperatures with the elevation of the requested point, so
+cities sharing a cell get the values of its first city instead of their own. The
+deduplication is opt-in: a resolution of 0, the default, fetches every city.
+"""
+
+from typing import Iterable, List, NamedTuple, Optional
+
+from config import OPEN_METEO_GRID_RESOLUTION
+
+
+class Location(NamedTuple):
+    city_id: Optional[int]
+    latitude: float
+    longitude: float
+
+
+class GridCell(NamedTuple):
+    latitude: float
+    longitude: float
+    members: List[Location]
+
+
+def as_location(item) -> Location:
+    """Normalize the loaders shapes: DB (id, latitude, longitude) and CSV (latitude, longitude, name)."""
+    if isinstance(item, Location):
+        return item
+    if isinstance(item[2], str):
+        return Location(None, float(item[0]), float(item[1]))
+    return Location(item[0], float(item[1]), float(item[2]))
+
+
+def snap_to_grid(locations: Iterable, resolution: float = OPEN_METEO_GRID_RESOLUTION) -> List[GridCell]:
+    """Group locations by grid cell, cells are kept in the order of their first location."""
+    cells = {}
+    for item in locations:
+        location = as_location(item)
+        if resolution and resolution > 0:
+            key = (round(location.latitude / resolution), round(location.longitude / resolution))
+        else:
+            key = (location.latitude, location.longitude, len(cells))
+        cell = cells.get(key)
+        if cell is None:
+            cells[key] = GridCell(location.latitude, location.longitude, [location])
+        else:
+            cell.members.append(location)
+    return list(cells.values())
+
+
+def dedup_report(units, resolution: float) -> str:
+    # a cell is part of every unit covering one of its date ranges, count it once
+    cells = {id(cell): cell for unit in units for cell in unit.batch}
+    located = sum(len(cell.members) for cell in cells.values())
+    if not resolution or resolution <= 0:
+        return f"disabled, {located} city locations fetched at their own coordinates"
+    ratio = located / len(cells) if cells else 1.0
+    return (
+        f"{located} city locations served by {len(cells)} grid cells "
+        f"at {resolution} degree resolution (dedup ratio {ratio:.2f}x)"
+    )
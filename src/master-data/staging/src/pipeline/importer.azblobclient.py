@@ -3,13 +3,17 @@ Implementing csv access using kubernetes CSI driver, which would mount directly
 And implementing integration using classic Blob client library (which can be done in kubernetes context too)
 """
 import csv
+import io
 import os
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
 from typing import Optional
 from dateutil.relativedelta import relativedelta
 from tqdm import tqdm
 from config import WF_IMPORT_CSV_INPUT_READ_BATCH_SIZE
+from azure.core import MatchConditions
 from azure.storage.blob import BlobServiceClient
 
 from open_meteo import fetch_hourly
@@ -20,6 +24,7 @@ from config import WF_IMPORT_TIMEZONE
 from config import OPEN_METEO_MAX_RETRIES
 from config import OPEN_METEO_HOURLY_VARS 
 from config import AZ_BLOB_CONTAINER, AZ_BLOB_CONNECTION_STRING
+from config import AZ_BLOB_DOWNLOAD_CHUNK_BYTES, AZ_BLOB_DOWNLOAD_CONCURRENCY
 
 
 class _NoopProgress:
@@ -35,21 +40,104 @@ class _NoopProgress:
     def update(self, n=1):
         return
 
-def _read_csv_from_blob(blob_name: str):
-    """
-    Read CSV from Azure Blob Storage using connection string from environment variable.
-    """
+def _blob_client(blob_name: str):
     if not AZ_BLOB_CONNECTION_STRING:
-        raise SystemExit("AZURE_STORAGE_CONNECTION_STRING environment variable not set")
+        raise SystemExit("AZ_BLOB_CONNECTION_STRING environment variable not set")
 
     blob_service_client = BlobServiceClient.from_connection_string(AZ_BLOB_CONNECTION_STRING)
     container_client = blob_service_client.get_container_client(AZ_BLOB_CONTAINER)
-    blob_client = container_client.get_blob_client(blob_name)
+    return container_client.get_blob_client(blob_name)
 
-    stream = blob_client.download_blob()
-    text = stream.readall().decode("utf-8")
-    reader = csv.DictReader(text.splitlines())
-    return list(reader)
+
+class BlobRangeReader(io.RawIOBase):
+    """
+    Blob content downloaded as parallel byte ranges and handed out in order.
+
+    Up to `concurrency` ranges are downloaded at once and at most `2 * concurrency`
+    ranges are held in memory, so memory stays bounded whatever the blob size.
+    Every range is read against the ETag of the first request, a blob overwritten
+    during the read fails instead of yielding a mix of both versions.
+    """
+
+    def __init__(
+            self,
+            blob_client,
+            chunk_bytes: int = AZ_BLOB_DOWNLOAD_CHUNK_BYTES,
+            concurrency: int = AZ_BLOB_DOWNLOAD_CONCURRENCY):
+        if chunk_bytes <= 0 or concurrency <= 0:
+            raise SystemExit("Blob download chunk size and concurrency must be positive numbers")
+        self._blob_client = blob_client
+        properties = blob_client.get_blob_properties()
+        self.size = properties.size
+        self._etag = properties.etag
+        self._ranges = iter(range(0, self.size, chunk_bytes))
+        self._chunk_bytes = chunk_bytes
+        self._window = concurrency * 2
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="blob-range")
+        self._pending = deque()
+        self._chunk = memoryview(b"")
+        self._offset = 0
+        self.position = 0
+        self._submit()
+
+    def _download(self, offset: int) -> bytes:
+        length = min(self._chunk_bytes, self.size - offset)
+        stream = self._blob_client.download_blob(
+            offset=offset,
+            length=length,
+            etag=self._etag,
+            match_condition=MatchConditions.IfNotModified
+        )
+        return stream.readall()
+
+    def _submit(self) -> None:
+        while len(self._pending) < self._window:
+            offset = next(self._ranges, None)
+            if offset is None:
+                return
+            self._pending.append(self._pool.submit(self._download, offset))
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self._offset >= len(self._chunk):
+            if not self._pending:
+                return 0
+            self._chunk, self._offset = memoryview(self._pending.popleft().result()), 0
+            self._submit()
+        size = min(len(b), len(self._chunk) - self._offset)
+        b[:size] = self._chunk[self._offset:self._offset + size]
+        self._offset += size
+        self.position += size
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pending.clear()
+        super().close()
+
+
+def _read_csv_from_blob(
+        blob_name: str,
+        chunk_bytes: int = AZ_BLOB_DOWNLOAD_CHUNK_BYTES,
+        concurrency: int = AZ_BLOB_DOWNLOAD_CONCURRENCY):
+    """
+    Stream the CSV rows of a blob from Azure Blob Storage, using the connection string
+    from the AZ_BLOB_CONNECTION_STRING environment variable.
+
+    Rows are parsed while the next ranges download, the blob is never held in memory.
+    """
+    blob_client = _blob_client(blob_name)
+    with BlobRangeReader(blob_client, chunk_bytes, concurrency) as raw, \
+            io.TextIOWrapper(io.BufferedReader(raw), encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def _read_csv_from_file(path: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
 
 def load_cities_from_csv(path: str):
     locations = []
@@ -278,17 +366,15 @@ def import_wf_actuals_from_csv(
 
     data_buffer = []
 
-    # Read CSV either from Azure Blob or local path
+    # Stream CSV rows either from Azure Blob or local path
     if wf_actual_csv_input.startswith("blob://"):
         blob_name = wf_actual_csv_input[len("blob://"):] 
         rows = _read_csv_from_blob(blob_name)
     else:
-        with open(wf_actual_csv_input, newline="", encoding="utf-8") as f:
-            rows = list(csv.DictReader(f))
-
-    total_rows = len(rows)
+        rows = _read_csv_from_file(wf_actual_csv_input)
 
-    pbar_ctx = tqdm(total=total_rows, desc="Importing wf_actuals from CSV", unit="row") if tqdm else _NoopProgress()
+    # rows are streamed, their count is not known upfront
+    pbar_ctx = tqdm(desc="Importing wf_actuals from CSV", unit="row") if tqdm else _NoopProgress()
     with pbar_ctx as pbar:
         for row in rows:
             lon_val = None
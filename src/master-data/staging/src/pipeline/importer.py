@@ -6,24 +6,60 @@ This implementation compares development experience between:
 """
 
 import csv
+import io
 import os
-import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from functools import partial
+from itertools import repeat
 from datetime import date, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional, Tuple
 from dateutil.relativedelta import relativedelta
+import numpy as np
 from tqdm import tqdm
 
+import profiling
+import telemetry
 from config import (
     WF_IMPORT_CSV_INPUT_READ_BATCH_SIZE,
+    WF_IMPORT_CSV_READ_BUFFER_BYTES,
     WF_IMPORT_OUTPUT_CSV,
-    OPEN_METEO_BATCH_SIZE,
-    OPEN_METEO_THROTTLE_SECONDS,
-    WF_IMPORT_TIMEZONE,
-    OPEN_METEO_MAX_RETRIES,
-    OPEN_METEO_HOURLY_VARS,
+    OPEN_METEO_CONCURRENCY,
+    WF_IMPORT_TRANSFORM_WORKERS,
+    WF_IMPORT_STAGE_QUEUE_SIZE,
+    WF_IMPORT_DB_FLUSH_ROWS,
+    WF_IMPORT_DB_LOAD_METHOD,
+    POSTGRES_POOL_SIZE,
+    OPEN_METEO_CACHE_DIR,
+    WF_IMPORT_CHECKPOINT_FILE,
+    WF_IMPORT_INCREMENTAL_LOOKBACK_DAYS,
+    OPEN_METEO_ARCHIVE_DELAY_DAYS,
+    OPEN_METEO_GRID_RESOLUTION,
+    WF_IMPORT_OUTPUT_COLUMNAR,
+    WF_IMPORT_COLUMNAR_CHUNK_ROWS,
+    WF_IMPORT_CSV_FLUSH_ROWS,
+    WF_IMPORT_MAINTAIN_ROLLUPS,
 )
 
-from open_meteo import fetch_hourly
+from . import compression
+from .checkpoint import Checkpoint
+from .columnar import ColumnarReader, ColumnarWriter
+from .coverage import CoverageEntries, CoverageTracker, complete_days, missing_ranges
+from .fetcher import fetch_unit, fetch_unit_splitting
+from .grid import GridCell, as_location, dedup_report, snap_to_grid
+from .planner import plan_report, plan_requests
+from .sinks import PostgresSink, peak_rss_mb
+from .stages import StageStats, consume, ordered_stage
+from .transform import HourlyColumns, cell_block, hourly_columns
+from .wf_csv import (
+    WF_CSV_COLUMNS,
+    WF_CSV_PROGRESS_EVERY,
+    WF_CSV_RANGES_PER_WORKER,
+    csv_byte_ranges,
+    import_csv_range,
+    parse_wf_csv_records,
+    wf_csv_column_indexes,
+)
 
 
 class _NoopProgress:
@@ -57,7 +93,7 @@ def load_cities_from_csv(path: str):
         raise SystemExit(f"Cities CSV file not found: {path}")
 
     locations = []
-    with open(path, newline="", encoding="utf-8") as f:
+    with profiling.stage("load_locations"), compression.open_text(path) as f:
         reader = csv.DictReader(f)
         for row in reader:
             locations.append((
@@ -70,9 +106,10 @@ def load_cities_from_csv(path: str):
 
 def load_cities_from_db(db_dsn: str):
     from adapters import WeatherForecastPgDbAdapter
-    db_adapter = WeatherForecastPgDbAdapter(db_dsn)
-    rows = db_adapter.read_all_cities()
-    return [(r["id"], r["latitude"], r["longitude"]) for r in rows]
+    with profiling.stage("load_locations"):
+        db_adapter = WeatherForecastPgDbAdapter(db_dsn)
+        rows = db_adapter.read_all_cities()
+        return [(r["id"], r["latitude"], r["longitude"]) for r in rows]
 
 
 # -----------------------------
@@ -106,106 +143,320 @@ def load_locations(db_dsn: Optional[str], cities_csv_input: Optional[str]):
     return load_cities_from_csv(cities_csv_input)
 
 
+def plan_fetch_units(locations, from_date, to_date, grid_resolution: float = OPEN_METEO_GRID_RESOLUTION):
+    return plan_requests(snap_to_grid(locations, grid_resolution), from_date, to_date)
+
+
+def plan_incremental_units(locations, months, coverage, grid_resolution: float = OPEN_METEO_GRID_RESOLUTION):
+    """Fetch units covering only the days missing from the coverage ledger.
+
+    Gaps of a city spanning a month boundary are merged, cities missing the same
+    range are planned together, so a daily run where every city misses the latest
+    days costs as many requests as a full run of that range.
+    """
+    gaps = {}
+    for item in locations:
+        location = as_location(item)
+        city_gaps = []
+        for start, end in months:
+            loaded = coverage.get((location.city_id, start.replace(day=1)), 0)
+            for gap_start, gap_end in missing_ranges(loaded, start, end):
+                if city_gaps and city_gaps[-1][1] + timedelta(days=1) == gap_start:
+                    city_gaps[-1] = (city_gaps[-1][0], gap_end)
+                else:
+                    city_gaps.append((gap_start, gap_end))
+        for gap in city_gaps:
+            gaps.setdefault(gap, []).append(location)
+
+    units = []
+    for start, end in sorted(gaps):
+        units.extend(plan_requests(snap_to_grid(gaps[start, end], grid_resolution), start, end))
+    return units
+
+
 # -----------------------------
 # MAIN IMPORT LOGIC
 # -----------------------------
 
+class TransformedCell(NamedTuple):
+    cell: GridCell
+    # hourly rows of the cities of the cell
+    rows: int
+    csv_text: Optional[str]
+    columns: Optional[HourlyColumns]
+    block: Optional[Tuple[np.ndarray, ...]]
+    dropped: int
+    days: Optional[CoverageEntries]
+
+
+def transform_unit(fetched, csv_text: bool, columns: bool, blocks: bool):
+    """Transform stage: turn the response of a unit into what the sinks write.
+
+    Runs in the transform workers, so CSV formatting and the column conversions
+    overlap with fetching and loading. Every requested grid cell is fanned out to the
+    cities it serves.
+    """
+    unit, data = fetched
+    with telemetry.timed("wf_transform_seconds", "wf.transform"), profiling.stage("transform"):
+        return unit, [
+            _transform_cell(cell, location_data, csv_text, columns, blocks)
+            for cell, location_data in zip(unit.batch, data)
+        ]
+
+
+def _transform_cell(cell: GridCell, location_data, csv_text: bool, columns: bool, blocks: bool) -> TransformedCell:
+    hourly = location_data["hourly"]
+    text = None
+    if csv_text:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for member in cell.members:
+            writer.writerows(zip(
+                repeat(member.longitude),
+                repeat(member.latitude),
+                hourly["time"],
+                hourly["temperature_2m"],
+                hourly["wind_speed_10m"],
+                hourly["precipitation"]
+            ))
+        text = buffer.getvalue()
+
+    cell_columns = hourly_columns(location_data) if columns else None
+    block, dropped, days = None, 0, None
+    if blocks:
+        block, dropped = cell_block(cell, cell_columns)
+        days = complete_days(cell, cell_columns)
+    rows = len(cell.members) * len(hourly["time"])
+    return TransformedCell(cell, rows, text, cell_columns, block, dropped, days)
+
+
 def import_wf_actuals_from_open_meteo(
     from_date: date,
     to_date: date,
     db_dsn: str,
     cities_csv_input: Optional[str] = None,
     export_to_csv: bool = False,
-    export_to_postgres: bool = True
+    export_to_postgres: bool = True,
+    export_to_columnar: bool = False,
+    csv_output: str = WF_IMPORT_OUTPUT_CSV,
+    concurrency: int = OPEN_METEO_CONCURRENCY,
+    transform_workers: int = WF_IMPORT_TRANSFORM_WORKERS,
+    stage_queue_size: int = WF_IMPORT_STAGE_QUEUE_SIZE,
+    db_flush_rows: int = WF_IMPORT_DB_FLUSH_ROWS,
+    db_load_method: str = WF_IMPORT_DB_LOAD_METHOD,
+    db_commit_every: Optional[int] = None,
+    db_single_transaction: bool = False,
+    cache_dir: Optional[str] = OPEN_METEO_CACHE_DIR,
+    offline: bool = False,
+    checkpoint_file: str = WF_IMPORT_CHECKPOINT_FILE,
+    resume: bool = False,
+    incremental: bool = False,
+    grid_resolution: float = OPEN_METEO_GRID_RESOLUTION,
+    plan_only: bool = False
 ) -> None:
 
+    if incremental:
+        if not db_dsn or not db_dsn.strip() or not export_to_postgres:
+            raise SystemExit("Incremental import reads the coverage ledger and requires the Postgres export")
+        # the archive API publishes a day with a few days delay
+        to_date = to_date or date.today() - timedelta(days=OPEN_METEO_ARCHIVE_DELAY_DAYS)
+        from_date = from_date or to_date - timedelta(days=WF_IMPORT_INCREMENTAL_LOOKBACK_DAYS)
+
     if from_date >= to_date:
         raise SystemError("from_date must be strictly before to_date")
 
     if export_to_postgres and not db_dsn.strip():
         raise SystemError("Postgres export requires a valid db_dsn")
 
-    locations = load_locations(db_dsn, cities_csv_input)
-    months = month_ranges_between(from_date, to_date)
+    if offline and not cache_dir:
+        raise SystemExit("Offline mode replays the response cache and requires a cache directory")
 
-    total_requests = (
-        ((len(locations) + OPEN_METEO_BATCH_SIZE - 1) // OPEN_METEO_BATCH_SIZE)
-        * len(months)
-    )
+    cache = None
+    if cache_dir:
+        from open_meteo import ResponseCache
+        cache = ResponseCache(cache_dir, offline=offline)
 
     db_adapter = None
     if db_dsn.strip():
         from adapters import WeatherForecastPgDbAdapter
-        db_adapter = WeatherForecastPgDbAdapter(db_dsn)
+        db_adapter = WeatherForecastPgDbAdapter(db_dsn, pool_size=POSTGRES_POOL_SIZE)
+
+    locations = load_locations(db_dsn, cities_csv_input)
+    if incremental:
+        months = month_ranges_between(from_date, to_date)
+        coverage_ledger = db_adapter.read_coverage(from_date, to_date)
+        units = plan_incremental_units(locations, months, coverage_ledger, grid_resolution)
+        full = len(plan_fetch_units(locations, from_date, to_date, grid_resolution))
+        print(f"[INFO] Incremental import: {len(units)} units to fetch for missing days, {full} for the full window")
+    else:
+        units = plan_fetch_units(locations, from_date, to_date, grid_resolution)
+    print(f"[INFO] Grid dedup: {dedup_report(units, grid_resolution)}")
+    print(f"[INFO] Request plan: {plan_report(units, concurrency)}")
+
+    if plan_only:
+        if db_adapter:
+            db_adapter.close()
+        return
+
+    checkpoint = Checkpoint(
+        checkpoint_file,
+        run={
+            "from_date": from_date,
+            "to_date": to_date,
+            "cities": cities_csv_input if not db_dsn.strip() else "db",
+            "export_to_csv": export_to_csv,
+            "csv_output": csv_output if export_to_csv else None,
+            "export_to_columnar": export_to_columnar,
+            "export_to_postgres": export_to_postgres,
+            "incremental": incremental,
+            "grid_resolution": grid_resolution,
+        },
+        resume=resume
+    )
+    if resume:
+        planned = len(units)
+        units = [u for u in units if not checkpoint.is_done(u)]
+        print(f"[INFO] Resuming from {checkpoint_file}: {planned - len(units)} of {planned} units already completed")
 
     csv_out = None
     writer = None
     if export_to_csv:
-        csv_out = open(WF_IMPORT_OUTPUT_CSV, "w", newline="", encoding="utf-8")
+        # a resumed run appends to the CSV written by the interrupted one
+        append = resume and checkpoint.completed > 0 and os.path.exists(csv_output)
+        csv_out = compression.open_text(csv_output, "a" if append else "w")
         writer = csv.writer(csv_out)
-        writer.writerow([
-            "longitude",
-            "latitude",
-            "timestamp_utc",
-            "temperature_c",
-            "wind_speed_m_s",
-            "precipitation_mm"
-        ])
-
-    db_buffer = []
-
-    pbar_ctx = tqdm(total=total_requests, desc="Fetching Open-Meteo data", unit="request") if tqdm else _NoopProgress()
-    with pbar_ctx as pbar:
-        for batch in chunked(locations, OPEN_METEO_BATCH_SIZE):
-            first = batch[0]
-            if len(first) == 3:
-                lats = [x[1] for x in batch]
-                lons = [x[2] for x in batch]
-            else:
-                lats = [x[0] for x in batch]
-                lons = [x[1] for x in batch]
-
-            for start, end in months:
-                data = fetch_hourly(
-                    latitudes=lats,
-                    longitudes=lons,
-                    start_date=start,
-                    end_date=end,
-                    variables=OPEN_METEO_HOURLY_VARS,
-                    timezone=WF_IMPORT_TIMEZONE,
-                    max_retries=OPEN_METEO_MAX_RETRIES
-                )
-
-                for idx, location_data in enumerate(data):
-                    hourly = location_data["hourly"]
-
-                    for t, temp, wind, rain in zip(
-                        hourly["time"],
-                        hourly["temperature_2m"],
-                        hourly["wind_speed_10m"],
-                        hourly["precipitation"]
-                    ):
-                        if export_to_csv:
-                            writer.writerow([lons[idx], lats[idx], t, temp, wind, rain])
-
-                        if export_to_postgres and db_adapter:
-                            cid = batch[idx][0] if len(batch[idx]) == 3 else None
-                            db_buffer.append({
-                                "city_id": cid,
-                                "timestamp_utc": t,
-                                "temperature_c": temp,
-                                "wind_speed": wind,
-                                "precipitation": rain
-                            })
-
-                pbar.update(1)
-                time.sleep(OPEN_METEO_THROTTLE_SECONDS)
-
+        if not append:
+            writer.writerow(WF_CSV_COLUMNS)
+
+    def export_flush_started():
+        # the CSV holds at least the rows of the chunk about to be written
+        if csv_out:
+            csv_out.flush()
+        checkpoint.flush_started()
+
+    # without Postgres the exports make the units durable, checkpointed when a chunk is written
+    db_export = export_to_postgres and db_adapter is not None
+    columnar = None
+    if export_to_columnar:
+        columnar = ColumnarWriter(
+            WF_IMPORT_OUTPUT_COLUMNAR,
+            chunk_rows=WF_IMPORT_COLUMNAR_CHUNK_ROWS,
+            append=resume and checkpoint.completed > 0,
+            on_flush=None if db_export else export_flush_started,
+            after_flush=None if db_export else checkpoint.committed
+        )
+
+    db_sink = None
+    coverage = None
+    db_session = nullcontext()
+    if db_export:
+        from adapters import SKIP_EXISTING_METHODS
+        if incremental and db_load_method not in SKIP_EXISTING_METHODS:
+            # days partially loaded by an earlier run are fetched again, existing rows are skipped
+            print(f"[INFO] Incremental import loads with INSERT ... ON CONFLICT DO NOTHING instead of {db_load_method}")
+            db_load_method = "insert"
+        coverage = CoverageTracker(db_adapter)
+
+        def flush_started():
+            # exported rows are durable before the units they hold can be checkpointed
+            if csv_out:
+                csv_out.flush()
+            if columnar:
+                columnar.flush()
+            checkpoint.flush_started()
+            coverage.flush_started()
+
+        db_sink = PostgresSink(
+            db_adapter,
+            max_rows=db_flush_rows,
+            load_method=db_load_method,
+            on_flush=flush_started,
+            after_flush=coverage.record,
+            skip_existing=incremental
+        )
+        db_session = db_adapter.session(
+            commit_every=db_commit_every, single_transaction=db_single_transaction, on_commit=checkpoint.committed
+        )
+
+    fetch_splitting = partial(fetch_unit_splitting, cache=cache, fetch=fetch_unit)
+
+    def fetch(unit):
+        with telemetry.span("wf.fetch", locations=len(unit.batch), start=str(unit.start), end=str(unit.end)), \
+                profiling.stage("fetch"):
+            return fetch_splitting(unit)
+
+    transform = partial(
+        transform_unit, csv_text=export_to_csv, columns=bool(db_sink or columnar), blocks=db_sink is not None
+    )
+    fetch_stats = StageStats("fetch", concurrency, stage_queue_size)
+    transform_stats = StageStats("transform", transform_workers, stage_queue_size)
+    sink_stats = StageStats("sink", 1)
+    null_temperatures = 0
+    csv_unflushed_rows = 0
+
+    def flush_exports():
+        if columnar:
+            columnar.flush()
+        export_flush_started()
+        checkpoint.committed()
+
+    def sink(transformed):
+        nonlocal null_temperatures, csv_unflushed_rows
+        unit, cells = transformed
+        for cell in cells:
+            if csv_out:
+                with profiling.stage("csv_write"):
+                    csv_out.write(cell.csv_text)
+                telemetry.increment("wf_sink_rows_total", cell.rows, sink="csv")
+            if columnar:
+                with profiling.stage("columnar_write"):
+                    for member in cell.cell.members:
+                        columnar.write(member.longitude, member.latitude, cell.columns.time, cell.columns[1:])
+                telemetry.increment("wf_sink_rows_total", cell.rows, sink="columnar")
+            if db_sink:
+                # days first: the flush this block may trigger records them with their rows
+                coverage.add(cell.days)
+                db_sink.write_block(cell.block)
+                null_temperatures += cell.dropped
+
+        checkpoint.mark_written(unit)
+        if csv_out and not db_sink and not columnar:
+            csv_unflushed_rows += sum(cell.rows for cell in cells)
+            if csv_unflushed_rows >= WF_IMPORT_CSV_FLUSH_ROWS:
+                flush_exports()
+                csv_unflushed_rows = 0
+        telemetry.increment("wf_units_total", outcome="done")
+        pbar.update(1)
+
+    pbar_ctx = tqdm(total=len(units), desc="Fetching Open-Meteo data", unit="request") if tqdm else _NoopProgress()
+    with pbar_ctx as pbar, db_session, db_sink if db_sink else nullcontext():
+        fetched = ordered_stage(units, lambda unit: (unit, fetch(unit)), fetch_stats)
+        transformed = ordered_stage(fetched, transform, transform_stats)
+        consume(transformed, sink, sink_stats)
+        if not db_sink:
+            flush_exports()
+
+    for stats in (fetch_stats, transform_stats, sink_stats):
+        print(f"[INFO] Stage {stats.report()}")
+
+    checkpoint.close()
     if csv_out:
         csv_out.close()
 
-    if export_to_postgres and db_adapter and db_buffer:
-        db_adapter.insert_wfactuals(db_buffer)
+    if columnar:
+        columnar.close()
+        print(f"[INFO] Columnar export: {columnar.rows} rows in {WF_IMPORT_OUTPUT_COLUMNAR}")
+
+    if db_sink:
+        print(f"[INFO] Postgres sink: {db_sink.report()}, {coverage.recorded_days} city days recorded in the coverage ledger")
+        if null_temperatures:
+            print(f"[WARN] Skipped {null_temperatures} rows without temperature")
+
+    if cache:
+        print(f"[INFO] Open-Meteo cache: {cache.report()}")
+
+    if db_adapter:
+        db_adapter.close()
 
 
 # -----------------------------
@@ -214,9 +465,27 @@ def import_wf_actuals_from_open_meteo(
 
 def import_wf_actuals_from_csv(
     wf_actual_csv_input: str,
-    db_dsn: Optional[str] = None
+    db_dsn: Optional[str] = None,
+    db_commit_every: Optional[int] = None,
+    db_single_transaction: bool = False,
+    db_load_method: str = WF_IMPORT_DB_LOAD_METHOD,
+    workers: int = 1
 ) -> None:
+    """Stream a weather CSV into wf_actuals with constant memory.
+
+    The file is read through a large buffer and parsed record by record with
+    positional column indexes, rows are flushed every WF_IMPORT_CSV_INPUT_READ_BATCH_SIZE.
+    Progress is reported in bytes read, so no pre-count of the file is needed.
 
+    With `workers > 1` the file is split in newline-aligned byte ranges parsed by a
+    process pool, each worker loading its ranges over its own database connection.
+    A (city, day) can straddle two ranges, so the workers leave the rollups alone and
+    their months are rebuilt once every range is loaded.
+
+    `.gz` and `.zst` files are decompressed on the fly by a background thread (see
+    `pipeline.compression`), progress is then reported in compressed bytes. They
+    cannot be split in byte ranges and are always imported sequentially.
+    """
     if not wf_actual_csv_input or wf_actual_csv_input.strip() == "":
         raise SystemExit("No weather CSV input provided")
 
@@ -226,49 +495,183 @@ def import_wf_actuals_from_csv(
     if not db_dsn or db_dsn.strip() == "":
         raise SystemExit("Postgres import requires a valid db_dsn")
 
+    if workers > 1 and compression.is_compressed(wf_actual_csv_input):
+        print(f"[INFO] {wf_actual_csv_input} is compressed and cannot be split, importing it sequentially")
+        workers = 1
+
+    if workers > 1 and db_single_transaction:
+        raise SystemExit("A single transaction cannot span several CSV import workers")
+
     from adapters import WeatherForecastPgDbAdapter
-    db_adapter = WeatherForecastPgDbAdapter(db_dsn)
+    db_adapter = WeatherForecastPgDbAdapter(db_dsn, pool_size=POSTGRES_POOL_SIZE)
+
+    lookup_by_lonlat = city_lookup_by_lonlat(db_adapter)
+
+    if workers > 1:
+        db_adapter.close()
+        _import_wf_actuals_from_csv_parallel(
+            wf_actual_csv_input, lookup_by_lonlat, db_dsn, db_load_method, db_commit_every, workers
+        )
+        return
 
+    stats = {"read": 0, "skipped": 0, "unmatched": 0, "first": None, "last": None}
+    db_sink = PostgresSink(db_adapter, max_rows=WF_IMPORT_CSV_INPUT_READ_BATCH_SIZE, load_method=db_load_method)
+    db_session = db_adapter.session(commit_every=db_commit_every, single_transaction=db_single_transaction)
+
+    total_bytes = os.path.getsize(wf_actual_csv_input)
+    pbar_ctx = tqdm(total=total_bytes, desc="Importing wf_actuals from CSV", unit="B", unit_scale=True) if tqdm else _NoopProgress()
+
+    with open(wf_actual_csv_input, "rb", buffering=WF_IMPORT_CSV_READ_BUFFER_BYTES) as raw, \
+            compression.reader(raw, wf_actual_csv_input) as stream, \
+            io.TextIOWrapper(stream, encoding="utf-8", newline="") as f, \
+            pbar_ctx as pbar, db_session, db_sink:
+        records = csv.reader(f)
+        indexes = wf_csv_column_indexes(next(records, []))
+
+        reported = 0
+        for row in parse_wf_csv_records(records, indexes, lookup_by_lonlat, stats):
+            db_sink.write(row)
+            if stats["read"] % WF_CSV_PROGRESS_EVERY == 0:
+                # the raw position runs ahead by at most one read buffer (plus the read-ahead chunks)
+                position = raw.tell()
+                pbar.update(position - reported)
+                reported = position
+        pbar.update(total_bytes - reported)
+
+    refresh_coverage(db_adapter, stats["first"], stats["last"])
+    db_adapter.close()
+    print(
+        f"[INFO] Read {stats['read']} records, skipped {stats['skipped']} invalid, "
+        f"{stats['unmatched']} without matching city. Postgres sink: {db_sink.report()}"
+    )
+
+
+def city_lookup_by_lonlat(db_adapter):
     lookup_by_lonlat = {}
     for r in db_adapter.read_all_cities():
-        lookup_by_lonlat[(round(float(r["longitude"]), 6), round(float(r["latitude"]), 6))] = r["id"]
-
-    with open(wf_actual_csv_input, newline="", encoding="utf-8") as f:
-        rows = list(csv.DictReader(f))
-
-    data_buffer = []
-    pbar_ctx = tqdm(total=len(rows), desc="Importing wf_actuals from CSV", unit="row") if tqdm else _NoopProgress()
-
-    with pbar_ctx as pbar:
-        for row in rows:
-            try:
-                lon = round(float(row["longitude"]), 6)
-                lat = round(float(row["latitude"]), 6)
-            except Exception:
-                pbar.update(1)
-                continue
-
-            cid = lookup_by_lonlat.get((lon, lat))
-            if not cid:
-                pbar.update(1)
-                continue
-
-            data_buffer.append({
-                "city_id": cid,
-                "timestamp_utc": row["timestamp_utc"],
-                "temperature_c": float(row["temperature_c"]),
-                "wind_speed": float(row["wind_speed_m_s"]),
-                "precipitation": float(row["precipitation_mm"])
-            })
-
-            if len(data_buffer) >= WF_IMPORT_CSV_INPUT_READ_BATCH_SIZE:
-                db_adapter.insert_wfactuals(data_buffer)
-                data_buffer = []
-
-            pbar.update(1)
-
-    if data_buffer:
-        db_adapter.insert_wfactuals(data_buffer)
+        lookup_by_lonlat[(round(r["longitude"], 6), round(r["latitude"], 6))] = r["id"]
+    return lookup_by_lonlat
+
+
+def refresh_coverage(db_adapter, first: Optional[str], last: Optional[str]) -> None:
+    """CSV loads bypass the coverage ledger, rebuild it for the months they touched."""
+    if first is None:
+        return
+    written = db_adapter.refresh_coverage(date.fromisoformat(first[:10]), date.fromisoformat(last[:10]))
+    print(f"[INFO] Coverage ledger refreshed from {first[:7]} to {last[:7]}: {written} city months")
+
+
+def rebuild_rollups_between(db_adapter, first: Optional[str], last: Optional[str]) -> None:
+    """Rebuild the rollups of the months between two timestamps, for loads that did not maintain them."""
+    if first is None or not WF_IMPORT_MAINTAIN_ROLLUPS:
+        return
+    daily, monthly = db_adapter.rebuild_rollups(date.fromisoformat(first[:10]), date.fromisoformat(last[:10]))
+    print(f"[INFO] Rollups rebuilt from {first[:7]} to {last[:7]}: {daily} daily and {monthly} monthly rows")
+
+
+def _import_wf_actuals_from_csv_parallel(path, lookup_by_lonlat, db_dsn, db_load_method, db_commit_every, workers):
+    # more ranges than workers keeps every process busy until the end and refreshes progress
+    header, ranges = csv_byte_ranges(path, workers * WF_CSV_RANGES_PER_WORKER)
+    indexes = wf_csv_column_indexes(header)
+
+    totals = {"read": 0, "skipped": 0, "unmatched": 0, "written": 0, "flushes": 0}
+    first = last = None
+    total_bytes = sum(end - start for start, end in ranges)
+    pbar_ctx = tqdm(total=total_bytes, desc=f"Importing wf_actuals from CSV ({workers} workers)", unit="B", unit_scale=True) if tqdm else _NoopProgress()
+
+    with pbar_ctx as pbar, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(import_csv_range, path, start, end, indexes, lookup_by_lonlat, db_dsn, db_load_method, db_commit_every)
+            for start, end in ranges
+        ]
+        try:
+            for future in as_completed(futures):
+                stats = future.result()
+                for key in totals:
+                    totals[key] += stats[key]
+                if stats["first"] is not None:
+                    first = stats["first"] if first is None else min(first, stats["first"])
+                    last = stats["last"] if last is None else max(last, stats["last"])
+                pbar.update(stats["bytes"])
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    from adapters import WeatherForecastPgDbAdapter
+    with WeatherForecastPgDbAdapter(db_dsn) as db_adapter:
+        refresh_coverage(db_adapter, first, last)
+        rebuild_rollups_between(db_adapter, first, last)
+
+    print(
+        f"[INFO] Read {totals['read']} records, skipped {totals['skipped']} invalid, "
+        f"{totals['unmatched']} without matching city. "
+        f"Postgres: {totals['written']} rows in {totals['flushes']} flushes over {len(ranges)} ranges, "
+        f"parent peak RSS {peak_rss_mb():.1f} MB"
+    )
+
+
+# -----------------------------
+# COLUMNAR IMPORT TO POSTGRES
+# -----------------------------
+
+def import_wf_actuals_from_columnar(
+    wf_actual_columnar_input: str,
+    db_dsn: Optional[str] = None,
+    db_commit_every: Optional[int] = None,
+    db_single_transaction: bool = False,
+    db_load_method: str = WF_IMPORT_DB_LOAD_METHOD,
+    db_flush_rows: int = WF_IMPORT_DB_FLUSH_ROWS
+) -> None:
+    """Load a columnar export (see `pipeline.columnar`) into wf_actuals.
+
+    Chunks are memory-mapped and handed to the sink as typed column blocks, locations
+    are matched to cities once per export instead of once per row.
+    """
+    if not db_dsn or db_dsn.strip() == "":
+        raise SystemExit("Postgres import requires a valid db_dsn")
+
+    reader = ColumnarReader(wf_actual_columnar_input)
+
+    from adapters import WeatherForecastPgDbAdapter
+    db_adapter = WeatherForecastPgDbAdapter(db_dsn, pool_size=POSTGRES_POOL_SIZE)
+    lookup_by_lonlat = city_lookup_by_lonlat(db_adapter)
+    city_of_location = np.array(
+        [lookup_by_lonlat.get((round(lon, 6), round(lat, 6)), -1) for lon, lat in reader.locations.tolist()],
+        dtype=np.int32
+    )
+
+    stats = {"read": 0, "skipped": 0, "unmatched": 0}
+    first = last = None
+    db_sink = PostgresSink(db_adapter, max_rows=db_flush_rows, load_method=db_load_method)
+    db_session = db_adapter.session(commit_every=db_commit_every, single_transaction=db_single_transaction)
+
+    pbar_ctx = tqdm(total=reader.rows, desc="Importing wf_actuals from columnar export", unit="row", unit_scale=True) if tqdm else _NoopProgress()
+    with pbar_ctx as pbar, db_session, db_sink:
+        for block in reader.blocks(db_flush_rows):
+            city_ids = city_of_location[block.location]
+            matched = city_ids >= 0
+            keep = matched & ~np.isnan(block.temperature)
+            stats["read"] += len(city_ids)
+            stats["unmatched"] += len(city_ids) - int(matched.sum())
+            stats["skipped"] += int(matched.sum()) - int(keep.sum())
+            if keep.any():
+                times = block.time[keep]
+                first = min(first, times.min()) if first is not None else times.min()
+                last = max(last, times.max()) if last is not None else times.max()
+                db_sink.write_block((
+                    times, city_ids[keep], block.temperature[keep], block.wind_speed[keep], block.precipitation[keep]
+                ))
+            pbar.update(len(city_ids))
+
+    if first is not None:
+        refresh_coverage(db_adapter, str(first), str(last))
+    db_adapter.close()
+    print(
+        f"[INFO] Read {stats['read']} rows ({reader.size_bytes / (1024 * 1024):.1f} MB on disk), "
+        f"skipped {stats['skipped']} without temperature, {stats['unmatched']} without matching city. "
+        f"Postgres sink: {db_sink.report()}"
+    )
 
 
 # -----------------------------
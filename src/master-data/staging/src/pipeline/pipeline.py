@@ -1,6 +1,6 @@
 """High-level pipeline orchestrator.
 
-Provides two functions used by the CLI in `main.py`:
+Provides the functions used by the CLI in `main.py`:
 - cities_import(input_path, dsn)
 - wf_import(
         from_date: Optional[date], 
@@ -9,13 +9,49 @@ Provides two functions used by the CLI in `main.py`:
         cities_csv_input: Optional[str] = None, 
         export_to_csv: bool = False, 
         export_to_postgres: bool = True,
-        weather_csv_input: Optional[str] = None)
+        export_to_columnar: bool = False,
+        csv_output: str = WF_IMPORT_OUTPUT_CSV,
+        weather_csv_input: Optional[str] = None,
+        concurrency: int = OPEN_METEO_CONCURRENCY,
+        transform_workers: int = WF_IMPORT_TRANSFORM_WORKERS,
+        stage_queue_size: int = WF_IMPORT_STAGE_QUEUE_SIZE,
+        db_flush_rows: int = WF_IMPORT_DB_FLUSH_ROWS,
+        db_load_method: str = WF_IMPORT_DB_LOAD_METHOD,
+        db_commit_every: Optional[int] = None,
+        db_single_transaction: bool = False,
+        workers: int = WF_IMPORT_CSV_WORKERS,
+        cache_dir: Optional[str] = OPEN_METEO_CACHE_DIR,
+        offline: bool = False,
+        checkpoint_file: str = WF_IMPORT_CHECKPOINT_FILE,
+        resume: bool = False,
+        incremental: bool = False,
+        grid_resolution: float = OPEN_METEO_GRID_RESOLUTION,
+        plan_only: bool = False)
+- wf_plan(run_id, from_date, to_date, dsn, ...) / wf_worker(run_id, dsn, ...)
+- wf_retention(dsn, keep_months, before, detach_only, dry_run)
+- wf_rollups(dsn, from_date, to_date)
 
 This keeps CLI small and centralises logic here for testability.
 """
 from typing import Optional
 from datetime import date
 
+from config import (
+    OPEN_METEO_CONCURRENCY,
+    WF_IMPORT_TRANSFORM_WORKERS,
+    WF_IMPORT_STAGE_QUEUE_SIZE,
+    WF_IMPORT_DB_FLUSH_ROWS,
+    WF_IMPORT_DB_LOAD_METHOD,
+    WF_IMPORT_CSV_WORKERS,
+    OPEN_METEO_CACHE_DIR,
+    WF_IMPORT_CHECKPOINT_FILE,
+    OPEN_METEO_GRID_RESOLUTION,
+    WF_IMPORT_OUTPUT_CSV,
+    WF_QUEUE_LEASE_SECONDS,
+    WF_QUEUE_MAX_ATTEMPTS,
+    WF_ACTUALS_RETENTION_MONTHS,
+)
+
 
 def cities_import(input_path: str, dsn: str) -> int:
     """Run the hourly fetch pipeline.
@@ -39,18 +75,51 @@ def wf_import(
         cities_csv_input: Optional[str] = None, 
         export_to_csv: bool = False, 
         export_to_postgres: bool = True,
-        weather_csv_input: Optional[str] = None) -> None:
+        export_to_columnar: bool = False,
+        csv_output: str = WF_IMPORT_OUTPUT_CSV,
+        weather_csv_input: Optional[str] = None,
+        concurrency: int = OPEN_METEO_CONCURRENCY,
+        transform_workers: int = WF_IMPORT_TRANSFORM_WORKERS,
+        stage_queue_size: int = WF_IMPORT_STAGE_QUEUE_SIZE,
+        db_flush_rows: int = WF_IMPORT_DB_FLUSH_ROWS,
+        db_load_method: str = WF_IMPORT_DB_LOAD_METHOD,
+        db_commit_every: Optional[int] = None,
+        db_single_transaction: bool = False,
+        workers: int = WF_IMPORT_CSV_WORKERS,
+        cache_dir: Optional[str] = OPEN_METEO_CACHE_DIR,
+        offline: bool = False,
+        checkpoint_file: str = WF_IMPORT_CHECKPOINT_FILE,
+        resume: bool = False,
+        incremental: bool = False,
+        grid_resolution: float = OPEN_METEO_GRID_RESOLUTION,
+        plan_only: bool = False) -> None:
     """Run the hourly fetch pipeline.
 
     - If export_to_postgres is True, `dsn` is required and locations are loaded from DB.
     - Otherwise the behaviour falls back to the extractor which may require an input CSV.
     """
     from . import importer
+    from .columnar import is_columnar_export
+
+    if weather_csv_input and is_columnar_export(weather_csv_input):
+        importer.import_wf_actuals_from_columnar(
+            wf_actual_columnar_input=weather_csv_input,
+            db_dsn=dsn,
+            db_commit_every=db_commit_every,
+            db_single_transaction=db_single_transaction,
+            db_load_method=db_load_method,
+            db_flush_rows=db_flush_rows
+        )
+        return
 
     if(weather_csv_input is not None and weather_csv_input.strip() != ""):
         importer.import_wf_actuals_from_csv(
             wf_actual_csv_input=weather_csv_input,
-            db_dsn=dsn
+            db_dsn=dsn,
+            db_commit_every=db_commit_every,
+            db_single_transaction=db_single_transaction,
+            db_load_method=db_load_method,
+            workers=workers
         )
         return
     # importer.import_wf_actuals will load locations from DB
@@ -62,5 +131,101 @@ def wf_import(
         db_dsn=dsn,
         cities_csv_input=cities_csv_input,
         export_to_csv=export_to_csv,
-        export_to_postgres=export_to_postgres
+        export_to_postgres=export_to_postgres,
+        export_to_columnar=export_to_columnar,
+        csv_output=csv_output,
+        concurrency=concurrency,
+        transform_workers=transform_workers,
+        stage_queue_size=stage_queue_size,
+        db_flush_rows=db_flush_rows,
+        db_load_method=db_load_method,
+        db_commit_every=db_commit_every,
+        db_single_transaction=db_single_transaction,
+        cache_dir=cache_dir,
+        offline=offline,
+        checkpoint_file=checkpoint_file,
+        resume=resume,
+        incremental=incremental,
+        grid_resolution=grid_resolution,
+        plan_only=plan_only
+    )
+
+
+def wf_plan(
+        run_id: str,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        dsn: str,
+        incremental: bool = False,
+        grid_resolution: float = OPEN_METEO_GRID_RESOLUTION,
+        requeue_dead: bool = False) -> None:
+    """Enqueue the work units of a distributed import run into the Postgres work queue."""
+    from .work_queue import plan_queue
+
+    plan_queue(
+        run_id=run_id,
+        from_date=from_date,
+        to_date=to_date,
+        db_dsn=dsn,
+        incremental=incremental,
+        grid_resolution=grid_resolution,
+        requeue_dead=requeue_dead
+    )
+
+
+def wf_worker(
+        run_id: str,
+        dsn: str,
+        worker_id: Optional[str] = None,
+        db_load_method: str = WF_IMPORT_DB_LOAD_METHOD,
+        db_flush_rows: int = WF_IMPORT_DB_FLUSH_ROWS,
+        skip_existing: bool = False,
+        cache_dir: Optional[str] = OPEN_METEO_CACHE_DIR,
+        offline: bool = False,
+        lease_seconds: float = WF_QUEUE_LEASE_SECONDS,
+        max_attempts: int = WF_QUEUE_MAX_ATTEMPTS,
+        max_units: Optional[int] = None) -> None:
+    """Claim and load the units of a distributed import run until the queue is drained."""
+    from .work_queue import run_worker
+
+    run_worker(
+        run_id=run_id,
+        db_dsn=dsn,
+        worker_id=worker_id,
+        db_load_method=db_load_method,
+        db_flush_rows=db_flush_rows,
+        skip_existing=skip_existing,
+        cache_dir=cache_dir,
+        offline=offline,
+        lease_seconds=lease_seconds,
+        max_attempts=max_attempts,
+        max_units=max_units
+    )
+
+
+def wf_retention(
+        dsn: str,
+        keep_months: int = WF_ACTUALS_RETENTION_MONTHS,
+        before: Optional[date] = None,
+        detach_only: bool = False,
+        dry_run: bool = False) -> None:
+    """Drop (or detach) the monthly wf_actuals partitions older than the retention window."""
+    from .retention import apply_retention
+
+    apply_retention(
+        db_dsn=dsn,
+        keep_months=keep_months,
+        before=before,
+        detach_only=detach_only,
+        dry_run=dry_run
     )
+
+
+def wf_rollups(
+        dsn: str,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None) -> None:
+    """Rebuild the daily and monthly wf_actuals rollups from scratch (or for a date range)."""
+    from .rollups import rebuild_rollups
+
+    rebuild_rollups(db_dsn=dsn, from_date=from_date, to_date=to_date)
@@ -0,0 +1,164 @@
+"""
+Cost-aware planning of the Open-Meteo requests.
+
+A request is shaped by the number of grid cells it carries and the number of days it
+spans. Its cost is estimated from:
+- URL length: coordinates travel in the query string (OPEN_METEO_MAX_URL_LENGTH)
+- weighted calls: Open-Meteo's accounting, a cell costs one call per 14 days (OPEN_METEO_MAX_CALL_WEIGHT)
+- response size: location-hours x OPEN_METEO_EST_BYTES_PER_LOCATION_HOUR (OPEN_METEO_MAX_RESPONSE_MB)
+- latency: round trip plus transfer of the response (OPEN_METEO_TARGET_CALL_SECONDS)
+
+Cells are packed into calls up to the URL and weight limits, then every call spans the
+longest range keeping it within the size, weight and latency targets. Ranges are not
+cut on month boundaries: a short window is one call per batch of cells, a long window
+is split in spans of equal length. Calls failing anyway are split further at fetch
+time, see `fetcher.fetch_unit_splitting`.
+"""
+
+import math
+from datetime import timedelta
+from typing import List, NamedTuple
+from urllib.parse import quote
+
+from config import (
+    OPEN_METEO_API_URL,
+    OPEN_METEO_HOURLY_VARS,
+    OPEN_METEO_MAX_LOCATIONS_PER_CALL,
+    OPEN_METEO_MAX_URL_LENGTH,
+    OPEN_METEO_MAX_CALL_WEIGHT,
+    OPEN_METEO_MAX_RESPONSE_MB,
+    OPEN_METEO_TARGET_CALL_SECONDS,
+    OPEN_METEO_EST_BYTES_PER_LOCATION_HOUR,
+    OPEN_METEO_EST_ROUND_TRIP_SECONDS,
+    OPEN_METEO_EST_TRANSFER_MB_PER_SECOND,
+    OPEN_METEO_RATE_LIMIT_REQUESTS_PER_MINUTE,
+    OPEN_METEO_RATE_LIMIT_WEIGHT_PER_MINUTE,
+    OPEN_METEO_RATE_LIMIT_WEIGHT_PER_HOUR,
+)
+
+from open_meteo import request_weight
+
+from .fetcher import FetchUnit
+
+# start_date, end_date, hourly and timezone parameters, with room for their values
+_QUERY_OVERHEAD = len(OPEN_METEO_API_URL) + 120 + len(quote(",".join(OPEN_METEO_HOURLY_VARS)))
+
+
+def _coordinate_chars(cell) -> int:
+    # a comma is sent url-encoded (%2C) before every coordinate but the first
+    return len(str(cell.latitude)) + len(str(cell.longitude)) + 6
+
+
+def response_bytes(locations: int, days: int) -> int:
+    return locations * days * 24 * OPEN_METEO_EST_BYTES_PER_LOCATION_HOUR
+
+
+def call_seconds(locations: int, days: int) -> float:
+    transfer = response_bytes(locations, days) / (OPEN_METEO_EST_TRANSFER_MB_PER_SECOND * 1024 * 1024)
+    return OPEN_METEO_EST_ROUND_TRIP_SECONDS + transfer
+
+
+def call_weight(locations: int, days: int) -> float:
+    return request_weight(locations, days, len(OPEN_METEO_HOURLY_VARS))
+
+
+def _fits(locations: int, days: int) -> bool:
+    return (
+        call_weight(locations, days) <= OPEN_METEO_MAX_CALL_WEIGHT
+        and response_bytes(locations, days) <= OPEN_METEO_MAX_RESPONSE_MB * 1024 * 1024
+        and call_seconds(locations, days) <= OPEN_METEO_TARGET_CALL_SECONDS
+    )
+
+
+def pack_cells(cells) -> List[list]:
+    """Group cells in batches fitting the URL length, location count and one-day cost limits."""
+    batches = []
+    batch, url_length = [], _QUERY_OVERHEAD
+    for cell in cells:
+        chars = _coordinate_chars(cell)
+        if batch and (
+            url_length + chars > OPEN_METEO_MAX_URL_LENGTH
+            or len(batch) >= OPEN_METEO_MAX_LOCATIONS_PER_CALL
+            or not _fits(len(batch) + 1, 1)
+        ):
+            batches.append(batch)
+            batch, url_length = [], _QUERY_OVERHEAD
+        batch.append(cell)
+        url_length += chars
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def max_span_days(locations: int, days: int) -> int:
+    """Longest span (at most `days`) a call for `locations` cells can cover, at least one day."""
+    low, high = 1, days
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _fits(locations, middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def plan_requests(cells, start, end) -> List[FetchUnit]:
+    """Fetch units covering `cells` from `start` to `end` (inclusive), ordered by date then batch."""
+    days = (end - start).days + 1
+    shapes = []
+    for batch in pack_cells(cells):
+        calls = math.ceil(days / max_span_days(len(batch), days))
+        # equal spans instead of full spans and a short remainder
+        shapes.append((batch, math.ceil(days / calls)))
+
+    units = []
+    offsets = sorted({offset for _, span in shapes for offset in range(0, days, span)})
+    for offset in offsets:
+        for batch, span in shapes:
+            if offset % span:
+                continue
+            unit_start = start + timedelta(days=offset)
+            unit_end = min(end, unit_start + timedelta(days=span - 1))
+            lats = [c.latitude for c in batch]
+            lons = [c.longitude for c in batch]
+            units.append(FetchUnit(batch, lats, lons, unit_start, unit_end))
+    return units
+
+
+class PlanEstimate(NamedTuple):
+    calls: int
+    cells: int
+    rows: int
+    weight: float
+    response_mb: float
+    seconds: float
+
+
+def estimate_plan(units, concurrency: int = 1) -> PlanEstimate:
+    """Expected cost of fetching `units`, duration bound by latency or the API quotas."""
+    calls = len(units)
+    rows = weight = size = latency = 0
+    for unit in units:
+        days = (unit.end - unit.start).days + 1
+        rows += sum(len(cell.members) for cell in unit.batch) * days * 24
+        weight += call_weight(len(unit.batch), days)
+        size += response_bytes(len(unit.batch), days)
+        latency += call_seconds(len(unit.batch), days)
+
+    # quota buckets start full, only what exceeds their capacity waits for refills
+    seconds = max(
+        latency / max(1, concurrency),
+        max(0, calls - OPEN_METEO_RATE_LIMIT_REQUESTS_PER_MINUTE) * 60 / OPEN_METEO_RATE_LIMIT_REQUESTS_PER_MINUTE,
+        max(0, weight - OPEN_METEO_RATE_LIMIT_WEIGHT_PER_MINUTE) * 60 / OPEN_METEO_RATE_LIMIT_WEIGHT_PER_MINUTE,
+        max(0, weight - OPEN_METEO_RATE_LIMIT_WEIGHT_PER_HOUR) * 3600 / OPEN_METEO_RATE_LIMIT_WEIGHT_PER_HOUR,
+    )
+    cells = sum(len(unit.batch) for unit in units)
+    return PlanEstimate(calls, cells, rows, round(weight, 1), round(size / (1024 * 1024), 1), seconds)
+
+
+def plan_report(units, concurrency: int = 1) -> str:
+    e = estimate_plan(units, concurrency)
+    return (
+        f"{e.calls} calls for {e.cells} cell ranges, {e.rows} rows, {e.weight} weighted calls, "
+        f"~{e.response_mb} MB of responses, ~{timedelta(seconds=round(e.seconds))} expected duration"
+    )
@@ -0,0 +1,54 @@
+"""
+Retention of wf_actuals: whole monthly partitions are detached or dropped, old data
+never goes through a DELETE.
+"""
+
+from datetime import date, timedelta
+from typing import Optional
+
+from config import WF_ACTUALS_RETENTION_MONTHS, WF_IMPORT_INCREMENTAL_LOOKBACK_DAYS
+
+
+def retention_cutoff(keep_months: int, today: Optional[date] = None) -> date:
+    """First day of the oldest month kept when `keep_months` months before the current one are kept."""
+    today = today or date.today()
+    months = today.year * 12 + today.month - 1 - keep_months
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def apply_retention(
+    db_dsn: str,
+    keep_months: int = WF_ACTUALS_RETENTION_MONTHS,
+    before: Optional[date] = None,
+    detach_only: bool = False,
+    dry_run: bool = False
+) -> None:
+    """Remove the wf_actuals partitions of the months before `before` (or older than `keep_months`)."""
+    from adapters import WeatherForecastPgDbAdapter
+
+    if not db_dsn or not db_dsn.strip():
+        raise SystemExit("Retention requires a valid db_dsn")
+    if before is None:
+        if keep_months < 0:
+            raise SystemExit("--keep-months must be zero or positive")
+        before = retention_cutoff(keep_months)
+    before = date(before.year, before.month, 1)
+
+    if before > date.today() - timedelta(days=WF_IMPORT_INCREMENTAL_LOOKBACK_DAYS):
+        print(
+            f"[WARN] Retention cutoff {before} is within the {WF_IMPORT_INCREMENTAL_LOOKBACK_DAYS} days "
+            f"checked by incremental imports, they will fetch the removed months again"
+        )
+
+    db_adapter = WeatherForecastPgDbAdapter(db_dsn)
+    partitions = db_adapter.list_partitions()
+    expired = [name for month, name in partitions if month < before]
+    print(f"[INFO] {len(partitions)} wf_actuals partitions, {len(expired)} before {before}")
+    if dry_run:
+        for name in expired:
+            print(f"[INFO] Would {'detach' if detach_only else 'drop'} {name}")
+        return
+
+    removed = db_adapter.drop_partitions_before(before, detach_only=detach_only)
+    action = "Detached" if detach_only else "Dropped"
+    print(f"[INFO] {action} {len(removed)} partitions{': ' + ', '.join(removed) if removed else ''}")
@@ -0,0 +1,26 @@
+"""
+Rebuild of the wf_actuals_daily / wf_actuals_monthly rollups.
+
+Imports keep the rollups up to date for the days they load (see `sinks.PostgresSink`),
+a rebuild is only needed after loads that bypassed the sinks or to repair them.
+"""
+
+from datetime import date
+from typing import Optional
+
+
+def rebuild_rollups(db_dsn: str, from_date: Optional[date] = None, to_date: Optional[date] = None) -> None:
+    """Recompute the rollups from wf_actuals, of every month or of the months between two dates."""
+    from adapters import WeatherForecastPgDbAdapter
+
+    if not db_dsn or not db_dsn.strip():
+        raise SystemExit("Rebuilding the rollups requires a valid db_dsn")
+    if (from_date is None) != (to_date is None):
+        raise SystemExit("A partial rollup rebuild requires both --from-date and --to-date")
+    if from_date and from_date > to_date:
+        raise SystemExit("from_date must not be after to_date")
+
+    db_adapter = WeatherForecastPgDbAdapter(db_dsn)
+    window = f"from {from_date:%Y-%m} to {to_date:%Y-%m}" if from_date else "of every month"
+    daily, monthly = db_adapter.rebuild_rollups(from_date, to_date)
+    print(f"[INFO] Rebuilt the rollups {window}: {daily} daily and {monthly} monthly rows")
@@ -0,0 +1,177 @@
+"""
+Output sinks for the wf_actuals import paths.
+
+`PostgresSink` buffers rows and flushes them to `wf_actuals` as soon as the buffer
+reaches its row or memory budget, so the memory used by an import is bounded by the
+budget instead of growing with the number of fetched samples. Rows flushed before a
+failure stay in the database. Every flush also refreshes the daily and monthly
+rollups of the (city, day) buckets it touched, in the transaction loading its rows.
+
+Rows are positional tuples ordered as `adapters.WF_ACTUALS_COLUMNS`, or whole blocks
+of column arrays in the same order (see `pipeline.transform`).
+"""
+
+import resource
+import sys
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import profiling
+import telemetry
+from config import WF_IMPORT_DB_FLUSH_ROWS, WF_IMPORT_DB_FLUSH_MAX_MB, WF_IMPORT_DB_LOAD_METHOD, WF_IMPORT_MAINTAIN_ROLLUPS
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the current process in MB (ru_maxrss is KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _row_size(row: Sequence[Any]) -> int:
+    return sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+
+
+def _day_of(timestamp):
+    # ISO strings (weather CSV) or datetimes
+    return timestamp[:10] if isinstance(timestamp, str) else timestamp.date()
+
+
+def touched_days(rows: Sequence[Sequence[Any]], blocks: Sequence[Sequence[np.ndarray]]) -> Tuple[List[int], List[Any]]:
+    """Distinct (city_id, day) buckets of positional rows and column blocks, as two parallel lists."""
+    buckets = {(row[1], _day_of(row[0])) for row in rows}
+    for columns in blocks:
+        keys = np.unique(
+            np.stack((columns[1].astype(np.int64), columns[0].astype("datetime64[D]").astype(np.int64))), axis=1
+        )
+        buckets.update(zip(keys[0].tolist(), keys[1].astype("datetime64[D]").tolist()))
+    city_ids = [city_id for city_id, _ in buckets]
+    days = [day for _, day in buckets]
+    return city_ids, days
+
+
+class PostgresSink:
+    def __init__(
+        self,
+        db_adapter,
+        max_rows: int = WF_IMPORT_DB_FLUSH_ROWS,
+        max_mb: Optional[float] = WF_IMPORT_DB_FLUSH_MAX_MB,
+        load_method: str = WF_IMPORT_DB_LOAD_METHOD,
+        on_flush: Optional[Callable[[], None]] = None,
+        after_flush: Optional[Callable[[], None]] = None,
+        skip_existing: bool = False,
+        maintain_rollups: bool = WF_IMPORT_MAINTAIN_ROLLUPS
+    ):
+        if max_rows <= 0:
+            raise SystemExit("DB flush row budget must be a positive number")
+        self._db_adapter = db_adapter
+        self._buffer: List[Sequence[Any]] = []
+        self._load_method = load_method
+        # called right before buffered rows are handed to the database
+        self._on_flush = on_flush
+        # called once the rows are loaded, in the same database transaction
+        self._after_flush = after_flush
+        self._skip_existing = skip_existing
+        # the daily / monthly rollups of the days touched by a flush are refreshed with it
+        self._maintain_rollups = maintain_rollups
+        self._max_rows = max_rows
+        if max_mb:
+            # rows are homogeneous, so the first row size is a good enough estimate
+            self._max_bytes = int(max_mb * 1024 * 1024)
+        else:
+            self._max_bytes = None
+        self._row_bytes = None
+        self._blocks: List[Sequence[np.ndarray]] = []
+        self._block_rows = 0
+        self._block_bytes = 0
+
+        self.rows_written = 0
+        self.flushes = 0
+        self.peak_buffered_rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return False
+        # rows buffered before a failure are complete samples, keep them if we can
+        try:
+            self.close()
+        except Exception as flush_error:
+            print(f"[WARN] Could not flush {self.buffered_rows} buffered rows after failure: {flush_error}")
+        return False
+
+    def _budget_rows(self) -> int:
+        if self._max_bytes is None or self._row_bytes is None:
+            return self._max_rows
+        return max(1, min(self._max_rows, self._max_bytes // self._row_bytes))
+
+    @property
+    def buffered_rows(self) -> int:
+        return len(self._buffer) + self._block_rows
+
+    def _over_budget(self) -> bool:
+        if self.buffered_rows >= self._budget_rows():
+            return True
+        return self._max_bytes is not None and self._block_bytes >= self._max_bytes
+
+    def write(self, row: Sequence[Any]) -> None:
+        if self._row_bytes is None and self._max_bytes is not None:
+            self._row_bytes = _row_size(row)
+        self._buffer.append(row)
+        if self._over_budget():
+            self.flush()
+
+    def write_block(self, columns: Sequence[np.ndarray]) -> None:
+        """Buffer a block of column arrays ordered as WF_ACTUALS_COLUMNS (NaN is null)."""
+        rows = len(columns[0])
+        if not rows:
+            return
+        self._blocks.append(columns)
+        self._block_rows += rows
+        self._block_bytes += sum(c.nbytes for c in columns)
+        if self._over_budget():
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer and not self._blocks:
+            return
+        rows = self.buffered_rows
+        self.peak_buffered_rows = max(self.peak_buffered_rows, rows)
+        # rows, rollups and what `after_flush` records commit together (see `transaction`)
+        with telemetry.timed("wf_db_flush_seconds", "wf.db.flush", method=self._load_method), \
+                profiling.stage("db_insert"), self._db_adapter.transaction():
+            if self._on_flush is not None:
+                self._on_flush()
+            if self._buffer:
+                self._db_adapter.load_wfactuals(self._buffer, method=self._load_method, skip_existing=self._skip_existing)
+            if self._blocks:
+                columns = [np.concatenate(column) for column in zip(*self._blocks)]
+                self._db_adapter.load_wfactuals_columns(columns, method=self._load_method, skip_existing=self._skip_existing)
+            if self._maintain_rollups:
+                self._db_adapter.refresh_rollups(*touched_days(self._buffer, self._blocks))
+            if self._after_flush is not None:
+                self._after_flush()
+        telemetry.observe("wf_db_batch_rows", rows, method=self._load_method)
+        telemetry.increment("wf_sink_rows_total", rows, sink="postgres")
+        self.rows_written += rows
+        self.flushes += 1
+        self._buffer = []
+        self._blocks = []
+        self._block_rows = 0
+        self._block_bytes = 0
+
+    def close(self) -> None:
+        self.flush()
+
+    def report(self) -> str:
+        from adapters import MERGE_METHODS
+
+        line = (
+            f"{self.rows_written} rows in {self.flushes} flushes, "
+            f"peak buffer {self.peak_buffered_rows} rows, peak RSS {peak_rss_mb():.1f} MB"
+        )
+        if self._load_method in MERGE_METHODS:
+            line += f" ({self._db_adapter.merge_report()})"
+        return line
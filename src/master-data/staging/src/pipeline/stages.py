@@ -0,0 +1,159 @@
+"""
+Staged execution of the Open-Meteo import: fetch -> transform -> sink.
+
+Every stage runs its own thread pool and hands its results to the next stage through
+a bounded queue, so the API, the CPU bound transform and the database are busy at the
+same time and the run takes about as long as its slowest stage. A full queue blocks
+the stage feeding it (backpressure), memory is bounded by the queue sizes.
+
+Results leave a stage in the order its items came in, the sinks see the same sequence
+of units as a serial run.
+
+Each stage keeps `StageStats`: busy time of its workers (utilization) and depth of its
+output queue, sampled every time the next stage takes an item. A stage with a full
+queue is faster than its consumer, the stage feeding a starved one is the bottleneck.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class StageStats:
+    def __init__(self, name: str, workers: int, queue_size: int = 0):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def timed(self, fn: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        """Wrap `fn` so every call counts as one item of busy time of this stage."""
+        def run(item):
+            begin = time.perf_counter()
+            try:
+                return fn(item)
+            finally:
+                self.record(time.perf_counter() - begin)
+        return run
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += seconds
+
+    def observe(self, depth: int) -> None:
+        with self._lock:
+            self.depth_samples += 1
+            self.depth_total += depth
+            self.depth_max = max(self.depth_max, depth)
+
+    def utilization(self) -> float:
+        elapsed = time.perf_counter() - self._started
+        return self.busy_seconds / (elapsed * self.workers) if elapsed > 0 else 0.0
+
+    def report(self) -> str:
+        line = f"{self.name}: {self.items} items, {self.workers} workers {self.utilization():.0%} busy"
+        if self.queue_size:
+            average = self.depth_total / self.depth_samples if self.depth_samples else 0.0
+            line += f", output queue avg {average:.1f} max {self.depth_max} of {self.queue_size}"
+        return line
+
+
+def _put(out: queue.Queue, item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _ready(out: queue.Queue) -> int:
+    # results computed and waiting for the next stage, in-flight ones excluded
+    with out.mutex:
+        return sum(1 for future in out.queue if getattr(future, "done", lambda: False)())
+
+
+def ordered_stage(items: Iterable, fn: Callable[[Any], Any], stats: StageStats) -> Iterator:
+    """Apply `fn` to `items` with `stats.workers` threads, yielding results in input order.
+
+    A feeder thread pulls from `items` (typically the previous stage) while up to
+    `stats.workers` calls run, at most `stats.queue_size` results wait for the caller.
+    The first failing item re-raises its exception in the caller and stops the stage.
+    """
+    if stats.workers <= 0 or stats.queue_size <= 0:
+        raise SystemExit(f"Stage {stats.name} needs a positive number of workers and queue size")
+
+    # in-flight calls hold a queue slot too, so every worker can be busy with a full queue
+    out = queue.Queue(maxsize=stats.workers + stats.queue_size)
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=stats.workers, thread_name_prefix=stats.name)
+    work = stats.timed(fn)
+
+    def feed():
+        try:
+            for item in items:
+                if not _put(out, pool.submit(work, item), stop):
+                    return
+            _put(out, _DONE, stop)
+        except BaseException as e:
+            _put(out, _Failed(e), stop)
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    feeder = threading.Thread(target=feed, name=f"{stats.name}-feeder", daemon=True)
+    feeder.start()
+    try:
+        while True:
+            stats.observe(_ready(out))
+            entry = out.get()
+            if entry is _DONE:
+                return
+            if isinstance(entry, _Failed):
+                raise entry.error
+            yield entry.result()
+    finally:
+        stop.set()
+        # unblock a feeder waiting on a full queue, queued work is cancelled
+        while feeder.is_alive():
+            try:
+                entry = out.get(timeout=0.1)
+                if hasattr(entry, "cancel"):
+                    entry.cancel()
+            except queue.Empty:
+                pass
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def consume(items: Iterable, fn: Callable[[Any], None], stats: StageStats) -> None:
+    """Final stage run by the calling thread: `fn` is applied to every item in order.
+
+    When `fn` fails the upstream stages are closed before its exception propagates,
+    their threads are stopped instead of running on until garbage collection.
+    """
+    work = stats.timed(fn)
+    try:
+        for item in items:
+            work(item)
+    finally:
+        close = getattr(items, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,73 @@
+"""
+Columnar transform of Open-Meteo hourly responses.
+
+Each location block of a response is turned into typed arrays in one pass:
+- time: datetime64[s], rebuilt with `arange` when the series is regular (always the
+  case for hourly UTC data), parsed otherwise
+- measures: float64 with NaN for the nulls returned by the API (float64 keeps the
+  exact decimal values sent by the API, float32 would not)
+
+`cell_block` then fans the arrays out to the cities of a grid cell as wf_actuals
+columns (WF_ACTUALS_COLUMNS order, int32 city ids). Samples without temperature are
+dropped there, `temperature_c` is NOT NULL, null wind speed / precipitation are kept
+and loaded as NULL.
+"""
+
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+_HOUR = np.timedelta64(1, "h")
+
+
+class HourlyColumns(NamedTuple):
+    time: np.ndarray
+    temperature: np.ndarray
+    wind_speed: np.ndarray
+    precipitation: np.ndarray
+
+
+def _time_column(times) -> np.ndarray:
+    if not times:
+        return np.empty(0, dtype="datetime64[s]")
+    first = np.datetime64(times[0], "s")
+    last = np.datetime64(times[-1], "s")
+    if last - first == (len(times) - 1) * _HOUR:
+        return np.arange(first, last + _HOUR, _HOUR, dtype="datetime64[s]")
+    return np.array(times, dtype="datetime64[s]")
+
+
+def hourly_columns(location_data) -> HourlyColumns:
+    hourly = location_data["hourly"]
+    return HourlyColumns(
+        _time_column(hourly["time"]),
+        # None becomes NaN
+        np.array(hourly["temperature_2m"], dtype=np.float64),
+        np.array(hourly["wind_speed_10m"], dtype=np.float64),
+        np.array(hourly["precipitation"], dtype=np.float64),
+    )
+
+
+def cell_block(cell, columns: HourlyColumns) -> Tuple[Tuple[np.ndarray, ...], int]:
+    """wf_actuals columns of every city of the cell, and the number of rows dropped for null temperatures."""
+    city_ids = np.array([m.city_id for m in cell.members if m.city_id is not None], dtype=np.int32)
+    loaded = ~np.isnan(columns.temperature)
+    dropped = len(loaded) - int(loaded.sum())
+    time, temperature, wind_speed, precipitation = (c[loaded] for c in columns)
+
+    cities = len(city_ids)
+    block = (
+        np.tile(time, cities),
+        np.repeat(city_ids, len(time)),
+        np.tile(temperature, cities),
+        np.tile(wind_speed, cities),
+        np.tile(precipitation, cities),
+    )
+    return block, dropped * cities
+
+
+def full_days(columns: HourlyColumns) -> np.ndarray:
+    """Days (datetime64[D]) holding 24 hourly temperatures."""
+    days = columns.time[~np.isnan(columns.temperature)].astype("datetime64[D]")
+    values, counts = np.unique(days, return_counts=True)
+    return values[counts == 24]
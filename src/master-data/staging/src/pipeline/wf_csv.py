@@ -0,0 +1,152 @@
+"""
+Weather CSV parsing shared by the sequential and the parallel `--input` import.
+
+The parallel import splits the file into newline-aligned byte ranges, each range
+is parsed by its own process and loaded over its own database connection.
+Records are expected on a single line (no quoted newlines), which is what
+`--export-to-csv` produces.
+"""
+
+import csv
+import os
+from typing import Dict, List, Tuple
+
+from config import WF_IMPORT_CSV_INPUT_READ_BATCH_SIZE, WF_IMPORT_CSV_READ_BUFFER_BYTES
+
+from .sinks import PostgresSink
+
+# header of the weather CSV written by --export-to-csv and read by --input
+WF_CSV_COLUMNS = [
+    "longitude",
+    "latitude",
+    "timestamp_utc",
+    "temperature_c",
+    "wind_speed_m_s",
+    "precipitation_mm"
+]
+
+# rows between two progress bar refreshes
+WF_CSV_PROGRESS_EVERY = 10000
+
+# byte ranges handed out per worker by the parallel import
+WF_CSV_RANGES_PER_WORKER = 4
+
+
+def _optional_float(value: str):
+    return float(value) if value != "" else None
+
+
+def wf_csv_column_indexes(header):
+    """Resolve the positional index of every WF_CSV_COLUMNS entry once from the header."""
+    try:
+        return [header.index(column) for column in WF_CSV_COLUMNS]
+    except ValueError as e:
+        raise SystemExit(f"Weather CSV header is missing a column: {e}")
+
+
+def parse_wf_csv_records(records, indexes, lookup_by_lonlat, stats):
+    """Yield wf_actuals rows (WF_ACTUALS_COLUMNS order) from raw CSV records.
+
+    Records with unparsable coordinates/measures are counted in stats["skipped"],
+    records whose coordinates do not match a city in stats["unmatched"].
+    The oldest and newest loaded timestamps are kept in stats["first"] and stats["last"].
+    """
+    lon_i, lat_i, ts_i, temp_i, wind_i, rain_i = indexes
+    first = last = None
+    for record in records:
+        stats["read"] += 1
+        try:
+            key = (round(float(record[lon_i]), 6), round(float(record[lat_i]), 6))
+            cid = lookup_by_lonlat.get(key)
+            if cid is None:
+                stats["unmatched"] += 1
+                continue
+            ts = record[ts_i]
+            row = (
+                ts,
+                cid,
+                float(record[temp_i]),
+                _optional_float(record[wind_i]),
+                _optional_float(record[rain_i])
+            )
+        except (ValueError, IndexError):
+            stats["skipped"] += 1
+            continue
+        # only loaded rows widen the window refreshed after the load, ISO timestamps compare as strings
+        if first is None or ts < first:
+            first = stats["first"] = ts
+        if last is None or ts > last:
+            last = stats["last"] = ts
+        yield row
+
+
+def csv_byte_ranges(path: str, parts: int) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """Return the parsed header and `parts` newline-aligned `(start, end)` byte ranges of the body."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header_line = f.readline()
+        body_start = f.tell()
+        header = next(csv.reader([header_line.decode("utf-8")]), [])
+
+        boundaries = [body_start]
+        step = max(1, (size - body_start) // max(1, parts))
+        for i in range(1, parts):
+            target = body_start + i * step
+            if target <= boundaries[-1]:
+                continue
+            f.seek(target - 1)
+            # move to the start of the next line, unless target is already one
+            f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+        boundaries.append(size)
+
+    return header, list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _range_lines(raw, start: int, end: int):
+    raw.seek(start)
+    position = start
+    while position < end:
+        line = raw.readline()
+        if not line:
+            break
+        position += len(line)
+        yield line.decode("utf-8")
+
+
+def import_csv_range(
+    path: str,
+    start: int,
+    end: int,
+    indexes: List[int],
+    lookup_by_lonlat: Dict[Tuple[float, float], int],
+    db_dsn: str,
+    db_load_method: str,
+    db_commit_every=None
+) -> Dict[str, int]:
+    """Process pool entrypoint: load one byte range of the CSV over a dedicated connection.
+
+    The rollups are not maintained, the days cut by the range bounds would be aggregated
+    from the hours of this range only. The parent rebuilds them once all ranges are loaded.
+    """
+    from adapters import WeatherForecastPgDbAdapter
+
+    stats = {"read": 0, "skipped": 0, "unmatched": 0, "first": None, "last": None, "bytes": end - start}
+    db_adapter = WeatherForecastPgDbAdapter(db_dsn)
+    db_sink = PostgresSink(
+        db_adapter, max_rows=WF_IMPORT_CSV_INPUT_READ_BATCH_SIZE, load_method=db_load_method, maintain_rollups=False
+    )
+
+    with open(path, "rb", buffering=WF_IMPORT_CSV_READ_BUFFER_BYTES) as raw, \
+            db_adapter.session(commit_every=db_commit_every), db_sink:
+        records = csv.reader(_range_lines(raw, start, end))
+        for row in parse_wf_csv_records(records, indexes, lookup_by_lonlat, stats):
+            db_sink.write(row)
+
+    stats["written"] = db_sink.rows_written
+    stats["flushes"] = db_sink.flushes
+    return stats
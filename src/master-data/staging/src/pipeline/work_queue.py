@@ -0,0 +1,258 @@
+"""
+Distributed wf_import: a coordinator enqueues the work units of a run into Postgres
+(`wf_plan`), any number of worker processes claim and run them (`wf_worker`).
+
+Units are claimed with `SELECT ... FOR UPDATE SKIP LOCKED` and leased to one worker
+at a time. The rows of a unit, its coverage ledger days and its `done` status are
+committed in one transaction, and only while the worker still holds the lease, so a
+unit is never loaded twice. While a worker runs a unit, a heartbeat thread extends its
+lease every third of WF_QUEUE_LEASE_SECONDS, a unit slowed down by retries and 429
+backoffs stays leased. A worker that dies stops extending it and the unit is claimed
+again once the lease expires. A failed unit is retried with backoff until it has used
+WF_QUEUE_MAX_ATTEMPTS attempts, then it is dead-lettered (status `dead`, last error
+kept) for `wf_plan --requeue-dead`.
+"""
+
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import profiling
+import telemetry
+from config import (
+    OPEN_METEO_CACHE_DIR,
+    OPEN_METEO_GRID_RESOLUTION,
+    POSTGRES_POOL_SIZE,
+    WF_IMPORT_DB_FLUSH_ROWS,
+    WF_IMPORT_DB_LOAD_METHOD,
+    WF_QUEUE_LEASE_SECONDS,
+    WF_QUEUE_MAX_ATTEMPTS,
+    WF_QUEUE_POLL_SECONDS,
+)
+
+from open_meteo.rate_limiter import backoff_delay
+
+from .checkpoint import unit_key
+from .coverage import CoverageTracker
+from .fetcher import FetchUnit, fetch_unit, fetch_unit_splitting
+from .grid import GridCell, Location
+from .sinks import PostgresSink
+
+
+class LeaseLostError(RuntimeError):
+    """The lease of a unit expired and another worker claimed it."""
+
+
+class _LeaseHeartbeat:
+    """Extends the lease of a unit every third of the lease until the block exits."""
+
+    def __init__(self, db_adapter, unit_id: int, worker_id: str, lease_seconds: float):
+        self._db_adapter = db_adapter
+        self._unit_id = unit_id
+        self._worker_id = worker_id
+        self._lease_seconds = lease_seconds
+        # another worker claimed the unit after the lease expired anyway
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{unit_id}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._lease_seconds / 3):
+            try:
+                if not self._db_adapter.extend_lease(self._unit_id, self._worker_id, self._lease_seconds):
+                    self.lost = True
+                    return
+            except Exception as e:
+                # the lease is still valid for a while, the next beat tries again
+                print(f"[WARN] Could not extend the lease of unit {self._unit_id}: {e}")
+
+
+def cells_payload(unit: FetchUnit) -> List[Dict[str, Any]]:
+    """JSON form of the grid cells of a unit, stored in `wf_import_queue.cells`."""
+    return [
+        {
+            "latitude": cell.latitude,
+            "longitude": cell.longitude,
+            "members": [[m.city_id, m.latitude, m.longitude] for m in cell.members],
+        }
+        for cell in unit.batch
+    ]
+
+
+def unit_from_claim(claim: Dict[str, Any]) -> FetchUnit:
+    cells = [
+        GridCell(c["latitude"], c["longitude"], [Location(*member) for member in c["members"]])
+        for c in claim["cells"]
+    ]
+    return FetchUnit(
+        cells,
+        [c.latitude for c in cells],
+        [c.longitude for c in cells],
+        claim["start_date"],
+        claim["end_date"]
+    )
+
+
+def default_worker_id() -> str:
+    # the host name is the pod name on Kubernetes
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def plan_queue(
+    run_id: str,
+    from_date,
+    to_date,
+    db_dsn: str,
+    incremental: bool = False,
+    grid_resolution: float = OPEN_METEO_GRID_RESOLUTION,
+    requeue_dead: bool = False
+) -> None:
+    """Enqueue the work units of a run, the same planning as `wf_import`."""
+    from adapters import WeatherForecastPgDbAdapter
+    from .importer import load_cities_from_db, month_ranges_between, plan_fetch_units, plan_incremental_units
+    from .grid import dedup_report
+    from .planner import plan_report
+
+    if not run_id or not run_id.strip():
+        raise SystemExit("A run id is required to plan a distributed import")
+    if not db_dsn or not db_dsn.strip():
+        raise SystemExit("Distributed imports are coordinated in Postgres and require a valid db_dsn")
+
+    db_adapter = WeatherForecastPgDbAdapter(db_dsn)
+    if requeue_dead:
+        print(f"[INFO] Requeued {db_adapter.requeue_dead_units(run_id)} dead units of run {run_id}")
+
+    if from_date and to_date:
+        if from_date >= to_date:
+            raise SystemExit("from_date must be strictly before to_date")
+        # workers resolve rows to cities by id, locations always come from the database
+        locations = load_cities_from_db(db_dsn)
+        if incremental:
+            coverage = db_adapter.read_coverage(from_date, to_date)
+            units = plan_incremental_units(locations, month_ranges_between(from_date, to_date), coverage, grid_resolution)
+        else:
+            units = plan_fetch_units(locations, from_date, to_date, grid_resolution)
+        print(f"[INFO] Grid dedup: {dedup_report(units, grid_resolution)}")
+        print(f"[INFO] Request plan: {plan_report(units, 1)}")
+
+        enqueued = db_adapter.enqueue_units(
+            run_id, ((unit_key(u), u.start, u.end, cells_payload(u)) for u in units)
+        )
+        print(f"[INFO] Enqueued {enqueued} of {len(units)} planned units into run {run_id}")
+    elif not requeue_dead:
+        raise SystemExit("Planning a distributed import requires --from-date and --to-date")
+
+    print(f"[INFO] Run {run_id}: {db_adapter.queue_status(run_id)}")
+    db_adapter.close()
+
+
+def run_worker(
+    run_id: str,
+    db_dsn: str,
+    worker_id: Optional[str] = None,
+    db_load_method: str = WF_IMPORT_DB_LOAD_METHOD,
+    db_flush_rows: int = WF_IMPORT_DB_FLUSH_ROWS,
+    skip_existing: bool = False,
+    cache_dir: Optional[str] = OPEN_METEO_CACHE_DIR,
+    offline: bool = False,
+    lease_seconds: float = WF_QUEUE_LEASE_SECONDS,
+    max_attempts: int = WF_QUEUE_MAX_ATTEMPTS,
+    poll_seconds: float = WF_QUEUE_POLL_SECONDS,
+    max_units: Optional[int] = None
+) -> None:
+    """Claim and run the units of a run until none is pending or running (or `max_units` were done)."""
+    from adapters import SKIP_EXISTING_METHODS, WeatherForecastPgDbAdapter
+    from .importer import transform_unit
+
+    if not run_id or not run_id.strip():
+        raise SystemExit("A run id is required to run a distributed import worker")
+    if not db_dsn or not db_dsn.strip():
+        raise SystemExit("Distributed imports are coordinated in Postgres and require a valid db_dsn")
+    if skip_existing and db_load_method not in SKIP_EXISTING_METHODS:
+        print(f"[INFO] Skipping existing rows loads with INSERT ... ON CONFLICT DO NOTHING instead of {db_load_method}")
+        db_load_method = "insert"
+
+    cache = None
+    if cache_dir:
+        from open_meteo import ResponseCache
+        cache = ResponseCache(cache_dir, offline=offline)
+
+    worker_id = worker_id or default_worker_id()
+    db_adapter = WeatherForecastPgDbAdapter(db_dsn, pool_size=POSTGRES_POOL_SIZE)
+    done = failed = 0
+    rows = 0
+    print(f"[INFO] Worker {worker_id} joined run {run_id}")
+
+    while max_units is None or done < max_units:
+        claim = db_adapter.claim_unit(run_id, worker_id, lease_seconds, max_attempts)
+        if claim is None:
+            status = db_adapter.queue_status(run_id)
+            if not status.get("pending") and not status.get("running"):
+                break
+            # units are running elsewhere or waiting for their retry time
+            time.sleep(poll_seconds)
+            continue
+
+        unit = unit_from_claim(claim)
+        try:
+            with telemetry.span(
+                "wf.work_unit", run_id=run_id, unit_id=claim["id"], attempt=claim["attempts"],
+                locations=len(unit.batch), start=str(unit.start), end=str(unit.end)
+            ), _LeaseHeartbeat(db_adapter, claim["id"], worker_id, lease_seconds) as heartbeat:
+                with profiling.stage("fetch"):
+                    data = fetch_unit_splitting(unit, cache=cache, fetch=fetch_unit)
+                _, cells = transform_unit((unit, data), csv_text=False, columns=True, blocks=True)
+                if heartbeat.lost:
+                    raise LeaseLostError(f"Lease of unit {claim['id']} was lost while fetching it, another worker claimed it")
+
+                coverage = CoverageTracker(db_adapter)
+                with db_adapter.session(single_transaction=True):
+                    sink = PostgresSink(
+                        db_adapter,
+                        max_rows=db_flush_rows,
+                        load_method=db_load_method,
+                        on_flush=coverage.flush_started,
+                        after_flush=coverage.record,
+                        skip_existing=skip_existing
+                    )
+                    with sink:
+                        for cell in cells:
+                            coverage.add(cell.days)
+                            sink.write_block(cell.block)
+                    if not db_adapter.complete_unit(claim["id"], worker_id):
+                        raise LeaseLostError(f"Lease of unit {claim['id']} expired and was claimed by another worker")
+            done += 1
+            rows += sink.rows_written
+            telemetry.increment("wf_units_total", outcome="done")
+        except LeaseLostError as e:
+            # the unit rows were rolled back, the new lease owner loads them
+            print(f"[WARN] {e}")
+            telemetry.increment("wf_units_total", outcome="lease_lost")
+        except Exception as e:
+            failed += 1
+            status = db_adapter.fail_unit(
+                claim["id"], worker_id, f"{type(e).__name__}: {e}", max_attempts, backoff_delay(claim["attempts"])
+            )
+            telemetry.increment("wf_units_total", outcome="dead" if status == "dead" else "failed")
+            level = "ERROR" if status == "dead" else "WARN"
+            print(
+                f"[{level}] Unit {claim['id']} ({unit.start} to {unit.end}) failed on attempt {claim['attempts']}: {e}. "
+                f"Now {status or 'leased by another worker'}"
+            )
+
+    print(f"[INFO] Worker {worker_id} done: {done} units, {rows} rows loaded, {failed} failed attempts")
+    print(f"[INFO] Run {run_id}: {db_adapter.queue_status(run_id)}")
+    if cache:
+        print(f"[INFO] Open-Meteo cache: {cache.report()}")
+    db_adapter.close()
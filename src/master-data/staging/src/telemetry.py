@@ -0,0 +1,247 @@
+"""
+Optional metrics and traces of the master-data jobs.
+
+Nothing is recorded until `setup` enables an exporter, the instrumented code calls
+no-op functions until then. Each exporter needs its optional packages:
+- OTLP (`opentelemetry-sdk`, `opentelemetry-exporter-otlp-proto-http`): metrics and
+  spans pushed over OTLP/HTTP to a collector, e.g. http://localhost:4318
+- Pushgateway (`prometheus-client`): metrics pushed every WF_TELEMETRY_PUSH_SECONDS and
+  when the job exits, grouped by instance so parallel workers do not overwrite each other
+
+Metrics (see METRICS):
+- wf_fetch_request_seconds{outcome}: latency of every Open-Meteo HTTP request
+- wf_fetch_retries_total{reason}, wf_fetch_throttled_total: retried requests, 429 responses
+- wf_transform_seconds: transform time of a fetched unit
+- wf_sink_rows_total{sink}: rows written per sink, rate() gives the rows/s
+- wf_db_flush_seconds{method}, wf_db_batch_rows{method}: Postgres sink flushes
+- wf_db_load_seconds{method}, wf_db_load_rows_total{method}: wf_actuals loads of the adapter
+- wf_units_total{outcome}: fetch / work units processed
+
+Spans: wf.work_unit (wf_worker units), wf.fetch (staged import units), open_meteo.request,
+wf.transform, wf.db.flush and wf.db.load. Spans nest within a thread only, the stages
+of a staged import run in different threads.
+
+Processes forked by an import (parallel CSV workers) do not record anything.
+"""
+
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional, Tuple
+
+from config import WF_TELEMETRY_PUSH_SECONDS, WF_TELEMETRY_SERVICE_NAME
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+try:
+    from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+    from opentelemetry.sdk.metrics.view import ExplicitBucketHistogramAggregation, View
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+except ImportError:
+    MeterProvider = None
+
+_SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+_ROWS_BUCKETS = (100, 1000, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000)
+
+# name: (kind, description, label names, histogram buckets)
+METRICS: Dict[str, Tuple[str, str, Tuple[str, ...], Optional[Tuple[float, ...]]]] = {
+    "wf_fetch_request_seconds": (
+        "histogram", "Latency of the Open-Meteo requests by outcome (ok, throttled, server_error, error)",
+        ("outcome",), _SECONDS_BUCKETS
+    ),
+    "wf_fetch_retries_total": ("counter", "Open-Meteo requests retried, by reason", ("reason",), None),
+    "wf_fetch_throttled_total": ("counter", "Open-Meteo 429 Too Many Requests responses", (), None),
+    "wf_transform_seconds": ("histogram", "Transform time of a fetched unit", (), _SECONDS_BUCKETS),
+    "wf_sink_rows_total": ("counter", "Rows written per sink", ("sink",), None),
+    "wf_db_flush_seconds": (
+        "histogram", "Duration of the Postgres sink flushes (load and rollups)", ("method",), _SECONDS_BUCKETS
+    ),
+    "wf_db_batch_rows": ("histogram", "Rows per Postgres sink flush", ("method",), _ROWS_BUCKETS),
+    "wf_db_load_seconds": ("histogram", "Duration of the wf_actuals loads", ("method",), _SECONDS_BUCKETS),
+    "wf_db_load_rows_total": ("counter", "Rows loaded into wf_actuals", ("method",), None),
+    "wf_units_total": ("counter", "Fetch / work units processed, by outcome", ("outcome",), None),
+}
+
+_backends = []
+# the OTLP backend when enabled, the only one exporting spans
+_tracing = None
+
+
+class _PushgatewayBackend:
+    def __init__(self, gateway: str, job: str, push_seconds: float):
+        self._gateway = gateway
+        self._job = job
+        self._grouping = {"instance": f"{socket.gethostname()}-{os.getpid()}"}
+        self._registry = prometheus_client.CollectorRegistry()
+        self._metrics = {}
+        for name, (kind, description, labels, buckets) in METRICS.items():
+            if kind == "histogram":
+                metric = prometheus_client.Histogram(name, description, labels, registry=self._registry, buckets=buckets)
+            else:
+                metric = prometheus_client.Counter(name, description, labels, registry=self._registry)
+            self._metrics[name] = metric
+        self._failed = False
+        self._stop = threading.Event()
+        self._pusher = threading.Thread(target=self._push_every, args=(push_seconds,), name="pushgateway", daemon=True)
+        self._pusher.start()
+
+    def record(self, name: str, value: float, labels: Dict[str, str]) -> None:
+        metric = self._metrics[name]
+        if labels:
+            metric = metric.labels(**labels)
+        if METRICS[name][0] == "histogram":
+            metric.observe(value)
+        else:
+            metric.inc(value)
+
+    def _push(self) -> None:
+        try:
+            prometheus_client.push_to_gateway(
+                self._gateway, job=self._job, registry=self._registry, grouping_key=self._grouping
+            )
+            self._failed = False
+        except Exception as e:
+            # warn once per outage, metrics keep accumulating until the next push
+            if not self._failed:
+                print(f"[WARN] Could not push metrics to {self._gateway}: {e}")
+            self._failed = True
+
+    def _push_every(self, seconds: float) -> None:
+        while not self._stop.wait(seconds):
+            self._push()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._pusher.join()
+        self._push()
+
+
+class _OtlpBackend:
+    def __init__(self, endpoint: str, service: str, job: str, push_seconds: float):
+        endpoint = endpoint.rstrip("/")
+        resource = Resource.create({
+            "service.name": service,
+            "service.instance.id": f"{socket.gethostname()}-{os.getpid()}",
+            "job": job,
+        })
+        views = [
+            View(instrument_name=name, aggregation=ExplicitBucketHistogramAggregation(buckets))
+            for name, (kind, _, _, buckets) in METRICS.items() if kind == "histogram"
+        ]
+        reader = PeriodicExportingMetricReader(
+            OTLPMetricExporter(endpoint=f"{endpoint}/v1/metrics"), export_interval_millis=push_seconds * 1000
+        )
+        self._meters = MeterProvider(resource=resource, metric_readers=[reader], views=views)
+        meter = self._meters.get_meter("master-data")
+        self._instruments = {}
+        for name, (kind, description, _, _) in METRICS.items():
+            if kind == "histogram":
+                self._instruments[name] = meter.create_histogram(name, description=description).record
+            else:
+                self._instruments[name] = meter.create_counter(name, description=description).add
+
+        self._tracers = TracerProvider(resource=resource)
+        self._tracers.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=f"{endpoint}/v1/traces")))
+        self._tracer = self._tracers.get_tracer("master-data")
+
+    def record(self, name: str, value: float, labels: Dict[str, str]) -> None:
+        self._instruments[name](value, attributes=labels)
+
+    def span(self, name: str, attributes: Dict[str, str]):
+        return self._tracer.start_as_current_span(name, attributes=attributes)
+
+    def shutdown(self) -> None:
+        self._tracers.shutdown()
+        self._meters.shutdown()
+
+
+def setup(
+    job: str,
+    otlp_endpoint: Optional[str] = None,
+    pushgateway: Optional[str] = None,
+    service: str = WF_TELEMETRY_SERVICE_NAME,
+    push_seconds: float = WF_TELEMETRY_PUSH_SECONDS
+) -> bool:
+    """Enable the exporters given an endpoint, returns whether anything is recorded.
+
+    An exporter whose optional packages are missing is skipped with a warning, the job
+    runs without it.
+    """
+    global _tracing
+    if otlp_endpoint:
+        if MeterProvider is None:
+            print("[WARN] OTLP export needs the opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http packages, skipped")
+        else:
+            _tracing = _OtlpBackend(otlp_endpoint, service, job, push_seconds)
+            _backends.append(_tracing)
+            print(f"[INFO] Exporting metrics and traces over OTLP to {otlp_endpoint}")
+    if pushgateway:
+        if prometheus_client is None:
+            print("[WARN] Pushgateway export needs the prometheus-client package, skipped")
+        else:
+            _backends.append(_PushgatewayBackend(pushgateway, job, push_seconds))
+            print(f"[INFO] Pushing metrics to {pushgateway} every {push_seconds:g} seconds")
+    return enabled()
+
+
+def shutdown() -> None:
+    """Export what was recorded since the last push and stop the exporters."""
+    global _tracing
+    _tracing = None
+    while _backends:
+        _backends.pop().shutdown()
+
+
+def enabled() -> bool:
+    return bool(_backends)
+
+
+def increment(name: str, amount: float = 1, **labels: str) -> None:
+    for backend in _backends:
+        backend.record(name, amount, labels)
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    for backend in _backends:
+        backend.record(name, value, labels)
+
+
+def span(name: str, **attributes):
+    """Trace span around the block (OTLP only), a no-op context otherwise."""
+    if _tracing is None:
+        return nullcontext()
+    return _tracing.span(name, attributes)
+
+
+@contextmanager
+def timed(metric: str, span_name: str, **labels: str):
+    """Span around the block whose duration is observed in the `metric` histogram."""
+    if not _backends:
+        yield
+        return
+    begin = time.perf_counter()
+    try:
+        with span(span_name, **labels):
+            yield
+    finally:
+        observe(metric, time.perf_counter() - begin, **labels)
+
+
+def _forget() -> None:
+    global _tracing
+    _tracing = None
+    _backends.clear()
+
+
+# forked processes (parallel CSV workers) would record into copies nobody exports
+os.register_at_fork(after_in_child=_forget)
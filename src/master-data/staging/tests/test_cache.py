@@ -0,0 +1,100 @@
+import os
+import random
+import time
+from datetime import date
+
+import pytest
+
+from open_meteo import client
+from open_meteo.cache import CacheMissError, ResponseCache, cache_key
+
+
+def params(day):
+    return {"latitude": "48.1", "longitude": "11.6", "start_date": f"2021-01-{day:02d}", "end_date": f"2021-01-{day:02d}"}
+
+
+def payload(seed, size=4000):
+    # random values do not compress, every entry takes about the same room on disk
+    rng = random.Random(seed)
+    return [{"hourly": {"temperature_2m": [rng.random() for _ in range(size // 8)]}}]
+
+
+def entry_path(cache, day):
+    key = cache_key(params(day))
+    return os.path.join(cache.directory, key[:2], key + ResponseCache.SUFFIX)
+
+
+def age(cache, day, seconds):
+    then = time.time() - seconds
+    os.utime(entry_path(cache, day), (then, then))
+
+
+def test_round_trip_and_miss(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put(params(1), payload(1))
+
+    assert cache.get(params(1)) == payload(1)
+    assert cache.get(params(2)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    # the size on disk is found again by a new instance
+    assert ResponseCache(str(tmp_path)).stats()["size_mb"] == cache.stats()["size_mb"]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    for day in range(1, 5):
+        cache.put(params(day), payload(day))
+        age(cache, day, 100 - day)
+    entry = os.path.getsize(entry_path(cache, 1))
+
+    cache = ResponseCache(str(tmp_path), max_bytes=int(entry * 4.5))
+    # a hit refreshes the oldest entry
+    assert cache.get(params(1)) == payload(1)
+    cache.put(params(5), payload(5))
+
+    # over budget: the least recently used entries go until 90% of it is left
+    assert cache.evictions == 1
+    assert [day for day in range(1, 6) if os.path.exists(entry_path(cache, day))] == [1, 3, 4, 5]
+    assert cache.get(params(2)) is None
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+def fetch(day, cache):
+    return client.fetch_hourly(
+        [48.1], [11.6], date(2021, 1, day), date(2021, 1, day), ["temperature_2m"], "UTC", max_retries=1, cache=cache
+    )
+
+
+def test_offline_miss_raises_without_calling_the_api(tmp_path, monkeypatch):
+    calls = []
+
+    def api(url, params, timeout):
+        calls.append(params["start_date"])
+        return FakeResponse(payload(1))
+
+    monkeypatch.setattr(client.requests, "get", api)
+    assert fetch(1, ResponseCache(str(tmp_path))) == payload(1)
+    assert calls == ["2021-01-01"]
+
+    cache = ResponseCache(str(tmp_path), offline=True)
+    assert fetch(1, cache) == payload(1)
+    with pytest.raises(CacheMissError, match="2021-01-02"):
+        fetch(2, cache)
+    assert calls == ["2021-01-01"]
+
+    # nothing is written in offline mode
+    cache.put(params(9), payload(9))
+    assert not os.path.exists(entry_path(cache, 9))
@@ -0,0 +1,137 @@
+import csv
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from pipeline import importer
+from pipeline.checkpoint import Checkpoint, unit_key
+
+FROM_DATE, TO_DATE = date(2021, 1, 1), date(2021, 3, 31)
+
+
+def run(**changes):
+    signature = {
+        "from_date": FROM_DATE,
+        "to_date": TO_DATE,
+        "cities": "cities.csv",
+        "export_to_csv": True,
+        "csv_output": "out.csv",
+        "export_to_columnar": False,
+        "export_to_postgres": False,
+        "incremental": False,
+        "grid_resolution": 0.1,
+    }
+    signature.update(changes)
+    return signature
+
+
+def importer_run(tmp_path):
+    # the signature import_wf_actuals_from_open_meteo records for import_csv
+    return run(cities=str(tmp_path / "cities.csv"), csv_output=str(tmp_path / "out.csv"))
+
+
+def write_cities(path, count=30):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Latitude", "Longitude"])
+        writer.writerows([f"city{i}", 40 + i * 0.5, 10 + i * 0.5] for i in range(count))
+    return importer.load_cities_from_csv(str(path))
+
+
+def planned_units(locations, grid_resolution=0.1):
+    return importer.plan_fetch_units(locations, FROM_DATE, TO_DATE, grid_resolution)
+
+
+def recording_fetch(fetched):
+    def fetch(unit, cache=None):
+        fetched.append(unit)
+        hours = ((unit.end - unit.start).days + 1) * 24
+        t0 = datetime(unit.start.year, unit.start.month, unit.start.day)
+        hourly = {
+            "time": [(t0 + timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(hours)],
+            "temperature_2m": [1.0] * hours,
+            "wind_speed_10m": [2.0] * hours,
+            "precipitation": [0.0] * hours,
+        }
+        return [{"latitude": lat, "longitude": lon, "hourly": hourly} for lat, lon in zip(unit.lats, unit.lons)]
+    return fetch
+
+
+def test_only_committed_units_are_completed(tmp_path):
+    units = planned_units(write_cities(tmp_path / "cities.csv"))
+    path = str(tmp_path / "checkpoint")
+
+    checkpoint = Checkpoint(path, run())
+    checkpoint.mark_written(units[0])
+    checkpoint.flush_started()
+    checkpoint.committed()
+    # written after the flush started, not part of the committed transaction
+    checkpoint.mark_written(units[1])
+    checkpoint.committed()
+    checkpoint.close()
+
+    resumed = Checkpoint(path, run(), resume=True)
+    assert resumed.completed == 1
+    assert resumed.is_done(units[0])
+    assert not resumed.is_done(units[1])
+    resumed.close()
+
+    # without --resume the file is started over
+    restarted = Checkpoint(path, run())
+    assert restarted.completed == 0
+    restarted.close()
+
+
+@pytest.mark.parametrize("changes", [
+    {"grid_resolution": 0.25},
+    {"to_date": TO_DATE + timedelta(days=1)},
+    {"export_to_postgres": True},
+])
+def test_resuming_another_run_is_refused(tmp_path, changes):
+    path = str(tmp_path / "checkpoint")
+    Checkpoint(path, run()).close()
+
+    with pytest.raises(SystemExit, match="belongs to another run"):
+        Checkpoint(path, run(**changes), resume=True)
+
+
+def import_csv(tmp_path, monkeypatch, fetched, **options):
+    monkeypatch.setattr(importer, "fetch_unit", recording_fetch(fetched))
+    importer.import_wf_actuals_from_open_meteo(
+        FROM_DATE, TO_DATE, "", cities_csv_input=str(tmp_path / "cities.csv"),
+        export_to_csv=True, export_to_postgres=False, csv_output=str(tmp_path / "out.csv"),
+        checkpoint_file=str(tmp_path / "checkpoint"), cache_dir=None, **options
+    )
+
+
+def test_resume_skips_completed_units(tmp_path, monkeypatch):
+    units = planned_units(write_cities(tmp_path / "cities.csv"))
+    assert len(units) > 1
+    # the interrupted run checkpointed its first unit only
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint"), importer_run(tmp_path))
+    checkpoint.mark_written(units[0])
+    checkpoint.flush_started()
+    checkpoint.committed()
+    checkpoint.close()
+
+    fetched = []
+    import_csv(tmp_path, monkeypatch, fetched, grid_resolution=0.1, resume=True)
+    # units are fetched concurrently, in any order
+    assert sorted(map(unit_key, fetched)) == sorted(map(unit_key, units[1:]))
+
+    # every unit is completed now, nothing is fetched again
+    fetched.clear()
+    import_csv(tmp_path, monkeypatch, fetched, grid_resolution=0.1, resume=True)
+    assert fetched == []
+
+
+def test_resume_with_another_grid_resolution_is_refused(tmp_path, monkeypatch):
+    write_cities(tmp_path / "cities.csv")
+    fetched = []
+    import_csv(tmp_path, monkeypatch, fetched, grid_resolution=0.1)
+    assert fetched
+
+    fetched.clear()
+    with pytest.raises(SystemExit, match="belongs to another run"):
+        import_csv(tmp_path, monkeypatch, fetched, grid_resolution=0.25, resume=True)
+    assert fetched == []
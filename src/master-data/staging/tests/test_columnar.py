@@ -0,0 +1,73 @@
+import csv
+import math
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from pipeline import importer
+from pipeline.columnar import ColumnarReader, ColumnarWriter
+
+
+def hourly(start: date, end: date):
+    hours = ((end - start).days + 1) * 24
+    t0 = datetime(start.year, start.month, start.day)
+    return {
+        "time": [(t0 + timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(hours)],
+        "temperature_2m": [round(h % 24 * 0.5, 1) for h in range(hours)],
+        "wind_speed_10m": [1.5] * hours,
+        "precipitation": [0.0] * hours,
+    }
+
+
+def fake_fetch(unit, cache=None):
+    return [
+        {"latitude": lat, "longitude": lon, "hourly": hourly(unit.start, unit.end)}
+        for lat, lon in zip(unit.lats, unit.lons)
+    ]
+
+
+def test_chunks_hold_chunk_rows(tmp_path):
+    flushes = []
+    writer = ColumnarWriter(
+        str(tmp_path / "out.wfc"), chunk_rows=1000,
+        on_flush=lambda: flushes.append("on"), after_flush=lambda: flushes.append("after")
+    )
+    times = np.arange("2021-01-01T00", "2021-01-04T00", dtype="datetime64[h]")
+    measures = [np.arange(len(times), dtype=np.float64) / 10] * 3
+    for location in range(40):
+        writer.write(location, location, times, measures)
+    writer.close()
+
+    reader = ColumnarReader(str(tmp_path / "out.wfc"))
+    rows = 40 * len(times)
+    assert [chunk["rows"] for chunk in reader.chunks] == [1000] * (rows // 1000) + [rows % 1000]
+    assert flushes == ["on", "after"] * math.ceil(rows / 1000)
+    location = np.concatenate([block.location for block in reader.blocks(700)])
+    assert np.array_equal(location, np.repeat(np.arange(40), len(times)))
+
+
+def test_export_without_postgres_writes_whole_chunks(tmp_path, monkeypatch):
+    cities = tmp_path / "cities.csv"
+    with open(cities, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Latitude", "Longitude"])
+        writer.writerows([f"city{i}", 40 + i * 0.5, 10 + i * 0.5] for i in range(30))
+    monkeypatch.setattr(importer, "fetch_unit", fake_fetch)
+    monkeypatch.setattr(importer, "WF_IMPORT_OUTPUT_COLUMNAR", str(tmp_path / "out.wfc"))
+    monkeypatch.setattr(importer, "WF_IMPORT_COLUMNAR_CHUNK_ROWS", 25000)
+
+    importer.import_wf_actuals_from_open_meteo(
+        date(2021, 1, 1), date(2021, 6, 30), "", cities_csv_input=str(cities),
+        export_to_csv=True, export_to_postgres=False, export_to_columnar=True,
+        csv_output=str(tmp_path / "out.csv.gz"), checkpoint_file=str(tmp_path / "checkpoint"), cache_dir=None
+    )
+
+    reader = ColumnarReader(str(tmp_path / "out.wfc"))
+    rows = 30 * 181 * 24
+    assert reader.rows == rows
+    assert len(reader.chunks) == math.ceil(rows / 25000)
+    planned = importer.plan_fetch_units(importer.load_cities_from_csv(str(cities)), date(2021, 1, 1), date(2021, 6, 30))
+    assert len(planned) > 1
+    # every unit is checkpointed once the last chunk is written
+    with open(tmp_path / "checkpoint") as f:
+        assert len(f.readlines()) - 1 == len(planned)
@@ -0,0 +1,67 @@
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from pipeline import compression
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+# writes the header and 20000 flushed lines, then keeps writing and is killed mid-write, after a
+# partial line reached the file
+KILLED_WRITER = textwrap.dedent("""
+    import os, signal, sys
+    from pipeline import compression
+
+    out = compression.open_text(sys.argv[1], "w")
+    out.write("n,value\\n")
+    for i in range(20000):
+        out.write(f"{i},{'x' * 40}\\n")
+    out.flush()
+    for i in range(20000, 200000):
+        out.write(f"{i},{'x' * 40}\\n")
+    out.write("200000,x")
+    out.flush()
+    os.kill(os.getpid(), signal.SIGKILL)
+""")
+
+
+@pytest.mark.parametrize("name", ["wf.csv", "wf.csv.gz", "wf.csv.zst"])
+def test_resume_after_killed_writer(tmp_path, name):
+    if name.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    path = str(tmp_path / name)
+    run = subprocess.run([sys.executable, "-c", KILLED_WRITER, path], cwd=SRC, env={**os.environ, "PYTHONPATH": SRC})
+    assert run.returncode == -signal.SIGKILL
+
+    with compression.open_text(path, "a") as out:
+        out.write("resumed,run\n")
+
+    with compression.open_text(path) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "n,value"
+    assert lines[-1] == "resumed,run"
+    # every flushed line survived, whatever was written after them ends with a complete line
+    numbers = [int(line.split(",")[0]) for line in lines[1:-1]]
+    assert numbers == list(range(len(numbers)))
+    assert len(numbers) >= 20000
+    assert all(line.endswith("x" * 40) for line in lines[1:-1])
+    assert not os.path.exists(path + ".interrupted")
+
+
+def test_resume_repair_cut_short(tmp_path):
+    path = str(tmp_path / "wf.csv.gz")
+    with compression.open_text(path, "w") as out:
+        out.write("n,value\n1,a\n")
+    # a repair killed after moving the original aside
+    os.replace(path, path + ".interrupted")
+    with open(path, "wb") as f:
+        f.write(b"\x1f\x8b")
+
+    with compression.open_text(path, "a") as out:
+        out.write("2,b\n")
+    with compression.open_text(path) as f:
+        assert f.read() == "n,value\n1,a\n2,b\n"
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from adapters.db_adapter import _copy_binary_chunks, _copy_binary_columns, _copy_text_chunks, _copy_text_columns
+from pipeline.grid import GridCell, Location
+from pipeline.transform import cell_block, hourly_columns
+
+START = datetime(2024, 2, 28, 22)
+
+
+def response(hours, seed):
+    rng = np.random.default_rng(seed)
+    temperature = [round(float(v), 1) for v in rng.uniform(-30, 40, hours)]
+    wind = [round(float(v), 2) for v in rng.uniform(0, 25, hours)]
+    rain = [round(float(v), 3) for v in rng.exponential(0.5, hours)]
+    # null temperatures drop their row, null wind / precipitation are loaded as NULL
+    for h in range(0, hours, 7):
+        temperature[h] = None
+    for h in range(3, hours, 5):
+        wind[h] = None
+    rain[hours // 2] = None
+    temperature[1], wind[1], rain[1] = 0.1 + 0.2, -0.0, 1e-3
+    return {
+        "hourly": {
+            "time": [(START + timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(hours)],
+            "temperature_2m": temperature,
+            "wind_speed_10m": wind,
+            "precipitation": rain,
+        }
+    }
+
+
+def sample(hours=72):
+    cells = [
+        GridCell(48.1, 11.6, [Location(3, 48.1, 11.6), Location(17, 48.12, 11.58)]),
+        GridCell(52.5, 13.4, [Location(5, 52.5, 13.4)]),
+    ]
+    data = [response(hours, seed) for seed in range(len(cells))]
+    return cells, data
+
+
+def rows_of(cells, data, timestamp):
+    """Rows of the row-wise path: one per city and hour with a temperature."""
+    rows = []
+    for cell, location_data in zip(cells, data):
+        hourly = location_data["hourly"]
+        for member in cell.members:
+            for t, temp, wind, rain in zip(
+                hourly["time"], hourly["temperature_2m"], hourly["wind_speed_10m"], hourly["precipitation"]
+            ):
+                if temp is not None:
+                    rows.append((timestamp(t), member.city_id, temp, wind, rain))
+    return rows
+
+
+def columns_of(cells, data):
+    blocks = [cell_block(cell, hourly_columns(location_data))[0] for cell, location_data in zip(cells, data)]
+    return [np.concatenate(column) for column in zip(*blocks)]
+
+
+def test_text_columns_match_the_row_encoder():
+    cells, data = sample()
+    columns = columns_of(cells, data)
+    rows = rows_of(cells, data, datetime.fromisoformat)
+
+    payload = _copy_text_columns(columns)
+    assert payload == b"".join(_copy_text_chunks(rows))
+
+    lines = payload.decode("utf-8").splitlines()
+    # 72 hours minus 11 null temperatures, for 3 cities
+    assert len(lines) == len(rows) == 61 * 3
+    assert all(line.split("\t")[2] != "\\N" for line in lines)
+    null_wind = sum(row[3] is None for row in rows)
+    assert null_wind > 0
+    assert sum(line.split("\t")[3] == "\\N" for line in lines) == null_wind
+
+
+def test_text_timestamps_are_the_only_difference_with_iso_rows():
+    # rows read from the weather CSV keep their ISO timestamps, Postgres parses both forms
+    cells, data = sample(30)
+    columns = _copy_text_columns(columns_of(cells, data)).decode("utf-8").splitlines()
+    rows = b"".join(_copy_text_chunks(rows_of(cells, data, str))).decode("utf-8").splitlines()
+
+    assert len(columns) == len(rows)
+    for column_line, row_line in zip(columns, rows):
+        column_fields, row_fields = column_line.split("\t"), row_line.split("\t")
+        assert datetime.fromisoformat(column_fields[0]) == datetime.fromisoformat(row_fields[0])
+        assert column_fields[1:] == row_fields[1:]
+
+
+@pytest.mark.parametrize("timestamp", [datetime.fromisoformat, str])
+def test_binary_columns_match_the_row_encoder(timestamp):
+    cells, data = sample()
+    columns = columns_of(cells, data)
+
+    assert _copy_binary_columns(columns) == b"".join(_copy_binary_chunks(rows_of(cells, data, timestamp)))
@@ -0,0 +1,118 @@
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pytest
+
+from config import OPEN_METEO_MAX_CALL_WEIGHT, OPEN_METEO_MAX_LOCATIONS_PER_CALL, OPEN_METEO_MAX_URL_LENGTH
+from open_meteo import CacheMissError
+from pipeline.fetcher import FetchUnit, fetch_unit_splitting, split_unit
+from pipeline.grid import Location, snap_to_grid
+from pipeline.planner import _QUERY_OVERHEAD, _coordinate_chars, call_weight, plan_requests
+
+
+def cities(count: int):
+    rng = random.Random(7)
+    return [Location(i, round(rng.uniform(-60, 70), 4), round(rng.uniform(-180, 180), 4)) for i in range(count)]
+
+
+def ranges_per_cell(units):
+    ranges = defaultdict(list)
+    for unit in units:
+        for cell in unit.batch:
+            ranges[id(cell)].append((unit.start, unit.end))
+    return {cell: sorted(cell_ranges) for cell, cell_ranges in ranges.items()}
+
+
+@pytest.mark.parametrize("start, end", [
+    (date(2023, 1, 1), date(2024, 12, 31)),
+    (date(2024, 2, 20), date(2024, 3, 10)),
+    (date(2024, 5, 31), date(2024, 5, 31)),
+])
+def test_units_cover_every_cell_day_once(start, end):
+    cells = snap_to_grid(cities(2000), 0)
+    units = plan_requests(cells, start, end)
+
+    ranges = ranges_per_cell(units)
+    assert set(ranges) == {id(cell) for cell in cells}
+    for cell_ranges in ranges.values():
+        # back to back from start to end: no day missing, none fetched twice
+        assert cell_ranges[0][0] == start and cell_ranges[-1][1] == end
+        for (_, previous_end), (next_start, _) in zip(cell_ranges, cell_ranges[1:]):
+            assert next_start == previous_end + timedelta(days=1)
+    for unit in units:
+        assert start <= unit.start <= unit.end <= end
+        assert len(unit.batch) <= OPEN_METEO_MAX_LOCATIONS_PER_CALL
+        assert _QUERY_OVERHEAD + sum(_coordinate_chars(cell) for cell in unit.batch) <= OPEN_METEO_MAX_URL_LENGTH
+        assert call_weight(len(unit.batch), (unit.end - unit.start).days + 1) <= OPEN_METEO_MAX_CALL_WEIGHT
+        assert unit.lats == [cell.latitude for cell in unit.batch]
+        assert unit.lons == [cell.longitude for cell in unit.batch]
+
+
+def test_short_range_is_not_split_by_days():
+    start, end = date(2024, 2, 20), date(2024, 3, 10)
+    units = plan_requests(snap_to_grid(cities(50), 0), start, end)
+    # crossing a month boundary does not cut the range either
+    assert [(unit.start, unit.end) for unit in units] == [(start, end)]
+
+
+def unit_of(locations: int, start: date, end: date) -> FetchUnit:
+    cells = snap_to_grid(cities(locations), 0)
+    return FetchUnit(cells, [c.latitude for c in cells], [c.longitude for c in cells], start, end)
+
+
+def fake_response(unit, cache=None):
+    """Hourly series identifying the location and hour of every sample."""
+    hours = ((unit.end - unit.start).days + 1) * 24
+    first = (unit.start - date(2024, 1, 1)).days * 24
+    return [
+        {"latitude": lat, "longitude": lon, "hourly": {"time": list(range(first, first + hours)), "id": [lat] * hours}}
+        for lat, lon in zip(unit.lats, unit.lons)
+    ]
+
+
+def test_split_unit_halves_locations_then_days():
+    unit = unit_of(5, date(2024, 1, 1), date(2024, 1, 7))
+    first, second = split_unit(unit)
+    assert first.batch + second.batch == unit.batch
+    assert (first.start, first.end, second.start, second.end) == (unit.start, unit.end, unit.start, unit.end)
+
+    single = unit_of(1, date(2024, 1, 1), date(2024, 1, 7))
+    first, second = split_unit(single)
+    assert (first.start, first.end, second.start, second.end) == (
+        date(2024, 1, 1), date(2024, 1, 3), date(2024, 1, 4), date(2024, 1, 7)
+    )
+    assert split_unit(unit_of(1, date(2024, 1, 1), date(2024, 1, 1))) is None
+
+
+def test_split_responses_merge_back_in_order(capsys):
+    unit = unit_of(6, date(2024, 1, 1), date(2024, 1, 9))
+    calls = []
+
+    def fetch(part, cache=None):
+        calls.append(part)
+        # only calls of one location and at most 2 days get through
+        if len(part.batch) > 1 or (part.end - part.start).days + 1 > 2:
+            raise RuntimeError("Request too large")
+        return fake_response(part)
+
+    assert fetch_unit_splitting(unit, fetch=fetch) == fake_response(unit)
+    assert len(calls) > 1
+
+
+def test_unsplittable_failures_and_cache_misses_are_raised():
+    def failing(part, cache=None):
+        raise RuntimeError("Open-Meteo is down")
+
+    with pytest.raises(RuntimeError):
+        fetch_unit_splitting(unit_of(1, date(2024, 1, 1), date(2024, 1, 1)), fetch=failing)
+
+    calls = []
+
+    def offline(part, cache=None):
+        calls.append(part)
+        raise CacheMissError("not cached")
+
+    with pytest.raises(CacheMissError):
+        fetch_unit_splitting(unit_of(4, date(2024, 1, 1), date(2024, 1, 9)), fetch=offline)
+    assert len(calls) == 1
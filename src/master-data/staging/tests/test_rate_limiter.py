@@ -0,0 +1,99 @@
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from open_meteo import rate_limiter
+from open_meteo.rate_limiter import RateLimiter, backoff_delay, parse_retry_after
+
+
+class FakeClock:
+    """Stands in for the `time` module of the limiter, sleeping moves the clock forward."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", fake)
+    return fake
+
+
+def test_retry_after_in_seconds():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(" 1.5 ") == 1.5
+    assert parse_retry_after("-3") == 0.0
+
+
+def test_retry_after_as_http_date():
+    when = datetime.now(timezone.utc) + timedelta(seconds=90)
+    assert 85 <= parse_retry_after(format_datetime(when, usegmt=True)) <= 90
+
+    past = datetime.now(timezone.utc) - timedelta(hours=1)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+
+
+@pytest.mark.parametrize("value", [None, "", "soon"])
+def test_retry_after_missing_or_invalid(value):
+    assert parse_retry_after(value) is None
+
+
+def test_throttling_halves_the_pace_and_success_recovers_it(clock):
+    limiter = RateLimiter(requests_per_minute=60, weight_per_minute=1000, weight_per_hour=100000)
+
+    limiter.on_throttled()
+    limiter.on_throttled()
+    assert limiter.factor == 0.25
+    assert limiter.throttled == 2
+
+    for _ in range(50):
+        limiter.on_throttled()
+    assert limiter.factor == RateLimiter.MIN_FACTOR
+
+    limiter.on_success()
+    assert limiter.factor == pytest.approx(RateLimiter.MIN_FACTOR + RateLimiter.RECOVERY_STEP)
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.factor == 1.0
+
+
+def test_throttled_pace_spaces_requests(clock):
+    limiter = RateLimiter(requests_per_minute=60, weight_per_minute=1000, weight_per_hour=100000)
+    # drain the request bucket, one request per second refills it afterwards
+    for _ in range(60):
+        assert limiter.acquire() == 0.0
+    assert limiter.acquire() == pytest.approx(1.0)
+
+    limiter.on_throttled()
+    assert limiter.acquire() == pytest.approx(2.0)
+
+
+def test_retry_after_pauses_every_caller(clock):
+    limiter = RateLimiter(requests_per_minute=60, weight_per_minute=1000, weight_per_hour=100000)
+    limiter.on_throttled(retry_after=30)
+
+    assert limiter.acquire() == pytest.approx(30.0)
+    # the pause is over, the bucket still has tokens
+    assert limiter.acquire() == 0.0
+
+
+def test_backoff_delay_stays_within_its_bounds():
+    random.seed(11)
+    for attempt in range(1, 12):
+        ceiling = min(60.0, 2.0 * 2 ** (attempt - 1))
+        delays = [backoff_delay(attempt, base=2.0, cap=60.0) for _ in range(500)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        # full jitter: spread over the whole range, not clustered at the ceiling
+        assert min(delays) < ceiling * 0.1
+        assert max(delays) > ceiling * 0.9
@@ -0,0 +1,100 @@
+import random
+import threading
+import time
+
+import pytest
+
+from pipeline.stages import StageStats, consume, ordered_stage
+
+
+def delayed(seed):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def wait():
+        with lock:
+            seconds = rng.uniform(0, 0.005)
+        time.sleep(seconds)
+    return wait
+
+
+def run_pipeline(items, fetch, transform, sink):
+    fetched = ordered_stage(items, fetch, StageStats("fetch", workers=4, queue_size=3))
+    transformed = ordered_stage(fetched, transform, StageStats("transform", workers=3, queue_size=2))
+    consume(transformed, sink, StageStats("sink", workers=1))
+
+
+def new_threads(before):
+    return [t.name for t in threading.enumerate() if t not in before]
+
+
+def test_results_keep_input_order():
+    before = set(threading.enumerate())
+    wait = delayed(1)
+    out = []
+
+    def fetch(item):
+        wait()
+        return item * 2
+
+    def transform(item):
+        wait()
+        return item + 1
+
+    run_pipeline(range(300), fetch, transform, out.append)
+    assert new_threads(before) == []
+
+    assert out == [i * 2 + 1 for i in range(300)]
+
+
+def test_stage_error_propagates():
+    before = set(threading.enumerate())
+    wait = delayed(2)
+    out = []
+
+    def fetch(item):
+        wait()
+        if item == 40:
+            raise ValueError("item 40")
+        return item
+
+    with pytest.raises(ValueError, match="item 40"):
+        run_pipeline(iter(range(1000)), fetch, lambda item: item, out.append)
+    assert new_threads(before) == []
+
+    # everything before the failing item went through, in order
+    assert out == list(range(40))
+
+
+def test_sink_error_propagates():
+    before = set(threading.enumerate())
+    wait = delayed(3)
+
+    def fetch(item):
+        wait()
+        return item
+
+    def sink(item):
+        if item == 25:
+            raise RuntimeError("sink failed")
+
+    with pytest.raises(RuntimeError, match="sink failed") as excinfo:
+        run_pipeline(iter(range(1000)), fetch, lambda item: item, sink)
+    # stopped by consume, not by the collection of the stages once the traceback is gone
+    assert new_threads(before) == []
+    assert excinfo.traceback
+
+
+def test_source_error_propagates():
+    before = set(threading.enumerate())
+
+    def source():
+        yield from range(10)
+        raise OSError("source failed")
+
+    out = []
+    with pytest.raises(OSError, match="source failed"):
+        run_pipeline(source(), lambda item: item, lambda item: item, out.append)
+    assert new_threads(before) == []
+
+    assert out == list(range(10))
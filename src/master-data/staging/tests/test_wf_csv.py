@@ -0,0 +1,19 @@
+from pipeline.wf_csv import parse_wf_csv_records
+
+INDEXES = [0, 1, 2, 3, 4, 5]
+
+
+def test_skipped_records_do_not_widen_the_window():
+    stats = {"read": 0, "skipped": 0, "unmatched": 0, "first": None, "last": None}
+    records = [
+        ["1", "2", "2021-01-05T00:00", "3", "", "0.5"],
+        # no temperature / unparsable temperature
+        ["1", "2", "2020-01-01T00:00", "", "1", "0"],
+        ["1", "2", "2022-01-01T00:00", "x", "1", "0"],
+        # no matching city
+        ["9", "9", "2019-01-01T00:00", "3", "1", "0"],
+    ]
+    rows = list(parse_wf_csv_records(records, INDEXES, {(1.0, 2.0): 7}, stats))
+
+    assert rows == [("2021-01-05T00:00", 7, 3.0, None, 0.5)]
+    assert stats == {"read": 4, "skipped": 2, "unmatched": 1, "first": "2021-01-05T00:00", "last": "2021-01-05T00:00"}